@@ -0,0 +1,455 @@
+# This program measures how long the inventory program takes to load, search, restock, save and report on inventories
+# of different sizes, so changes that make it slower can be found by comparing the results between commits.
+# It creates synthetic inventory files in a temporary directory (or the directory given with --data-dir, where they
+# are kept for the next run), so the real 'inventory.txt' is not changed.
+# Each operation is run without asking anything: the answers the menu functions would ask the user for are given by
+# the benchmark, and the tables they print are discarded.
+#
+# Usage: python benchmark.py [--sizes 1k,10k,100k] [--operations load,find,...] [--output results.json]
+#                            [--compare old_results.json] [--no-memory] [--data-dir DIR]
+#
+# For each size and operation, the time, the throughput (rows or operations per second) and the peak memory allocated
+# by Python while it runs (measured with tracemalloc, in a second run) are printed and saved as JSON.
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import inventory
+
+
+# Countries and product models used to create synthetic inventories, from the most to the least common.
+# The share of rows of each one follows a Zipf distribution, like the sales of real products.
+COUNTRIES = ["China", "Vietnam", "Indonesia", "India", "Brazil", "Pakistan", "Bangladesh", "Thailand", "Mexico",
+             "Turkey", "Italy", "Portugal", "Spain", "South Africa", "United States", "Cambodia", "Malaysia", "Egypt",
+             "Philippines", "Poland", "Germany", "France", "Australia", "Israel", "Japan"]
+PRODUCTS = [("Air Max 90", 2300), ("Jordan 1", 3200), ("Air Force 1", 1800), ("Dunk Low", 2100), ("Blazer", 1700),
+            ("Cortez", 1500), ("Pegasus", 2600), ("Air Max 97", 3900), ("Waffle Racer", 2700), ("Air Presto", 2200),
+            ("Kobe 4", 4200), ("Air Yeezy 2", 4389), ("Air Foamposite", 2430), ("Challenge Court", 1595),
+            ("Dunk SB", 2600), ("Air Huarache", 2000), ("React Vision", 2400), ("Zoom Fly", 3100),
+            ("Vaporfly", 4800), ("Air Mag", 2000), ("Killshot", 1700), ("Roshe Run", 1400), ("Air Max 270", 2900),
+            ("Free Run", 1900), ("Air Zoom Alphafly", 5200)]
+
+# Default sizes of the synthetic inventories.
+DEFAULT_SIZES = "1k,10k,100k"
+
+# Number of times the operations that work on a single product are repeated, e.g. lookups and restocks.
+REPEAT = 1000
+
+# Number of times the whole inventory file is written by the operations that measure the cost of a write.
+WRITES = 20
+
+
+# Function to get the cumulative weights of a Zipf distribution over a number of items.
+def zipf_weights(count):
+
+    weights = []
+    total = 0
+    for rank in range(1, count + 1):
+        total += 1 / rank
+        weights.append(total)
+    return weights
+
+
+# Function to get the greatest common divisor of two numbers.
+def gcd(first, second):
+
+    while second:
+        first, second = second, first % second
+    return first
+
+
+# Function to get the lines of a synthetic inventory file with the given number of rows, starting with the titles.
+# The codes are in the format SKU##### (with more digits for inventories of more than 100000 rows), in a shuffled
+# order. The cost of each product is near the price of its model, and most quantities are low.
+# The same rows are created every time for the same number of rows and seed.
+def synthetic_lines(rows, seed=0):
+
+    generator = random.Random(seed)
+    country_weights = zipf_weights(len(COUNTRIES))
+    product_weights = zipf_weights(len(PRODUCTS))
+
+    # Shuffle the codes with a multiplier that shares no factor with the number of rows, so each code is used once.
+    multiplier = next(number for number in range(7919, rows + 7919) if gcd(number, rows) == 1) if rows > 1 else 1
+
+    yield "Country,Code,Product,Cost,Quantity"
+    for row in range(rows):
+        country = generator.choices(COUNTRIES, cum_weights=country_weights)[0]
+        product, price = generator.choices(PRODUCTS, cum_weights=product_weights)[0]
+        cost = max(round(price * generator.uniform(0.8, 1.2), -1), 10)
+        quantity = min(int(generator.expovariate(1 / 25)), 500)
+        yield f"{country},SKU{row * multiplier % rows:05d},{product},{int(cost)},{quantity}"
+
+
+# Function to convert a size such as '10k' or '1M' to a number of rows.
+def parse_size(size):
+
+    multipliers = {"k": 1000, "m": 1000000}
+    size = size.strip().lower()
+    if size[-1:] in multipliers:
+        return int(float(size[:-1]) * multipliers[size[-1]])
+    return int(size)
+
+
+# Function to create a synthetic inventory file, if it doesn't exist yet in the directory.
+# This function returns the name of the file.
+def synthetic_file(directory, rows):
+
+    file_name = os.path.join(directory, f"inventory-{rows}.txt")
+    if not os.path.exists(file_name):
+        inventory.save_file(file_name, inventory.text_chunks(synthetic_lines(rows)), backups=0)
+    return file_name
+
+
+# Function to give the menu functions the answers they would ask the user for, in order, and discard what they print.
+# e.g. 'with scripted(["y", "10"]):' answers 'y' to the first question and '10' to the second, and then starts again.
+@contextlib.contextmanager
+def scripted(answers=()):
+
+    answers = list(answers)
+    position = [0]
+
+    def answer(prompt=""):
+        value = answers[position[0] % len(answers)]
+        position[0] += 1
+        return value
+
+    if answers:
+        inventory.input = answer
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        if answers:
+            del inventory.input
+
+
+# Function to remove files and the files the inventory program keeps next to them, if they exist: the journals, locks,
+# backups, binary snapshot, reorder points, sales and the folder of the history.
+def remove_files(file_name):
+
+    backups = tuple(f".{number}" for number in range(1, inventory.BACKUP_COUNT + 1))
+    names = [file_name + suffix for suffix in ("", ".journal", ".journal.compacting", ".lock", ".compact.lock", "-wal",
+                                               "-shm", ".sales.lock") + backups]
+    names += [inventory.binary_file_name(file_name), inventory.thresholds_file_name(file_name),
+              inventory.sales_file_name(file_name)]
+    for name in names:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(name)
+    shutil.rmtree(inventory.InventoryHistory(file_name).directory, ignore_errors=True)
+
+
+# Definition of class Benchmark.
+# It keeps the file and the stores used by the operations for one size of inventory, so each operation only
+# measures its own work. The stores are loaded the first time an operation needs them.
+class Benchmark:
+
+    def __init__(self, directory, rows):
+        self.directory = directory
+        self.rows = rows
+        self.file_name = synthetic_file(directory, rows)
+        self.text_store = None
+        self.sqlite_store = None
+        self.sale_price = 1000
+        generator = random.Random(rows)
+        self.codes = [f"SKU{generator.randrange(rows):05d}" for _ in range(REPEAT)]
+
+    # Function to get the text file store with the synthetic inventory loaded.
+    def text(self):
+        if self.text_store is None:
+            self.text_store = inventory.TextFileInventory(self.working_copy(), journal_limit=float("inf"),
+                                                          interactive=False)
+            self.text_store.refresh()
+        return self.text_store
+
+    # Function to get an SQLite store with the synthetic inventory.
+    def sqlite(self):
+        if self.sqlite_store is None:
+            database_name = os.path.join(self.directory, f"benchmark-{self.rows}.db")
+            remove_files(database_name)
+            with scripted():
+                inventory.migrate_to_sqlite(self.file_name, database_name)
+            self.sqlite_store = inventory.SQLiteInventory(database_name, interactive=False)
+            self.sqlite_store.refresh()
+        return self.sqlite_store
+
+    # Function to copy the synthetic inventory to a file that the operations can change.
+    def working_copy(self):
+        copy_name = os.path.join(self.directory, f"benchmark-{self.rows}.txt")
+        remove_files(copy_name)
+        with open(self.file_name, "rb") as source:
+            inventory.save_file(copy_name, iter(lambda: source.read(1024 * 1024), b""), backups=0)
+        return copy_name
+
+    # Function to close the stores and remove the files they have written.
+    def close(self):
+        if self.text_store is not None:
+            self.text_store.wait()
+            remove_files(self.text_store.file_name)
+        if self.sqlite_store is not None:
+            self.sqlite_store.close()
+            remove_files(self.sqlite_store.file_name)
+
+    # The operations. Each one returns the number of rows or operations it has processed.
+
+    # Read the file and check its format, without keeping the products.
+    def check_file(self):
+        with open(self.file_name) as file:
+            inventory.check_file(file)
+        return self.rows
+
+    # Read the file and create the columns of products.
+    def read_shoes_data(self):
+        with scripted():
+            inventory.read_shoes_data(self.file_name, interactive=False)
+        return self.rows
+
+    # Load the text file store: read the file, replay its journal and build the index of codes and the quantity index.
+    def load(self):
+        store = inventory.TextFileInventory(self.text().file_name, journal_limit=float("inf"), interactive=False)
+        store.refresh()
+        return self.rows
+
+    # Search for products by code through the menu function (with the table it prints).
+    def search_shoe(self):
+        store = self.text()
+        with scripted(self.codes):
+            for _ in self.codes:
+                inventory.search_shoe(store)
+        return len(self.codes)
+
+    # Find products by code in the text file store and in the SQLite database.
+    def find(self):
+        store = self.text()
+        for code in self.codes:
+            store.find(code)
+        return len(self.codes)
+
+    def sqlite_find(self):
+        store = self.sqlite()
+        for code in self.codes:
+            store.find(code)
+        return len(self.codes)
+
+    # Show the 10 products with the lowest quantities and restock each of them by 1, through the menu function.
+    def re_stock(self):
+        with scripted(["y", "1"]):
+            inventory.re_stock(self.text(), 10)
+        return 10
+
+    # Show the 10 products with the highest quantities and put each of them on sale, through the menu function.
+    # The sale price is lowered each time, as it has to be lower than the current price.
+    def highest_qty(self):
+        self.sale_price -= 1
+        with scripted(["y", str(self.sale_price)]):
+            inventory.highest_qty(self.text(), 10)
+        return 10
+
+    # Restock products one at a time, each saved with its own write to the journal or the database.
+    def restock(self):
+        store = self.text()
+        for code in self.codes:
+            store.restock(code, 1)
+        return len(self.codes)
+
+    def sqlite_restock(self):
+        store = self.sqlite()
+        for code in self.codes:
+            store.restock(code, 1)
+        return len(self.codes)
+
+    # Calculate and print the total value of every product, through the menu function.
+    def value_per_item(self):
+        with scripted():
+            inventory.value_per_item(self.text())
+        return self.rows
+
+    # Calculate and print the value of the stock per country, product and price band.
+    def value_report(self):
+        with scripted():
+            inventory.value_report(self.text())
+        return self.rows
+
+    # The cost of saving a change, for each way of writing it: the whole inventory written in place (as the program
+    # used to, which a crash can leave incomplete), the whole inventory written safely with save_file, without and with
+    # backups, as a compaction does, and a record appended to the journal, as each change does.
+    def write_in_place(self):
+        lines = list(inventory.inventory_lines(self.text().columns()))
+        saved_name = os.path.join(self.directory, f"benchmark-{self.rows}.saved")
+        for _ in range(WRITES):
+            with open(saved_name, "w") as file:
+                file.write("\n".join(lines))
+        remove_files(saved_name)
+        return WRITES
+
+    def save_file(self):
+        return self.save_files(backups=0)
+
+    def save_file_backups(self):
+        return self.save_files(backups=inventory.BACKUP_COUNT)
+
+    def journal_append(self):
+        store = self.text()
+        with store.locked():
+            store.catch_up()
+            for code in self.codes:
+                store.append([["restock", code, store.find(code).quantity]])
+        return len(self.codes)
+
+    # Function to write the whole inventory to a new file with save_file a number of times, keeping a number of backups.
+    def save_files(self, backups):
+        lines = list(inventory.inventory_lines(self.text().columns()))
+        saved_name = os.path.join(self.directory, f"benchmark-{self.rows}.saved")
+        for _ in range(WRITES):
+            inventory.save_file(saved_name, inventory.text_chunks(lines), backups=backups)
+        remove_files(saved_name)
+        return WRITES
+
+
+# The operations that can be measured, in the order they are run, the unit of what they process and the store they
+# use, which is loaded before the operation is measured.
+OPERATIONS = {
+    "check_file": ("rows", None),
+    "read_shoes_data": ("rows", None),
+    "load": ("rows", "text"),
+    "search_shoe": ("searches", "text"),
+    "find": ("lookups", "text"),
+    "sqlite_find": ("lookups", "sqlite"),
+    "re_stock": ("restocks", "text"),
+    "highest_qty": ("sales", "text"),
+    "restock": ("writes", "text"),
+    "sqlite_restock": ("writes", "sqlite"),
+    "value_per_item": ("rows", "text"),
+    "value_report": ("rows", "text"),
+    "write_in_place": ("writes", "text"),
+    "save_file": ("writes", "text"),
+    "save_file_backups": ("writes", "text"),
+    "journal_append": ("writes", "text"),
+}
+
+
+# Function to run an operation and measure it.
+# This function returns a dictionary with the time in seconds, the number of rows or operations processed, the
+# throughput per second and, if 'memory' is True, the peak memory allocated while running it a second time.
+def measure(benchmark, operation, memory):
+
+    unit, store = OPERATIONS[operation]
+    if store is not None:
+        getattr(benchmark, store)()
+
+    function = getattr(benchmark, operation)
+    start = time.perf_counter()
+    count = function()
+    seconds = time.perf_counter() - start
+
+    result = {"rows": benchmark.rows, "operation": operation, "seconds": seconds, "count": count,
+              "unit": unit, "throughput": count / seconds if seconds else None}
+
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+# Function to get the commit of the program being measured, or None if it is not in a git repository.
+def git_commit():
+
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to format a number of bytes, e.g. '12.3 MB'.
+def format_bytes(size):
+
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+# Function to print the results of the operations, and the change in time from earlier results if there are any.
+def print_results(results, previous=None):
+
+    previous_seconds = {}
+    for result in (previous or {}).get("results", []):
+        previous_seconds[(result["rows"], result["operation"])] = result["seconds"]
+
+    for result in results:
+        line = (f"{result['rows']:>10} rows  {result['operation']:<16} {result['seconds'] * 1000:12.2f} ms  "
+                f"{result['throughput'] or 0:14,.0f} {result['unit']}/s")
+        if "peak_memory" in result:
+            line += f"  {format_bytes(result['peak_memory']):>10} peak"
+        before = previous_seconds.get((result["rows"], result["operation"]))
+        if before:
+            line += f"  {(result['seconds'] - before) / before:+7.1%} vs previous"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the inventory program on synthetic inventories.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated numbers of rows, e.g. 1k,1M,10M (default: {DEFAULT_SIZES})")
+    parser.add_argument("--operations", default=",".join(OPERATIONS),
+                        help="comma-separated operations to measure (default: all of them)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="file to save the results in as JSON (default: benchmark_results.json)")
+    parser.add_argument("--compare", help="results saved by an earlier run, to compare the times with")
+    parser.add_argument("--no-memory", action="store_true", help="don't measure the peak memory of each operation")
+    parser.add_argument("--data-dir", help="directory to keep the synthetic inventories in, to reuse them")
+    options = parser.parse_args()
+
+    operations = [operation.strip() for operation in options.operations.split(",") if operation.strip()]
+    unknown = [operation for operation in operations if operation not in OPERATIONS]
+    if unknown:
+        parser.error(f"unknown operation(s): {', '.join(unknown)}. Choose from: {', '.join(OPERATIONS)}")
+
+    previous = None
+    if options.compare:
+        with open(options.compare) as file:
+            previous = json.load(file)
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        directory = options.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(directory, exist_ok=True)
+
+        for rows in [parse_size(size) for size in options.sizes.split(",")]:
+            start = time.perf_counter()
+            benchmark = Benchmark(directory, rows)
+            print(f"{rows} rows: synthetic inventory ready in {time.perf_counter() - start:.2f} s")
+            try:
+                for operation in operations:
+                    results.append(measure(benchmark, operation, not options.no_memory))
+                    print_results(results[-1:], previous)
+            finally:
+                benchmark.close()
+
+    output = {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "numpy": inventory.import_numpy() is not None,
+              "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+              "results": results}
+    with open(options.output, "w") as file:
+        json.dump(output, file, indent=2)
+    print(f"Results saved in '{options.output}'.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
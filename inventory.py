@@ -2,30 +2,389 @@
 # Sources for research applied on this program can be found at the end of this file.
 
 # =========== Import libraries ===============
+# Import time module, and save the time the program started loading. See source 13.
+import time
+START_TIME = time.perf_counter()
+
 # Import OS module. See Source 1.
 import os
 
-# Import pycountry module. Requires installation of pycountry package. See sources 2 and 3.
-import pycountry
-
-# Import tabulate module. Requires installation of tabulate package. See source 4.
-from tabulate import tabulate
+# The pycountry and tabulate modules (see sources 2, 3 and 4) are imported the first time they are needed,
+# by the functions in the 'Modules imported when needed' section below. See source 13.
 
 # Import string module. See source 5.
 import string
 
+# Import threading module. See source 6.
+import threading
+
+# Import heapq module. See source 7.
+import heapq
+
+# Import array module. See source 8.
+from array import array
+
+# Import bisect module. See source 9.
+import bisect
+
+# Import mmap, struct and sys modules. See source 11.
+import mmap
+import struct
+import sys
+
+# Import functools and unicodedata modules. See source 12.
+import functools
+import unicodedata
+
+# Import contextlib module. See source 13.
+import contextlib
+
+# Import argparse module. See source 14.
+import argparse
+
+# Import itertools module. See source 15.
+import itertools
+
+# Import shutil module, to copy a file when a backup can't be saved as a hard link. See source 17.
+import shutil
+
+# Import io module, to read parts of the inventory file as text. See source 20.
+import io
+
+# Import operator and re modules, to read and check the conditions of sale rules. See source 22.
+import operator
+import re
+
+# The concurrent.futures module, to check the parts of a large inventory file in several processes, is only imported
+# when a large file is read. See source 20.
+
+# The tracemalloc module, to measure the memory allocated by each phase of the program, is only imported when
+# profiling is turned on with INVENTORY_PROFILE. See source 19.
+
+# Import fcntl module, which is only available on Unix systems, to lock the inventory files. See source 16.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# The sqlite3 module (see source 18) is only imported when an inventory database is used.
+
+
+# ======== Settings ==========
+# Size in bytes the journal of changes can reach before it is compacted into the inventory file.
+JOURNAL_COMPACT_SIZE = 1024 * 1024
+
+# Number of backups of the inventory file kept when it is replaced ('inventory.txt.1' is the most recent one).
+BACKUP_COUNT = 3
+
+# Maximum number of lines with errors described when the inventory file has the wrong format.
+MAX_FILE_ERRORS = 100
+
+# Size in bytes from which the inventory file is checked in parts by several processes at the same time, and the size
+# of each part. Smaller files are read line by line by this program, as starting the processes takes longer.
+PARALLEL_LOAD_SIZE = 32 * 1024 * 1024
+LOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of processes used to check a large inventory file. It can be set with the environment variable
+# INVENTORY_WORKERS (e.g. INVENTORY_WORKERS=1 to always read the file line by line), and is otherwise the number of
+# CPUs.
+LOAD_WORKERS = int(os.environ.get("INVENTORY_WORKERS", "").strip() or 0) or os.cpu_count() or 1
+
+# Number of changes added to the history of the inventory between two snapshots of every quantity and cost.
+# Queries on the history only go through the changes made since the last snapshot before the time asked for.
+# If there are more products than this, a snapshot is taken after as many changes as there are products instead, so
+# the snapshots don't take more space than the changes.
+HISTORY_SNAPSHOT_EVENTS = 50000
+
+# Number of days changes are kept in the history of the inventory. Older changes are dropped once they are a quarter
+# of the history, and the history then starts with the last snapshot taken before that time.
+HISTORY_RETENTION_DAYS = 365
+
+# Reorder point and target quantity of the products without their own (see class ReorderEngine): a product is
+# reordered when its quantity is at or below the reorder point, with the amount that brings it up to the target.
+REORDER_POINT = 10
+REORDER_TARGET = 50
+
+# Largest quantity a product can have, as quantities are stored as 64-bit whole numbers (see class ShoeColumns).
+MAX_QUANTITY = 2 ** 63 - 1
+
+# Costs at which each price band of the value report starts.
+PRICE_BANDS = (1000, 2000, 3000, 4000, 5000)
+
+# Format of the binary snapshot of the inventory (see class BinarySnapshot).
+# The header holds the magic bytes, the version, the width of the codes, the number of rows and the position of
+# the 8 sections in the file.
+BINARY_MAGIC = b"SHOEBIN\0"
+BINARY_VERSION = 1
+BINARY_CODE_WIDTH = 16
+BINARY_HEADER = struct.Struct("<8sIIQ8Q")
+
+# Number of country searches whose results are kept in the cache of fuzzy searches.
+COUNTRY_CACHE_SIZE = 4096
+
+# Number of items shown on each page when viewing the inventory.
+VIEW_PAGE_SIZE = 20
+
+# Number of rendered tables kept by the cache of views of each store (see class ViewCache), e.g. pages of the
+# inventory and the table of the value of each item.
+VIEW_CACHE_SIZE = 32
+
+# Extensions of the files that are opened as SQLite databases instead of inventory text files.
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+# If the environment variable INVENTORY_TIMING is set (e.g. INVENTORY_TIMING=1), the time taken by each phase of
+# the program, such as importing modules and loading the inventory, is printed as it finishes.
+SHOW_TIMING = bool(os.environ.get("INVENTORY_TIMING"))
+
+# The environment variable INVENTORY_PROFILE turns on profiling for the whole run of the program:
+#   INVENTORY_PROFILE=cprofile prints the functions that took the most time when the program exits.
+#   INVENTORY_PROFILE=tracemalloc prints the lines that allocated the most memory, and adds the peak memory allocated
+#   during each phase to the statistics.
+#   INVENTORY_PROFILE=cprofile,tracemalloc does both.
+# If INVENTORY_PROFILE_FILE is set to a file name, the cProfile statistics are saved in it (e.g. for pstats).
+PROFILE_MODES = {mode.strip() for mode in os.environ.get("INVENTORY_PROFILE", "").lower().split(",") if mode.strip()}
+PROFILE_FILE = os.environ.get("INVENTORY_PROFILE_FILE")
+
+# Number of functions and lines shown in the profiling reports.
+PROFILE_LIMIT = 25
+
+
+# ======== Timing and statistics ==========
+# The time taken by each phase of the program, such as reading the file, validating it, looking up countries and
+# formatting tables, is added up for the whole session in PHASE_STATS, with the number of times it has run.
+# COUNTERS keeps other numbers for the session, such as lines read and journal records written.
+# They are printed with the 'STATS' option of the menu, or the '--stats' option of the command line.
+# Phases can be nested, e.g. 'check file' includes the time of 'read file'.
+PHASE_STATS = {}
+COUNTERS = {}
+
+# Peak memory allocated by the phases that are running, for phases nested in other phases. See timed.
+PHASE_PEAKS = []
+
+# The tracemalloc module, once start_profiling has started it. See memory_tracer.
+TRACERS = {}
+
+
+# Function to add the time taken by a phase to its statistics, and print it if SHOW_TIMING is True.
+# This function takes in the name of the phase, the time in seconds and, optionally, the peak memory allocated.
+def record_phase(phase, seconds, peak=None):
+
+    stats = PHASE_STATS.setdefault(phase, {"calls": 0, "seconds": 0.0, "max seconds": 0.0, "peak memory": None})
+    stats["calls"] += 1
+    stats["seconds"] += seconds
+    stats["max seconds"] = max(stats["max seconds"], seconds)
+    if peak is not None:
+        stats["peak memory"] = max(stats["peak memory"] or 0, peak)
+
+    if SHOW_TIMING:
+        print(f"[timing] {phase}: {seconds * 1000:.1f} ms", file=sys.stderr)
+
+
+# Function to add an amount to a counter, e.g. 'count("lines read", 100)'.
+def count(counter, amount=1):
+
+    COUNTERS[counter] = COUNTERS.get(counter, 0) + amount
+
+
+# Function to record the time taken by a phase since it started.
+def print_timing(phase, start):
+
+    record_phase(phase, time.perf_counter() - start)
+
+
+# Function to get the tracemalloc module if start_profiling has started it to measure memory, or None.
+# tracemalloc takes a noticeable time to import, so it is only used if it has been imported by start_profiling.
+# Memory traced by another program using this module (e.g. benchmark.py, which measures the peak memory of each
+# operation) is not measured, as timed resets the peak.
+def memory_tracer():
+
+    tracemalloc = TRACERS.get("tracemalloc")
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return tracemalloc
+    return None
+
+
+# Function to time the code in a 'with' statement as a phase, e.g. 'with timed("load inventory"):'.
+# It can also be used as a decorator, e.g. '@timed("load inventory")', to time every call of a function.
+# If start_profiling is tracing memory, the peak memory allocated during the phase is recorded too. The peak is reset
+# when a phase starts, so the peak of each phase running when a nested phase starts is kept in PHASE_PEAKS.
+# Memory is only measured in the main thread, as the peak is shared by all threads.
+@contextlib.contextmanager
+def timed(phase):
+
+    tracemalloc = memory_tracer() if threading.current_thread() is threading.main_thread() else None
+    measure_memory = tracemalloc is not None
+    if measure_memory:
+        if PHASE_PEAKS:
+            PHASE_PEAKS[-1] = max(PHASE_PEAKS[-1], tracemalloc.get_traced_memory()[1])
+        PHASE_PEAKS.append(0)
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak = None
+        if measure_memory:
+            peak = max(PHASE_PEAKS.pop(), tracemalloc.get_traced_memory()[1])
+            if PHASE_PEAKS:
+                PHASE_PEAKS[-1] = max(PHASE_PEAKS[-1], peak)
+        record_phase(phase, seconds, peak)
+
+
+# Function to read the lines of a file in blocks, recording the time spent reading as the 'read file' phase.
+# The lines are given one at a time, so a large file is never in memory at once.
+def read_lines(file, block_size=1024 * 1024):
+
+    seconds = 0.0
+    lines = 0
+    while True:
+        start = time.perf_counter()
+        block = file.readlines(block_size)
+        seconds += time.perf_counter() - start
+        if not block:
+            break
+        lines += len(block)
+        yield from block
+
+    record_phase("read file", seconds)
+    count("lines read", lines)
+
+
+# Function to print the statistics of the session: the time taken by each phase, the number of times it has run,
+# the peak memory allocated during it (if tracemalloc is running) and the counters.
+def print_stats():
+
+    # Copy the counters first, so the tables printed here are not counted.
+    counters = sorted(COUNTERS.items())
+    table_headers = ["Phase", "Calls", "Total ms", "Mean ms", "Max ms", "Peak memory"]
+    table_content = []
+    for phase, stats in sorted(PHASE_STATS.items(), key=lambda item: -item[1]["seconds"]):
+        peak = stats["peak memory"]
+        table_content.append([phase, stats["calls"], f"{stats['seconds'] * 1000:.1f}",
+                              f"{stats['seconds'] * 1000 / stats['calls']:.2f}", f"{stats['max seconds'] * 1000:.1f}",
+                              "-" if peak is None else f"{peak / 1024:.1f} KB"])
+
+    print(f"\nTime per phase in this session ({time.perf_counter() - START_TIME:.1f} s since the program started):")
+    print(format_table(table_content, table_headers) if table_content else "No phases have run yet.")
+    if counters:
+        print(f"\nCounters:\n{format_table(counters, ['Counter', 'Count'])}")
+    tracemalloc = memory_tracer()
+    if tracemalloc is not None:
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"\nMemory allocated: {current / 1024:.1f} KB now, "
+              f"{peak / 1024:.1f} KB at the peak since the last phase.")
+
+
+# Function to start the profilers chosen with INVENTORY_PROFILE, if any.
+# This function returns the cProfile profiler, or None if cProfile is not used.
+def start_profiling():
+
+    if "tracemalloc" in PROFILE_MODES:
+        import tracemalloc
+        tracemalloc.start()
+        TRACERS["tracemalloc"] = tracemalloc
+
+    if "cprofile" in PROFILE_MODES:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return None
+
+
+# Function to stop the profilers started by start_profiling and print their reports.
+def stop_profiling(profiler):
+
+    if profiler is not None:
+        profiler.disable()
+        import pstats
+        if PROFILE_FILE:
+            profiler.dump_stats(PROFILE_FILE)
+        print("\n[profile] Functions with the most cumulative time:", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+
+    tracemalloc = memory_tracer()
+    if tracemalloc is not None:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del TRACERS["tracemalloc"]
+        print("\n[profile] Lines with the most memory allocated:", file=sys.stderr)
+        for statistic in snapshot.statistics("lineno")[:PROFILE_LIMIT]:
+            print(f"[profile] {statistic}", file=sys.stderr)
+
+
+# ======== Modules imported when needed ==========
+# Importing pycountry loads its databases of countries, which takes a noticeable part of the start of the program,
+# so it is only imported the first time a country is validated. The same is done for tabulate, NumPy and sqlite3.
+# Each function imports its module once and returns it.
+
+# Function to import the pycountry module.
+@functools.lru_cache(maxsize=None)
+def import_pycountry():
+
+    with timed("import pycountry"):
+        import pycountry
+    return pycountry
+
+
+# Function to import the tabulate function of the tabulate module.
+@functools.lru_cache(maxsize=None)
+def import_tabulate():
+
+    with timed("import tabulate"):
+        from tabulate import tabulate as tabulate_function
+    return tabulate_function
+
+
+# Function to import the NumPy module, used to calculate reports over whole columns at once. See source 10.
+# This function returns None if NumPy is not installed.
+@functools.lru_cache(maxsize=None)
+def import_numpy():
+
+    with timed("import numpy"):
+        try:
+            import numpy
+        except ImportError:
+            return None
+    return numpy
+
+
+# Function to import the sqlite3 module, used to keep the inventory in a database. See source 18.
+@functools.lru_cache(maxsize=None)
+def import_sqlite3():
+
+    with timed("import sqlite3"):
+        import sqlite3
+    return sqlite3
+
+
+# Function to format a table with the tabulate module, importing it the first time a table is formatted.
+# This function takes in the same arguments as the tabulate function of the tabulate module.
+def tabulate(table_content, headers=(), tablefmt="pretty"):
+
+    tabulate_function = import_tabulate()
+    count("tables rendered")
+    with timed("render table"):
+        return tabulate_function(table_content, headers=headers, tablefmt=tablefmt)
+
 
 # ======== The beginning of the class ==========
 # Definition of class Shoe.
+# The instance variables are stored in slots instead of a dictionary, to use less memory per object.
 class Shoe:
 
+    __slots__ = ("country", "code", "product", "cost", "quantity")
+
     # Initialize 5 instance variables.
+    # Cost and quantity can be given as text, e.g. from the inventory file, and are converted to numbers once here.
     def __init__(self, country, code, product, cost, quantity):
         self.country = country
         self.code = code
         self.product = product
-        self.cost = cost
-        self.quantity = quantity
+        self.cost = to_number(cost)
+        self.quantity = int(quantity)
 
     # Function to get the cost of the object.
     def get_cost(self):
@@ -41,138 +400,2754 @@ class Shoe:
 
     # Function to get the total value of the item.
     def get_total_value(self):
-        return int(self.cost) * int(self.quantity)
+        return self.cost * self.quantity
 
 
-# =============Shoe list===========
-# The list will be used to store a list of objects of shoes.
-shoe_list = []
+# Function to convert a cost to a number.
+# This function takes in a string or a number and returns an integer if the cost is a whole number, otherwise a float.
+def to_number(value):
 
+    if isinstance(value, str):
+        return int(value) if value.isdigit() else float(value)
 
-# ==========Functions outside the class==============
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
 
-# Function to check the inventory file has the right format.
-# This function takes in a list.
-def check_file(file_list):
+    return value
 
-    # Declare variables.
-    error_description = "\nErrors in the file inventory.txt:"
-    errors = False
-    description = []
 
-    # Check if the file is empty. If so, change 'errors' to True and add message to error description.
-    if not file_list:
-        errors = True
-        error_description += "\n\nThis file is empty."
+# ======== The inventory columns ==========
+# Definition of class ShoeColumns.
+# It stores the inventory as columns instead of one object per product: the codes in a list, the costs and quantities
+# in typed arrays, and the countries and product names as positions in tables of unique names.
+# It can be used like a list of Shoe objects. Each item is a new Shoe object created from its row, so changes have to
+# be made through the columns and not through the objects.
+class ShoeColumns:
 
-    else:
-        # If the list is not empty, check its format line by line.
-        for line_count, line in enumerate(file_list):
+    # Initialize the empty columns and name tables, and append the Shoe objects given, if any.
+    def __init__(self, shoes=()):
+        self.codes = []
+        self.country_ids = array("I")
+        self.product_ids = array("I")
+        self.costs = array("d")
+        self.quantities = array("q")
+        self.countries = []
+        self.products = []
+        self.country_positions = {}
+        self.product_positions = {}
 
-            # Check that line 0 contains the titles. If not, tell the user to move any product data one line down.
-            if line_count == 0 and line == "Country,Code,Product,Cost,Quantity\n":
+        for shoe in shoes:
+            self.append(shoe)
+
+    # Function to get the number of rows.
+    def __len__(self):
+        return len(self.codes)
+
+    # Function to get the row in a position (or a list of rows, for a slice) as a Shoe object.
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[row] for row in range(*position.indices(len(self.codes)))]
+        return Shoe(self.countries[self.country_ids[position]], self.codes[position],
+                    self.products[self.product_ids[position]], self.costs[position], self.quantities[position])
+
+    # Function to go through the rows as Shoe objects.
+    def __iter__(self):
+        for position in range(len(self.codes)):
+            yield self[position]
+
+    # Function to get the position of a name in a table of names, adding it to the table if it is new.
+    @staticmethod
+    def name_id(names, positions, name):
+        position = positions.get(name)
+        if position is None:
+            position = positions[name] = len(names)
+            names.append(name)
+        return position
+
+    # Function to add a Shoe object as a new row.
+    def append(self, shoe):
+        self.codes.append(shoe.code)
+        self.country_ids.append(self.name_id(self.countries, self.country_positions, shoe.country))
+        self.product_ids.append(self.name_id(self.products, self.product_positions, shoe.product))
+        self.costs.append(shoe.cost)
+        self.quantities.append(shoe.quantity)
+
+    # Function to replace the country, product, cost and quantity of a row with those of a Shoe object.
+    def set_row(self, position, shoe):
+        self.country_ids[position] = self.name_id(self.countries, self.country_positions, shoe.country)
+        self.set_product(position, shoe.product)
+        self.costs[position] = shoe.cost
+        self.quantities[position] = shoe.quantity
+
+    # Function to change the product name of a row.
+    def set_product(self, position, product):
+        self.product_ids[position] = self.name_id(self.products, self.product_positions, product)
+
+    # Function to add the rows of another ShoeColumns object after these rows.
+    # The positions of its names are changed to their positions in the name tables of these columns.
+    def extend(self, columns):
+        country_ids = [self.name_id(self.countries, self.country_positions, name) for name in columns.countries]
+        product_ids = [self.name_id(self.products, self.product_positions, name) for name in columns.products]
+
+        self.codes.extend(columns.codes)
+        for own_ids, ids, new_ids in ((self.country_ids, columns.country_ids, country_ids),
+                                      (self.product_ids, columns.product_ids, product_ids)):
+            # If the names are at the same positions in both tables, the positions don't need to be changed.
+            if new_ids == list(range(len(new_ids))):
+                own_ids.extend(ids)
+            else:
+                own_ids.extend(array("I", map(new_ids.__getitem__, ids)))
+        self.costs.extend(columns.costs)
+        self.quantities.extend(columns.quantities)
+
+    # Function to get a copy of the columns, which doesn't change when these columns are changed.
+    def copy(self):
+        columns = ShoeColumns()
+        columns.codes = list(self.codes)
+        columns.country_ids = array("I", self.country_ids)
+        columns.product_ids = array("I", self.product_ids)
+        columns.costs = array("d", self.costs)
+        columns.quantities = array("q", self.quantities)
+        columns.countries = list(self.countries)
+        columns.products = list(self.products)
+        columns.country_positions = dict(self.country_positions)
+        columns.product_positions = dict(self.product_positions)
+        return columns
+
+
+# ======== The quantity index ==========
+# Definition of class QuantityIndex.
+# It keeps a min heap and a max heap of (quantity, position) entries for the rows of a ShoeColumns object, so
+# the products with the lowest or highest quantities are found without looking at every product.
+# When a quantity changes a new entry is pushed, and the old one is only discarded when it reaches the top of a heap
+# and no longer matches the product's quantity.
+class QuantityIndex:
+
+    # Initialize the columns and build both heaps from their quantities.
+    def __init__(self, columns):
+        self.columns = columns
+        self.rebuild()
+
+    # Function to build both heaps again from the quantities in the columns, discarding all old entries.
+    def rebuild(self):
+        self.min_heap = [(quantity, position) for position, quantity in enumerate(self.columns.quantities)]
+        self.max_heap = [(-quantity, position) for quantity, position in self.min_heap]
+        heapq.heapify(self.min_heap)
+        heapq.heapify(self.max_heap)
+
+    # Function to add an entry for the current quantity of the product in a row.
+    # The heaps are rebuilt if old entries make up more than half of them.
+    def update(self, position):
+        if len(self.min_heap) > 2 * len(self.columns):
+            self.rebuild()
+            return
+        quantity = self.columns.quantities[position]
+        heapq.heappush(self.min_heap, (quantity, position))
+        heapq.heappush(self.max_heap, (-quantity, position))
+
+    # Function to get the positions of the products with the lowest quantities.
+    # If no count is given, all the products tied for the lowest quantity are returned.
+    def lowest(self, count=None):
+        return self.take(self.min_heap, 1, count)
+
+    # Function to get the positions of the products with the highest quantities.
+    # If no count is given, all the products tied for the highest quantity are returned.
+    def highest(self, count=None):
+        return self.take(self.max_heap, -1, count)
+
+    # Function to take entries from the top of a heap until 'count' products, or all the products tied with the first
+    # one, have been found. Old entries are discarded and the valid ones are pushed back after being taken.
+    # The sign is -1 for the max heap, where quantities are stored as negative numbers.
+    def take(self, heap, sign, count):
+        taken = []
+        seen = set()
+
+        while heap and (count is None or len(taken) < count):
+            key, position = heap[0]
+            if self.columns.quantities[position] != sign * key or position in seen:
+                heapq.heappop(heap)
+            elif count is None and taken and taken[0][0] != key:
+                break
+            else:
+                taken.append(heapq.heappop(heap))
+                seen.add(position)
+
+        for entry in taken:
+            heapq.heappush(heap, entry)
+
+        # This function returns a list of positions, in order of quantity and then position.
+        return [position for key, position in taken]
+
+
+# ======== The item values ==========
+# Definition of class ItemValues.
+# It keeps the total value (cost times quantity) of each row of a ShoeColumns object in an array, so the value of every
+# item doesn't have to be calculated again when a single row changes: update only calculates the value of that row.
+# The positions of the rows updated are kept in a log, with a version number for each update, so the views made from
+# the values (see value_per_item) can find the rows that have changed since they were made and only change those.
+class ItemValues:
+
+    # Initialize the columns and calculate the value of every row.
+    def __init__(self, columns):
+        self.columns = columns
+        self.values = array("d", map(operator.mul, columns.costs, columns.quantities))
+        self.version = 0
+        self.log = []
+        self.log_start = 0
+
+    # Function to calculate the value of a row again after it has changed.
+    # Rows appended to the columns since the values were last updated are added too.
+    def update(self, position):
+        while len(self.values) < len(self.columns):
+            self.values.append(self.columns.costs[len(self.values)] * self.columns.quantities[len(self.values)])
+            self.changed(len(self.values) - 1)
+        if position < len(self.values):
+            self.values[position] = self.columns.costs[position] * self.columns.quantities[position]
+            self.changed(position)
+
+    # Function to add the position of a row to the log of updates. The log is emptied once it has more entries than
+    # there are rows, as it is then quicker to make the views again from all the values.
+    def changed(self, position):
+        if len(self.log) > len(self.values):
+            self.log_start += len(self.log)
+            self.log = []
+        self.log.append(position)
+        self.version += 1
+
+    # Function to get the positions of the rows updated since a version, in the order they were updated.
+    # This function returns None if the log no longer goes back to that version.
+    def changes_since(self, version):
+        if version < self.log_start:
+            return None
+        return self.log[version - self.log_start:]
+
+
+# ======== The view cache ==========
+# Definition of class ViewCache.
+# It keeps the output of the views of an inventory, such as the rendered tables of the menu, with the revision of the
+# inventory they were made from (see InventoryStore.revision), so a view of an inventory that hasn't changed is not
+# made again. The revision changes with every change to the inventory, which makes the views made before it out of
+# date. The views used the longest time ago are dropped once there are more than VIEW_CACHE_SIZE.
+# A view can also keep a state with its output, which is given back to it when it has to be made again, so it can
+# only change what has changed since (see value_per_item).
+class ViewCache:
+
+    # Initialize the maximum number of views and the empty cache.
+    def __init__(self, size=VIEW_CACHE_SIZE):
+        self.size = size
+        self.views = {}
+
+    # Function to get the output of a view for a revision of the inventory.
+    # This function takes in the key of the view (e.g. ("lowest", 5)), the revision and a function that makes the
+    # view: it is called with the state kept the last time the view was made (None the first time) and returns the
+    # output and the state to keep. It is only called if the view has not been made for this revision yet.
+    def get(self, key, revision, render):
+        entry = self.views.pop(key, None)
+        if entry is not None and entry[0] == revision:
+            count("views reused")
+            output, state = entry[1], entry[2]
+        else:
+            output, state = render(None if entry is None else entry[2])
+        self.views[key] = (revision, output, state)
+
+        # Dictionaries keep the order in which keys were added, so the first key is the view used the longest time ago.
+        while len(self.views) > self.size:
+            del self.views[next(iter(self.views))]
+        return output
+
+
+# ======== The search index ==========
+# Definition of class SearchIndex.
+# It finds the rows of a ShoeColumns object by the words in their country and product names, or by their code, without
+# looking at every row:
+#   The names are split into words (see name_words), and each word is kept with the positions of the countries and
+#   products whose names contain it. The tables of names are much smaller than the inventory.
+#   The positions of the rows of each country and product are kept in order, in an array per name.
+#   The codes are kept sorted, with the position of each row, so the codes starting with a prefix (e.g. 'SKU44*') or
+#   between two codes are found with a binary search.
+# When the product of a row changes, its position is added to the array of the new product. The old entry is left in
+# the array of the old product, and is skipped by the searches as it no longer matches.
+class SearchIndex:
+
+    # Initialize the columns and build the index from them.
+    def __init__(self, columns):
+        self.columns = columns
+        self.rebuild()
+
+    # Function to build the index again from the columns, discarding all old entries.
+    def rebuild(self):
+        self.words = {}
+        self.sorted_words = []
+        self.country_rows = []
+        self.product_rows = []
+        self.add_names()
+
+        for rows, name_ids in ((self.country_rows, self.columns.country_ids),
+                               (self.product_rows, self.columns.product_ids)):
+            appends = [positions.append for positions in rows]
+            for position, name_id in enumerate(name_ids):
+                appends[name_id](position)
+
+        order = sorted(range(len(self.columns)), key=self.columns.codes.__getitem__)
+        self.codes = [self.columns.codes[position] for position in order]
+        self.code_positions = array("I", order)
+        self.rows = len(self.columns)
+
+    # Function to add the words of the names added to the tables of names since they were last indexed.
+    def add_names(self):
+        for kind, names, rows in ((0, self.columns.countries, self.country_rows),
+                                  (1, self.columns.products, self.product_rows)):
+            for name_id in range(len(rows), len(names)):
+                rows.append(array("I"))
+                for word in name_words(names[name_id]):
+                    if word not in self.words:
+                        self.words[word] = (set(), set())
+                        bisect.insort(self.sorted_words, word)
+                    self.words[word][kind].add(name_id)
+
+    # Function to add a position to a sorted array of positions, if it is not in it yet.
+    @staticmethod
+    def insert(positions, position):
+        at = bisect.bisect_left(positions, position)
+        if at == len(positions) or positions[at] != position:
+            positions.insert(at, position)
+
+    # Function to update the index after a row has been added or its country or product has changed.
+    # Rows appended to the columns since the index was last updated are added too.
+    def update(self, position):
+        self.add_names()
+        while self.rows < len(self.columns):
+            at = bisect.bisect_right(self.codes, self.columns.codes[self.rows])
+            self.codes.insert(at, self.columns.codes[self.rows])
+            self.code_positions.insert(at, self.rows)
+            self.update_names(self.rows)
+            self.rows += 1
+        if position < self.rows:
+            self.update_names(position)
+
+    # Function to add a row to the arrays of its country and product.
+    def update_names(self, position):
+        self.insert(self.country_rows[self.columns.country_ids[position]], position)
+        self.insert(self.product_rows[self.columns.product_ids[position]], position)
+
+    # Function to get the positions of the rows that match a search, e.g. 'air max vietnam', 'jord*' or 'SKU44*'.
+    # Each word of the search has to be in the country or product name of a row, ignoring case and accents.
+    # A word ending in '*' matches every word starting with it.
+    # A word starting with 'SKU' selects the rows by code instead: an exact code, a prefix ending in '*', or a range
+    # of codes such as 'SKU44000-SKU44999'.
+    # This function returns at most 'limit' positions (all of them if no limit is given), in order of code if the
+    # search has a code and in the order of the inventory otherwise.
+    @timed("search")
+    def search(self, text, limit=None):
+        count("searches")
+        terms = []
+        code_ranges = []
+
+        for word in text.split():
+            if word.upper().startswith("SKU"):
+                code_ranges.append(code_range(word.upper()))
                 continue
-            elif line_count == 0 and line != "Country,Code,Product,Cost,Quantity\n":
-                errors = True
-                error_description += "\n\nLine 1 should be equal to: 'Country,Code,Product,Cost,Quantity'." \
-                                     "\nAny product information on line 1 will be ignored by the program."
-
-            # For all the other lines in the list:
-            # Check if they have empty fields and if fields cost and quantity are numbers.
-            # If errors are found, add the line and field numbers to the line_description list.
+
+            words = name_words(word)
+            for number, name_word in enumerate(words):
+                # Find the countries and products with the word, or with a word starting with it.
+                if number == len(words) - 1 and word.endswith("*"):
+                    start = bisect.bisect_left(self.sorted_words, name_word)
+                    end = bisect.bisect_left(self.sorted_words, name_word + chr(0x10FFFF))
+                    matches = self.sorted_words[start:end]
+                else:
+                    matches = [name_word] if name_word in self.words else []
+                if not matches:
+                    return []
+                terms.append((set().union(*(self.words[match][0] for match in matches)),
+                              set().union(*(self.words[match][1] for match in matches))))
+
+        if not terms and not code_ranges:
+            return []
+
+        # Go through the rows of the first range of codes or, if there is none, the rows of the countries and products
+        # of the word with the fewest rows. Every row that matches the search is among them.
+        if code_ranges:
+            low, high = code_ranges[0]
+            candidates = self.code_positions[bisect.bisect_left(self.codes, low):
+                                             bisect.bisect_right(self.codes, high)]
+        else:
+            countries, products = min(terms, key=self.term_size)
+            candidates = unique_positions(heapq.merge(*(self.country_rows[name_id] for name_id in countries),
+                                                      *(self.product_rows[name_id] for name_id in products)))
+
+        codes = self.columns.codes
+        country_ids = self.columns.country_ids
+        product_ids = self.columns.product_ids
+        found = (position for position in candidates
+                 if all(country_ids[position] in countries or product_ids[position] in products
+                        for countries, products in terms)
+                 and all(low <= codes[position] <= high for low, high in code_ranges))
+        return list(itertools.islice(found, limit))
+
+    # Function to get the number of rows (including old entries) in the arrays of the countries and products of a
+    # word of a search.
+    def term_size(self, term):
+        countries, products = term
+        return (sum(len(self.country_rows[name_id]) for name_id in countries) +
+                sum(len(self.product_rows[name_id]) for name_id in products))
+
+
+# Function to get the lowest and highest codes matched by a code in a search: an exact code, a prefix ending in '*'
+# (e.g. 'SKU44*') or a range of codes (e.g. 'SKU44000-SKU44999').
+def code_range(word):
+
+    if word.endswith("*"):
+        return word[:-1], word[:-1] + chr(0x10FFFF)
+    low, _, high = word.partition("-")
+    return low, high or low
+
+
+# Function to go through sorted positions, skipping those that are repeated.
+def unique_positions(positions):
+
+    previous = None
+    for position in positions:
+        if position != previous:
+            yield position
+            previous = position
+
+
+# ======== The reorder engine ==========
+# Definition of class ReorderEngine.
+# It keeps the set of rows of a ShoeColumns object whose quantity is at or below their reorder point, so the products
+# to reorder are found without looking at every row. Each product is reordered up to a target quantity.
+# The reorder point and target of a product are those in the thresholds given for its code (see read_thresholds), or
+# REORDER_POINT and REORDER_TARGET. When a quantity changes, update checks only that row, so the set stays up to date.
+class ReorderEngine:
+
+    # Initialize the columns and the thresholds, a dictionary from code to (reorder point, target quantity), and build
+    # the set of rows to reorder.
+    def __init__(self, columns, thresholds=None, point=REORDER_POINT, target=REORDER_TARGET):
+        self.columns = columns
+        self.thresholds = dict(thresholds or {})
+        self.default = (point, target)
+        self.rebuild()
+
+    # Function to build the set of rows to reorder again from the columns.
+    # The rows are checked against the default reorder point all at once, and then the rows of the codes with their
+    # own thresholds are checked again.
+    def rebuild(self):
+        point = self.default[0]
+        self.below = {position for position, quantity in enumerate(self.columns.quantities) if quantity <= point}
+
+        # Find the row of each code with its own thresholds. If a code is repeated, the first row with it is used.
+        self.custom = {}
+        if self.thresholds:
+            found = set()
+            for position, code in enumerate(self.columns.codes):
+                if code in self.thresholds and code not in found:
+                    found.add(code)
+                    self.custom[position] = self.thresholds[code]
+        for position in self.custom:
+            self.check(position)
+        self.rows = len(self.columns)
+
+    # Function to get the reorder point and target quantity of a row.
+    def threshold(self, position):
+        return self.custom.get(position, self.default)
+
+    # Function to add a row to the set of rows to reorder, or remove it, according to its current quantity.
+    def check(self, position):
+        if self.columns.quantities[position] <= self.threshold(position)[0]:
+            self.below.add(position)
+        else:
+            self.below.discard(position)
+
+    # Function to update the set after the quantity of a row has changed.
+    # Rows appended to the columns since the set was last updated are checked too.
+    def update(self, position):
+        while self.rows < len(self.columns):
+            code = self.columns.codes[self.rows]
+            if code in self.thresholds:
+                self.custom[self.rows] = self.thresholds[code]
+            self.check(self.rows)
+            self.rows += 1
+        if position < self.rows:
+            self.check(position)
+
+    # Function to get the restocks that bring the rows to reorder up to their target quantity.
+    # This function returns a list of (position, amount) for at most 'count' rows (all of them if no count is given),
+    # the rows furthest below their reorder point first.
+    def plan(self, count=None):
+        quantities = self.columns.quantities
+
+        def urgency(position):
+            return quantities[position] - self.threshold(position)[0], position
+
+        if count is None:
+            positions = sorted(self.below, key=urgency)
+        else:
+            positions = heapq.nsmallest(count, self.below, key=urgency)
+        plan = []
+        for position in positions:
+            amount = self.threshold(position)[1] - quantities[position]
+            if amount > 0:
+                plan.append((position, amount))
+        return plan
+
+
+# Function to get the name of the file with the reorder points of an inventory, e.g. 'inventory.txt.reorder'.
+def thresholds_file_name(file_name):
+
+    return file_name + ".reorder"
+
+
+# Function to get the inode, modification time and size of the file with the reorder points, or None if there isn't one,
+# to know when it has been changed by another program.
+def thresholds_signature(file_name):
+
+    try:
+        file_stats = os.stat(thresholds_file_name(file_name))
+    except FileNotFoundError:
+        return None
+    return file_stats.st_mtime_ns, file_stats.st_size
+
+
+# Function to read the reorder points and target quantities of the products that have their own.
+# The file is a CSV file with the titles 'Code,Reorder point,Target quantity' and a line per product.
+# This function returns a dictionary from code to (reorder point, target quantity). Lines that aren't valid are
+# skipped, with a message.
+def read_thresholds(file_name):
+
+    thresholds = {}
+    try:
+        with open(thresholds_file_name(file_name), "r") as thresholds_file:
+            lines = thresholds_file.read().splitlines()
+    except FileNotFoundError:
+        return thresholds
+
+    for line_number, line in enumerate(lines[1:], 2):
+        fields = line.split(",")
+        if (len(fields) == 3 and is_valid_sku(fields[0]) and fields[1].isdigit() and fields[2].isdigit()
+                and int(fields[1]) < int(fields[2])):
+            thresholds[fields[0]] = (int(fields[1]), int(fields[2]))
+        elif line.strip():
+            print(f"Line {line_number} of '{thresholds_file_name(file_name)}' is not valid and has been skipped.")
+    return thresholds
+
+
+# Function to save the reorder points and target quantities of the products that have their own, in the file read by
+# read_thresholds. This function takes in the name of the inventory file and the dictionary of thresholds.
+def save_thresholds(file_name, thresholds):
+
+    lines = ["Code,Reorder point,Target quantity"]
+    lines += [f"{code},{point},{target}" for code, (point, target) in sorted(thresholds.items())]
+    save_file(thresholds_file_name(file_name), text_chunks(lines), backups=0)
+
+
+# ======== The sale rules ==========
+# Operators that can be used in the conditions of a sale rule. Names and codes can only be compared with '=' and '!='.
+SALE_OPERATORS = {"=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt,
+                  ">=": operator.ge}
+
+
+# Definition of class SaleRule.
+# It puts on sale (or takes off sale) the products that match conditions on their country, product, code, cost and
+# quantity, e.g. '20% off where quantity > 50 and country = Vietnam', or 'end where product = Air Max 90'.
+# The conditions are checked on whole columns at once. With NumPy (see sources 10 and 22), each condition gives an
+# array of True or False for every row, and the arrays are combined; without it, the rows are filtered by one condition
+# after another. Conditions on country and product names are checked on the tables of names, which are much smaller
+# than the inventory, and then on the position of the name of each row.
+# The sale status and original cost of the products on sale are kept in a file of their own (see read_sales), so the
+# product names are not changed. Discounts are taken from the original cost, so two rules don't add up.
+class SaleRule:
+
+    # Initialize the discount, in percent (None for a rule that takes products off sale), and the conditions, a list
+    # of (field, operator, value).
+    def __init__(self, percent=None, conditions=()):
+        self.percent = percent
+        self.conditions = list(conditions)
+
+    # Function to read a rule from its text: a discount (e.g. '20% off') or 'end', optionally followed by 'where' and
+    # conditions separated by 'and', e.g. 'quantity > 50 and country = Vietnam'. Numbers can be compared with '=',
+    # '!=', '<', '<=', '>' and '>=', and names and codes with '=' and '!=', ignoring case and accents.
+    # A ValueError is raised, with a message for the user, if the rule is not valid.
+    @staticmethod
+    def parse(text):
+        match = re.fullmatch(r"\s*(?:(\d+(?:\.\d+)?)\s*%\s*off|(end))(?:\s+where\s+(.*))?\s*", text,
+                             re.IGNORECASE | re.DOTALL)
+        if match is None:
+            raise ValueError("A rule starts with a discount (e.g. '20% off') or 'end', and can be followed by 'where' "
+                             "and conditions, e.g. '20% off where quantity > 50 and country = Vietnam'.")
+
+        percent = None if match.group(2) else to_number(match.group(1))
+        if percent is not None and not 0 < percent < 100:
+            raise ValueError("The discount must be more than 0% and less than 100%.")
+
+        conditions = []
+        for condition in re.split(r"\s+and\s+", match.group(3), flags=re.IGNORECASE) if match.group(3) else []:
+            parts = re.fullmatch(r"\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*", condition)
+            if parts is None or parts.group(1).lower() not in ("country", "product", "code", "cost", "quantity"):
+                raise ValueError(f"'{condition}' is not a valid condition. Conditions are on the country, product, "
+                                 f"code, cost or quantity, e.g. 'quantity > 50' or 'country = Vietnam'.")
+
+            field, operation, value = parts.group(1).lower(), parts.group(2), parts.group(3)
+            if field in ("cost", "quantity"):
+                if not is_float(value):
+                    raise ValueError(f"The {field} in '{condition}' must be a number.")
+                value = float(value)
+            elif operation not in ("=", "!="):
+                raise ValueError(f"The {field} in '{condition}' can only be compared with '=' or '!='.")
+            else:
+                value = value.upper() if field == "code" else normalize_country(value)
+            conditions.append((field, operation, value))
+        return SaleRule(percent, conditions)
+
+    # Function to get the positions of the rows that match every condition, in the order of the inventory.
+    @timed("sale rule")
+    def matches(self, columns):
+        numpy = import_numpy()
+        selected = numpy.ones(len(columns), dtype=bool) if numpy is not None else range(len(columns))
+
+        for field, operation, value in self.conditions:
+            compare = SALE_OPERATORS[operation]
+            if field in ("country", "product"):
+                # Find the names that match, and then the rows with one of them.
+                names, ids = ((columns.countries, columns.country_ids) if field == "country" else
+                              (columns.products, columns.product_ids))
+                name_ids = {name_id for name_id, name in enumerate(names) if compare(normalize_country(name), value)}
+                if numpy is not None:
+                    selected &= numpy.isin(numpy.frombuffer(ids, dtype=numpy.uint32),
+                                           numpy.fromiter(name_ids, dtype=numpy.uint32, count=len(name_ids)))
+                else:
+                    selected = [position for position in selected if ids[position] in name_ids]
+
+            elif field == "code":
+                if numpy is not None:
+                    selected &= numpy.fromiter((compare(code, value) for code in columns.codes), dtype=bool,
+                                               count=len(columns))
+                else:
+                    selected = [position for position in selected if compare(columns.codes[position], value)]
+
+            else:
+                column = columns.costs if field == "cost" else columns.quantities
+                if numpy is not None:
+                    selected &= compare(numpy.frombuffer(column, dtype=numpy.float64 if field == "cost" else
+                                                         numpy.int64), value)
+                else:
+                    selected = [position for position in selected if compare(column[position], value)]
+
+        return numpy.flatnonzero(selected).tolist() if numpy is not None else list(selected)
+
+    # Function to get the changes of cost made by the rule, from the columns and the products on sale (see
+    # read_sales). This function returns a list of (position, new cost, original cost), where the original cost is
+    # None for a product taken off sale. Products whose cost doesn't change are left out.
+    def plan(self, columns, sales):
+        plan = []
+        for position in self.matches(columns):
+            cost = columns.costs[position]
+            original, sale_cost = sales.get(columns.codes[position], (None, None))
+
+            # A product is only on sale while it has the cost it was put on sale at. If it has been repriced since,
+            # its cost is its original cost.
+            if sale_cost != cost:
+                original = None
+
+            if self.percent is None:
+                if original is not None:
+                    plan.append((position, original, None))
+            else:
+                original = to_number(cost) if original is None else original
+                sale_cost = to_number(round(original * (100 - self.percent) / 100, 2))
+                if sale_cost != cost and sale_cost > 0:
+                    plan.append((position, sale_cost, original))
+        return plan
+
+
+# Function to get the name of the file with the products on sale of an inventory, e.g. 'inventory.txt.sales'.
+def sales_file_name(file_name):
+
+    return file_name + ".sales"
+
+
+# Function to read the products on sale: a CSV file with the titles 'Code,Original cost,Sale cost' and a line per
+# product. The sale cost is kept to know if the product has been repriced since it was put on sale.
+# This function returns a dictionary from code to (original cost, sale cost). Lines that aren't valid are skipped.
+def read_sales(file_name):
+
+    sales = {}
+    try:
+        with open(sales_file_name(file_name), "r") as sales_file:
+            lines = sales_file.read().splitlines()
+    except FileNotFoundError:
+        return sales
+
+    for line in lines[1:]:
+        fields = line.split(",")
+        if len(fields) == 3 and is_float(fields[1]) and is_float(fields[2]):
+            sales[fields[0]] = (to_number(float(fields[1])), to_number(float(fields[2])))
+    return sales
+
+
+# Function to save the products on sale in the file read by read_sales.
+# This function takes in the name of the inventory file and the dictionary of products on sale.
+def save_sales(file_name, sales):
+
+    lines = ["Code,Original cost,Sale cost"]
+    lines += [f"{code},{original},{cost}" for code, (original, cost) in sorted(sales.items())]
+    save_file(sales_file_name(file_name), text_chunks(lines), backups=0)
+
+
+# ======== The binary snapshot ==========
+# Definition of class BinarySnapshot.
+# It reads an inventory saved in the binary format written by write_binary, through a memory map of the file, so
+# products can be looked up by code without reading the whole file.
+# The file is made of:
+#   A header with the number of rows and the position of each section in the file.
+#   Two tables of names, for countries and products: the number of names, the positions where each name starts and
+#   ends, and the names encoded as UTF-8.
+#   A column per field, with a fixed width per row: codes (padded to BINARY_CODE_WIDTH bytes), country and product
+#   positions in the tables of names (4 bytes), costs (8 byte floats) and quantities (8 byte integers).
+#   The positions of the rows sorted by code (8 bytes), which are used to find a code with a binary search.
+# All numbers are stored in little-endian byte order.
+class BinarySnapshot:
+
+    # Initialize the snapshot by opening the file, mapping it into memory and reading its header.
+    # A ValueError is raised if the file is not an inventory in the binary format.
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, "rb") as file:
+            self.memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.memory) < BINARY_HEADER.size or self.memory[:8] != BINARY_MAGIC:
+            self.close()
+            raise ValueError(f"'{file_name}' is not an inventory binary snapshot.")
+
+        (magic, version, code_width, self.rows, self.countries_at, self.products_at, self.codes_at,
+         self.country_ids_at, self.product_ids_at, self.costs_at, self.quantities_at,
+         self.sorted_at) = BINARY_HEADER.unpack_from(self.memory, 0)
+
+        if version != BINARY_VERSION or code_width != BINARY_CODE_WIDTH:
+            self.close()
+            raise ValueError(f"'{file_name}' was saved with an unsupported version of the binary format.")
+
+    # Functions to use the snapshot in a 'with' statement, which closes it at the end.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    # Function to close the memory map of the file.
+    def close(self):
+        self.memory.close()
+
+    # Function to get the number of rows.
+    def __len__(self):
+        return self.rows
+
+    # Function to read one name from a table of names, without reading the rest of the table.
+    def name(self, table_at, position):
+        count = struct.unpack_from("<Q", self.memory, table_at)[0]
+        start, end = struct.unpack_from("<QQ", self.memory, table_at + 8 + 8 * position)
+        names_at = table_at + 8 + 8 * (count + 1)
+        return self.memory[names_at + start: names_at + end].decode("utf-8")
+
+    # Function to read the code in a row.
+    def code(self, position):
+        start = self.codes_at + BINARY_CODE_WIDTH * position
+        return self.memory[start: start + BINARY_CODE_WIDTH].rstrip(b"\0").decode("ascii")
+
+    # Function to read a row as a Shoe object.
+    def __getitem__(self, position):
+        if not 0 <= position < self.rows:
+            raise IndexError("row out of range")
+        country_id = struct.unpack_from("<I", self.memory, self.country_ids_at + 4 * position)[0]
+        product_id = struct.unpack_from("<I", self.memory, self.product_ids_at + 4 * position)[0]
+        cost = struct.unpack_from("<d", self.memory, self.costs_at + 8 * position)[0]
+        quantity = struct.unpack_from("<q", self.memory, self.quantities_at + 8 * position)[0]
+        return Shoe(self.name(self.countries_at, country_id), self.code(position),
+                    self.name(self.products_at, product_id), cost, quantity)
+
+    # Function to find a Shoe object by its code, with a binary search over the rows sorted by code.
+    # This function returns None if the code is not in the snapshot.
+    def find(self, code):
+        low, high = 0, self.rows
+        while low < high:
+            middle = (low + high) // 2
+            position = struct.unpack_from("<Q", self.memory, self.sorted_at + 8 * middle)[0]
+            if self.code(position) < code:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.rows:
+            position = struct.unpack_from("<Q", self.memory, self.sorted_at + 8 * low)[0]
+            if self.code(position) == code:
+                return self[position]
+        return None
+
+    # Function to read a column of numbers into an array.
+    def read_array(self, type_code, start, count):
+        column = array(type_code)
+        column.frombytes(self.memory[start: start + column.itemsize * count])
+        if sys.byteorder == "big":
+            column.byteswap()
+        return column
+
+    # Function to read a whole table of names into a list.
+    def read_names(self, table_at):
+        count = struct.unpack_from("<Q", self.memory, table_at)[0]
+        offsets = self.read_array("Q", table_at + 8, count + 1)
+        names_at = table_at + 8 + 8 * (count + 1)
+        names = self.memory[names_at: names_at + offsets[-1]]
+        return [names[offsets[position]: offsets[position + 1]].decode("utf-8") for position in range(count)]
+
+    # Function to read the whole snapshot into a ShoeColumns object.
+    # The columns of numbers are copied from the file as they are, without converting each value.
+    def to_columns(self):
+        columns = ShoeColumns()
+        columns.countries = self.read_names(self.countries_at)
+        columns.products = self.read_names(self.products_at)
+        columns.country_positions = {name: position for position, name in enumerate(columns.countries)}
+        columns.product_positions = {name: position for position, name in enumerate(columns.products)}
+        columns.country_ids = self.read_array("I", self.country_ids_at, self.rows)
+        columns.product_ids = self.read_array("I", self.product_ids_at, self.rows)
+        columns.costs = self.read_array("d", self.costs_at, self.rows)
+        columns.quantities = self.read_array("q", self.quantities_at, self.rows)
+
+        codes = self.memory[self.codes_at: self.codes_at + BINARY_CODE_WIDTH * self.rows]
+        columns.codes = [codes[start: start + BINARY_CODE_WIDTH].rstrip(b"\0").decode("ascii")
+                         for start in range(0, len(codes), BINARY_CODE_WIDTH)]
+        return columns
+
+
+# ======== The inventory stores ==========
+# Definition of class InventoryStore.
+# It is the interface used by the rest of the program to read and change the inventory, whichever way it is stored.
+# There are two kinds of store:
+#   TextFileInventory, which keeps the inventory in a text file ('inventory.txt') and in memory.
+#   SQLiteInventory, which keeps it in an SQLite database ('inventory.db') and only reads the rows needed.
+# Use open_inventory to get the store for a file name.
+class InventoryStore:
+
+    file_name = None
+
+    # Whether reading the store waits for files or a database to be read (e.g. a query), so a program that has to keep
+    # answering while it reads (e.g. the server) reads it in another thread.
+    blocking_reads = False
+
+    # Function to make sure the inventory can be read and has the latest changes.
+    # This function returns False if the inventory can't be read (and, if the store is interactive, the user has
+    # chosen to exit the program instead of fixing it).
+    def refresh(self):
+        raise NotImplementedError
+
+    # Function to get every row of the inventory as a ShoeColumns object, which can be used like a list.
+    def columns(self):
+        raise NotImplementedError
+
+    # Function to find a Shoe object by its code.
+    # This function returns None if the code is not in the inventory.
+    def find(self, code):
+        raise NotImplementedError
+
+    # Functions to get the Shoe objects with the lowest and highest quantities, in the order of the inventory when
+    # they are tied. If no count is given, all the products tied for the lowest (or highest) quantity are returned.
+    def lowest(self, count=None):
+        raise NotImplementedError
+
+    def highest(self, count=None):
+        raise NotImplementedError
+
+    # Function to find the Shoe objects whose country and product names have all the words of a search, or whose code
+    # matches it, e.g. 'air max vietnam' or 'SKU44*'. See SearchIndex.search.
+    # This function returns at most 'limit' Shoe objects (all of them if no limit is given).
+    def search(self, text, limit=None):
+        raise NotImplementedError
+
+    # Function to get the revision of the inventory, which changes every time the inventory changes. It is used as the
+    # key of the views in the ViewCache of the store ('views').
+    def revision(self):
+        raise NotImplementedError
+
+    # Function to get the ItemValues of the inventory. It is built again when the rows have been read again, and is
+    # otherwise kept up to date as rows change.
+    def item_values(self):
+        columns = self.columns()
+        if self.values is None or self.values.columns is not columns:
+            with timed("calculate item values"):
+                self.values = ItemValues(columns)
+        return self.values
+
+    # Function to get the ReorderEngine of the inventory. It is built again when the rows have been read again or the
+    # file with the reorder points has been changed, and is otherwise kept up to date as quantities change.
+    def reorder_engine(self):
+        columns = self.columns()
+        signature = thresholds_signature(self.file_name)
+        if self.reorder is None or self.reorder.columns is not columns or signature != self.reorder_signature:
+            with timed("build reorder engine"):
+                self.reorder = ReorderEngine(columns, read_thresholds(self.file_name))
+            self.reorder_signature = signature
+        return self.reorder
+
+    # Function to get the plan to restock the products at or below their reorder point. See ReorderEngine.plan.
+    # This function returns a list of (Shoe object, reorder point, target quantity, amount to order) for at most
+    # 'count' products (all of them if no count is given), the products furthest below their reorder point first.
+    # The plan is made with a single write by passing its restocks to apply_changes.
+    def reorder_plan(self, count=None):
+        engine = self.reorder_engine()
+        columns = engine.columns
+        return [(columns[position], *engine.threshold(position), amount) for position, amount in engine.plan(count)]
+
+    # Function to change the reorder points and target quantities of products, given as a dictionary from code to
+    # (reorder point, target quantity). A product given None goes back to REORDER_POINT and REORDER_TARGET.
+    def set_thresholds(self, thresholds):
+        saved = read_thresholds(self.file_name)
+        for code, threshold in thresholds.items():
+            if threshold is None:
+                saved.pop(code, None)
             else:
-                line = line.strip("\n").split(",")
-
-                line_errors = False
-                line_description = {"line": str(line_count + 1), "empty fields": [], "not number": []}
-
-                for item_count, item in enumerate(line):
-                    if item == "":
-                        line_errors = True
-                        line_description["empty fields"].append(str(item_count + 1))
-
-                    if item_count == 3 or item_count == 4:
-                        if not item.isdigit():
-                            line_errors = True
-                            line_description["not number"].append(str(item_count + 1))
-
-                # Add information in line_description list to the error description.
-                if line_errors:
-                    errors = line_errors
-                    description.append(line_description)
-
-        # Format the error message for printing.
-        for item in description:
-            error_description += f"\n\nLine: {item['line']}"
-            if item["empty fields"]:
-                error_description += f"\n\tEmpty fields: {', '.join(item['empty fields'])}"
-            if item["not number"]:
-                error_description += f"\n\tValue is not a number: {', '.join(item['not number'])}"
+                saved[code] = threshold
+        save_thresholds(self.file_name, saved)
+
+    # Function to get the changes of cost made by a SaleRule, without making them, e.g. to preview them.
+    # This function returns a list of (Shoe object, new cost, original cost), where the original cost is None for a
+    # product taken off sale.
+    def sale_plan(self, rule):
+        columns = self.columns()
+        return [(columns[position], cost, original)
+                for position, cost, original in rule.plan(columns, read_sales(self.file_name))]
+
+    # Function to make the changes of cost of a sale plan, from sale_plan or a list in the same format.
+    # The sale status and original cost of the products are saved in the file of sales first, and then all the new
+    # costs are saved with a single call to apply_changes. The product names are not changed.
+    # The file of sales is changed while holding its lock, so two programs don't change it at the same time.
+    # This function returns the results of apply_changes.
+    def apply_sale(self, plan):
+        with open(sales_file_name(self.file_name) + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+            sales = read_sales(self.file_name)
+            for shoe, cost, original in plan:
+                if original is None:
+                    sales.pop(shoe.code, None)
+                else:
+                    sales[shoe.code] = (original, cost)
+            save_sales(self.file_name, sales)
+            return self.apply_changes([("reprice", shoe.code, cost, shoe.product) for shoe, cost, _ in plan])
+
+    # Function to add a new Shoe object to the inventory.
+    def add(self, shoe):
+        self.add_many([shoe])
+
+    # Function to add a list of new Shoe objects to the inventory.
+    # A ValueError is raised, and no shoes are added, if a code is already in the inventory.
+    def add_many(self, shoes):
+        raise NotImplementedError
+
+    # Function to make a list of changes to the inventory at once, so they are saved with a single write.
+    # Each change is a tuple: ("restock", code, amount) to add an amount of stock to the latest quantity of a product,
+    # or ("reprice", code, cost, product) to change its cost and product name.
+    # This function returns a list with the result of each change: the new quantity for a restock, None for a
+    # reprice, or a KeyError if the code is not in the inventory (the other changes are still made).
+    def apply_changes(self, changes):
+        raise NotImplementedError
+
+    # Function to add an amount of stock to the latest quantity of a product.
+    # This function takes in the product code and the amount, and returns the new quantity.
+    # A KeyError is raised if the code is not in the inventory.
+    def restock(self, code, amount):
+        return change_result(self.apply_changes([("restock", code, amount)])[0])
+
+    # Function to change the cost and product name of a product.
+    # A KeyError is raised if the code is not in the inventory.
+    def reprice(self, code, cost, product):
+        change_result(self.apply_changes([("reprice", code, cost, product)])[0])
+
+    # Function to wait for any changes still being saved in the background.
+    def wait(self):
+        pass
+
+    # Function to read the store in a 'with' statement while another thread may change it, e.g.
+    # 'with inventory.reading(): report = inventory_report(inventory.columns())', so the rows and indexes read don't
+    # change in the meantime.
+    def reading(self):
+        return contextlib.nullcontext()
+
+
+# Function to get the result of a change made with apply_changes, raising the error if the change failed.
+def change_result(result):
+
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+# Function to check the values of a change for apply_changes before it is made: the amount of a restock must be a whole
+# number, and a reprice must have a cost that can be saved (see is_valid_cost) and a product name without commas.
+# This function returns a ValueError describing the problem, or None if the change can be made.
+# A ValueError is raised for a change that is not a restock or a reprice.
+def change_error(operation, code, values):
+
+    if operation == "restock":
+        amount = values[0]
+        if isinstance(amount, bool) or not isinstance(amount, int) or abs(amount) > MAX_QUANTITY:
+            return ValueError(f"The amount of stock added to {code} must be a whole number.")
+    elif operation == "reprice":
+        if not is_valid_cost(values[0]):
+            return ValueError(f"The cost of {code} must be a positive number without an exponent.")
+        if not isinstance(values[1], str) or not values[1] or "," in values[1] or "\n" in values[1]:
+            return ValueError(f"The product name of {code} can't be empty or have commas.")
+    else:
+        raise ValueError(f"Unknown change '{operation}'.")
+    return None
+
+
+# Function to check the quantity a product would have after a restock, which must be from 0 to MAX_QUANTITY.
+# This function returns a ValueError describing the problem, or None if the quantity can be saved.
+def quantity_error(code, quantity):
+
+    if not 0 <= quantity <= MAX_QUANTITY:
+        return ValueError(f"The quantity of {code} can't be {quantity}.")
+    return None
+
+
+# Function to check a new Shoe object can be saved: its names must not be empty or have commas, its cost must be valid
+# (see is_valid_cost) and its quantity from 0 to MAX_QUANTITY.
+# This function returns a ValueError describing the problem, or None if the shoe can be saved.
+def shoe_error(shoe):
+
+    for name in (shoe.country, shoe.code, shoe.product):
+        if not name or "," in name or "\n" in name:
+            return ValueError(f"The names of product {shoe.code} can't be empty or have commas.")
+    if not is_valid_cost(shoe.cost):
+        return ValueError(f"The cost of {shoe.code} must be a positive number without an exponent.")
+    return quantity_error(shoe.code, shoe.quantity)
+
+
+# Definition of class ChangeBatch.
+# It collects the restocks entered for one menu action (see re_stock) and saves them with a single call to
+# apply_changes, so the file is locked and written once instead of once per restock. Restocks of the same product are
+# added up. Only the changed rows are saved either way: the text store appends them to its journal, and the SQLite
+# store updates their rows.
+class ChangeBatch:
+
+    # Initialize the store and the empty amounts of stock to add, by product code.
+    def __init__(self, store):
+        self.store = store
+        self.amounts = {}
+
+    # Function to get the number of products with restocks that haven't been saved.
+    def __len__(self):
+        return len(self.amounts)
+
+    # Function to add an amount of stock to a product.
+    # This function returns the quantity the product will have once the batch is saved, if no other program changes it
+    # in the meantime. A KeyError is raised if the code is not in the store, and a ValueError if the amount is not a
+    # whole number or the quantity would be out of range (see quantity_error). The batch is unchanged then.
+    def restock(self, code, amount):
+        shoe = self.store.find(code)
+        if shoe is None:
+            raise KeyError(code)
+        amount = self.amounts.get(code, 0) + amount
+        error = change_error("restock", code, (amount,)) or quantity_error(code, shoe.quantity + amount)
+        if error is not None:
+            raise error
+        self.amounts[code] = amount
+        return shoe.quantity + amount
+
+    # Function to save the restocks with a single call to apply_changes. The batch is empty afterwards.
+    # This function returns a dictionary with the result of each product: its saved quantity, which includes the stock
+    # added by other programs, or the exception if it could not be saved (e.g. a KeyError for a product deleted by
+    # another program, or a ValueError if the quantity would be too large).
+    def commit(self):
+        changes = [("restock", code, amount) for code, amount in self.amounts.items()]
+        results = {}
+        if changes:
+            for (_, code, _), result in zip(changes, self.store.apply_changes(changes)):
+                results[code] = result
+
+        self.amounts = {}
+        return results
+
+
+# Function to get the store for an inventory file: an SQLiteInventory for a database file ('.db', '.sqlite' or
+# '.sqlite3'), or a TextFileInventory for any other file.
+def open_inventory(file_name="inventory.txt", interactive=True):
+
+    if os.path.splitext(file_name)[1].lower() in SQLITE_EXTENSIONS:
+        return SQLiteInventory(file_name, interactive=interactive)
+    return TextFileInventory(file_name, interactive=interactive)
+
+
+# Definition of class TextFileInventory.
+# It keeps the Shoe objects read from the inventory file in memory, so the file is only read again
+# when it has been changed on disk since the last time this program read or wrote it.
+# Changes are not written over the whole file. Each one is appended as a record to a journal file next to it,
+# which is replayed on load and compacted into a new 'inventory.txt' in the background once it grows too large.
+# If there is a binary snapshot of the file ('inventory.bin'), it is saved again with each compaction.
+# A dictionary from product code to position in the list is kept up to date, so products are found without a search,
+# and so is a QuantityIndex, so the products with the lowest and highest quantities are found without a full scan.
+# The SearchIndex, the ReorderEngine and the ItemValues are built the first time they are used, and then updated with
+# each change.
+#
+# Several copies of the program can use the same inventory at the same time:
+#   The files are only changed while holding an exclusive lock on a lock file ('inventory.txt.lock'), and only read
+#   while holding a shared lock on it.
+#   Each record in the journal starts with a version number, one higher than the record before it. Before a change
+#   is written, the records written by other programs since the last read are replayed, and a gap in the version
+#   numbers (or a compaction by another program) makes the whole inventory be read again.
+#   Stock is added as an amount to the latest quantity, so restocks made at the same time are all kept.
+# The rows and indexes in memory are only changed while holding a thread lock ('memory_lock'), which is also held to
+# read them, so another thread (e.g. the event loop of the server) never sees them half changed. The lock is not held
+# while files are written, so reads don't wait for them.
+class TextFileInventory(InventoryStore):
+
+    # Initialize the file names, the columns of Shoe objects, the index of codes and the signature of the files
+    # when they were last read. If 'interactive' is False, the user is not asked to fix the file when it has errors.
+    def __init__(self, file_name="inventory.txt", journal_limit=JOURNAL_COMPACT_SIZE, interactive=True):
+        self.file_name = file_name
+        self.interactive = interactive
+        self.journal_name = file_name + ".journal"
+        self.compacting_name = file_name + ".journal.compacting"
+        self.binary_name = binary_file_name(file_name)
+        self.lock_name = file_name + ".lock"
+        self.journal_limit = journal_limit
+        self.shoes = None
+        self.index = {}
+        self.quantities = None
+        self.search_index = None
+        self.reorder = None
+        self.reorder_signature = None
+        self.values = None
+        self.views = ViewCache()
+        self.revision_number = 0
+        self.signature = None
+        self.snapshot_signature = None
+        self.version = 0
+        self.offsets = {}
+        self.lock = threading.Lock()
+        self.memory_lock = threading.RLock()
+        self.compaction = None
+        self.history = InventoryHistory(file_name)
+
+    # Function to get the signature of the inventory, journal and binary snapshot files: their inode, modification time
+    # and size. A missing file is represented by None.
+    def file_signature(self):
+        signature = []
+        for name in (self.file_name, self.journal_name, self.compacting_name, self.binary_name):
+            try:
+                file_stats = os.stat(name)
+                signature.append((file_stats.st_ino, file_stats.st_mtime_ns, file_stats.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    # Function to hold the lock of the inventory in a 'with' statement, e.g. 'with inventory.locked():'.
+    # The lock is exclusive to change the files and shared to read them. It is held by this object's thread lock too,
+    # so the compaction thread and the rest of the program take turns.
+    # Locking the file requires the fcntl module, which is not available on Windows. There, only the thread lock is
+    # used.
+    @contextlib.contextmanager
+    def locked(self, exclusive=True):
+        with self.lock:
+            with open(self.lock_name, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                # The file lock is released when the lock file is closed.
+                yield
+
+    # Function to read the files again if the inventory file is missing or their signature has changed since they were
+    # last read or written by this program. If only the journal has changed, only its new records are read.
+    # This function returns False if the file can't be read and the user chooses to exit the program (or, if
+    # 'interactive' is False, as soon as the file can't be read).
+    def refresh(self):
+        while True:
+            with self.locked(exclusive=False):
+                if self.shoes is not None and self.file_signature() == self.signature:
+                    return True
+                if (self.shoes is not None and self.sync()) or self.reload():
+                    return True
+
+            if not self.interactive or not ask_to_fix_file(self.file_name):
+                return False
+
+    # Function to get the columns of Shoe objects read by refresh.
+    def columns(self):
+        return self.shoes
+
+    # Function to get the revision of the inventory: the number of rows changed or read again by this program.
+    def revision(self):
+        return self.revision_number
+
+    # Function to read the inventory file and replay its journal from the start. The lock must be held.
+    # This function returns False if the file is missing or has errors.
+    @timed("load inventory")
+    def reload(self):
+        shoes = read_shoes_data(self.file_name, interactive=False)
+        if shoes is None:
+            return False
+
+        # Index the position of each code. If a code is repeated in the file, the first product with it is used.
+        index = {}
+        for position, shoe in enumerate(shoes):
+            index.setdefault(shoe.code, position)
+
+        # Replay the records of a compaction that has not finished first, and then the current journal.
+        # The records are applied to the new rows before they replace the old ones, so another thread reading the
+        # inventory (e.g. the event loop of the server) doesn't see rows that are only partly read.
+        snapshot_signature = self.file_signature()[0::3]
+        version = 0
+        offsets = {}
+        with timed("replay journal"):
+            for name in (self.compacting_name, self.journal_name):
+                try:
+                    file_stats = os.stat(name)
+                except FileNotFoundError:
+                    continue
+                version, offsets[file_stats.st_ino], _ = replay_journal(name, shoes, index, version)
+
+        # The indexes of the old rows are dropped, and built again from the new rows.
+        quantities = QuantityIndex(shoes)
+        with self.memory_lock:
+            self.search_index = None
+            self.reorder = None
+            self.values = None
+            self.shoes = shoes
+            self.index = index
+            self.quantities = quantities
+            self.revision_number += 1
+        self.version = version
+        self.offsets = offsets
+        self.snapshot_signature = snapshot_signature
+        self.signature = self.file_signature()
+        return True
+
+    # Function to replay the records added to the journals since they were last read. The lock must be held.
+    # This function returns False if the inventory has to be read again with reload, because another program has
+    # compacted the journal or records are missing.
+    def sync(self):
+        if self.file_signature()[0::3] != self.snapshot_signature:
+            return False
+
+        for name in (self.compacting_name, self.journal_name):
+            if not self.replay(name, strict=True):
+                return False
+
+        self.signature = self.file_signature()
+        return True
+
+    # Function to make sure the inventory in memory has every change written by other programs. The lock must be held.
+    # A ValueError is raised if the inventory file has to be read again but it has errors.
+    def catch_up(self):
+        if self.shoes is None or not self.sync():
+            if not self.reload():
+                raise ValueError(f"The file '{self.file_name}' could not be read.")
+
+    # Function to replay the records of a journal file from where it was last read.
+    # Records from a position in the file that has been read are only skipped if the file is still the same file.
+    # If 'strict' is True the replay stops if records are missing, and this function returns False.
+    @timed("replay journal")
+    def replay(self, journal_name, strict):
+        try:
+            file_stats = os.stat(journal_name)
+        except FileNotFoundError:
+            return True
+
+        offset = self.offsets.get(file_stats.st_ino, 0)
+        if offset > file_stats.st_size:
+            offset = 0
+
+        with self.memory_lock:
+            result = replay_journal(journal_name, self.shoes, self.index, self.version, offset, strict)
+            if result is None:
+                return False
+
+            self.version, self.offsets[file_stats.st_ino], changed = result
+            for position in changed:
+                self.update_indexes(position)
+        return True
+
+    # Function to update the indexes after a row has been added or changed: the QuantityIndex and, if they have been
+    # built, the SearchIndex, the ReorderEngine and the ItemValues. The revision of the inventory is changed too.
+    def update_indexes(self, position):
+        self.revision_number += 1
+        for index in (self.quantities, self.search_index, self.reorder, self.values):
+            if index is not None:
+                index.update(position)
+
+    # Function to append records to the journal. Each record is a list of values, which is given the next version.
+    # All the records are written at once and saved to disk before the function returns.
+    # The lock must be held and catch_up must have been called, so the version numbers follow those in the journal.
+    # This function returns the size of the journal.
+    @timed("journal append")
+    def append(self, records):
+        count("journal records written", len(records))
+        lines = []
+        for record in records:
+            self.version += 1
+            lines.append(",".join(str(value) for value in [self.version] + record) + "\n")
+        data = "".join(lines).encode("utf-8")
+
+        with open(self.journal_name, "ab") as journal:
+            # If the journal ends with an incomplete record (a write that was interrupted), end that line first.
+            journal_id = os.fstat(journal.fileno()).st_ino
+            created = journal.tell() == 0
+            if journal.tell() != self.offsets.get(journal_id, 0):
+                data = b"\n" + data
+            journal.write(data)
+            journal.flush()
+            os.fsync(journal.fileno())
+            self.offsets[journal_id] = journal.tell()
+
+        # A new journal is only kept after a crash once the directory holding it has been saved to disk too.
+        if created:
+            sync_directory(self.journal_name)
+
+        self.signature = self.file_signature()
+        return self.offsets[journal_id]
+
+    # Function to start a compaction of the journal in the background if it is larger than the limit.
+    def compact_if_needed(self, journal_size):
+        if journal_size > self.journal_limit and self.compaction is None:
+            self.compaction = threading.Thread(target=self.compact)
+            self.compaction.start()
+
+    # Function to find a Shoe object by its code.
+    # This function returns None if the code is not in the inventory.
+    # The object is a copy of the row, so it has to be changed through the functions below.
+    def find(self, code):
+        with self.memory_lock:
+            position = self.index.get(code)
+            if position is None:
+                return None
+            return self.shoes[position]
+
+    # Functions to get the Shoe objects with the lowest and highest quantities from the quantity index.
+    def lowest(self, count=None):
+        with self.memory_lock:
+            return [self.shoes[position] for position in self.quantities.lowest(count)]
+
+    def highest(self, count=None):
+        with self.memory_lock:
+            return [self.shoes[position] for position in self.quantities.highest(count)]
+
+    # Function to find the Shoe objects matching a search, with a SearchIndex.
+    # The index is only built the first time a search is made, and is kept up to date with the changes afterwards.
+    def search(self, text, limit=None):
+        with self.memory_lock:
+            if self.search_index is None:
+                with timed("build search index"):
+                    self.search_index = SearchIndex(self.shoes)
+            return [self.shoes[position] for position in self.search_index.search(text, limit)]
+
+    # Function to hold the lock of the rows in memory in a 'with' statement, while another thread may change them.
+    def reading(self):
+        return self.memory_lock
+
+    # Function to add a list of new Shoe objects to the inventory, with a single write to the journal.
+    # A ValueError is raised, and no shoes are added, if a code is already in the inventory (e.g. because another
+    # program has just added it) or a shoe can't be saved (see shoe_error).
+    # The shoes are only added to the inventory in memory once they have been written to the journal.
+    def add_many(self, shoes):
+        with self.locked():
+            self.catch_up()
+            codes = set()
+            for shoe in shoes:
+                error = shoe_error(shoe)
+                if error is not None:
+                    raise error
+                if shoe.code in self.index or shoe.code in codes:
+                    raise ValueError(f"Product code {shoe.code} is already in the inventory.")
+                codes.add(shoe.code)
+
+            with self.history.locked():
+                self.history.start(self.columns)
+                journal_size = self.append([["add", shoe.country, shoe.code, shoe.product, shoe.cost, shoe.quantity]
+                                            for shoe in shoes])
+                self.history.record([(shoe.code, shoe.quantity, shoe.cost) for shoe in shoes])
+
+            with self.memory_lock:
+                for shoe in shoes:
+                    self.index[shoe.code] = len(self.shoes)
+                    self.shoes.append(shoe)
+                    self.update_indexes(self.index[shoe.code])
+        self.compact_if_needed(journal_size)
+
+    # Function to make a list of changes, with a single write to the journal.
+    # Restocks are added to the latest quantity, which includes the changes written by other programs.
+    # The new quantities and costs are added to the history of the inventory.
+    # Every change is checked, and the new values worked out, before the inventory in memory is changed. It is only
+    # changed once the journal has been written, so nothing is changed if a change or the write fails. A change that
+    # can't be made (see change_error) has a ValueError as its result, and the other changes are still made.
+    def apply_changes(self, changes):
+        results = []
+        records = []
+        history_changes = []
+        quantities = {}
+        prices = {}
+        with self.locked():
+            self.catch_up()
+            for operation, code, *values in changes:
+                error = change_error(operation, code, values)
+                position = self.index.get(code)
+                if position is None:
+                    results.append(KeyError(code))
+
+                elif error is not None:
+                    results.append(error)
+
+                elif operation == "restock":
+                    quantity = quantities.get(position, self.shoes.quantities[position]) + values[0]
+                    error = quantity_error(code, quantity)
+                    if error is not None:
+                        results.append(error)
+                        continue
+                    quantities[position] = quantity
+                    records.append(["restock", code, quantity])
+                    history_changes.append((code, quantity, None))
+                    results.append(quantity)
+
+                else:
+                    prices[position] = (to_number(values[0]), values[1])
+                    records.append(["reprice", code, to_number(values[0]), values[1]])
+                    history_changes.append((code, None, to_number(values[0])))
+                    results.append(None)
+
+            journal_size = 0
+            if records:
+                with self.history.locked():
+                    self.history.start(self.columns)
+                    journal_size = self.append(records)
+                    self.history.record(history_changes)
+
+            # Make the changes in memory, now that they have been saved.
+            with self.memory_lock:
+                for position, quantity in quantities.items():
+                    self.shoes.quantities[position] = quantity
+                    self.update_indexes(position)
+                for position, (cost, product) in prices.items():
+                    self.shoes.costs[position] = cost
+                    self.shoes.set_product(position, product)
+                    self.update_indexes(position)
+        self.compact_if_needed(journal_size)
+        return results
+
+    # Function to write the Shoe objects in memory into a new 'inventory.txt' and empty the journal.
+    # The journal is renamed before the rows are collected, and a new journal is started with a 'base' record holding
+    # the version of the last record in the new file. New records are appended to it while the file is being written.
+    # The renamed journal is only removed once the new file has replaced the old one.
+    # Nothing is done if another program is already compacting the journal.
+    @timed("compact journal")
+    def compact(self):
+        try:
+            with open(self.file_name + ".compact.lock", "a") as compact_lock:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(compact_lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return
+
+                with self.locked():
+                    if not os.path.exists(self.journal_name):
+                        return
+                    self.catch_up()
+
+                    # If a compaction was interrupted, the records of both journals are in memory and are written
+                    # while holding the lock, and the new journal replaces the current one.
+                    if os.path.exists(self.compacting_name):
+                        self.replace_file(write_temp_file(self.file_name, text_chunks(inventory_lines(self.shoes))),
+                                          self.shoes)
+                        self.start_journal()
+                        os.remove(self.compacting_name)
+                        self.signature = self.file_signature()
+                        return
+
+                    os.replace(self.journal_name, self.compacting_name)
+                    self.start_journal()
+                    lines = list(inventory_lines(self.shoes))
+                    columns = self.shoes.copy() if os.path.exists(self.binary_name) else None
+                    self.signature = self.file_signature()
+
+                temp_name = write_temp_file(self.file_name, text_chunks(lines))
+
+                with self.locked():
+                    self.replace_file(temp_name, columns)
+                    os.remove(self.compacting_name)
+                    self.signature = self.file_signature()
+        finally:
+            self.compaction = None
+
+    # Function to replace the inventory file with the new file written by compact, and save the binary snapshot again
+    # if there is one. This function takes in the name of the new file and the columns to save in the binary snapshot.
+    # The lock must be held.
+    def replace_file(self, temp_name, columns):
+        commit_file(temp_name, self.file_name)
+        # The binary snapshot is saved after the text file, so it is not older than it and is still used.
+        if columns is not None and os.path.exists(self.binary_name):
+            write_binary(columns, self.binary_name)
+        self.snapshot_signature = self.file_signature()[0::3]
+
+    # Function to replace the journal with a new one holding only a 'base' record, with the version of the last
+    # record written to the inventory file. The lock must be held.
+    def start_journal(self):
+        data = f"{self.version},base\n".encode("utf-8")
+        save_file(self.journal_name, [data], backups=0)
+        self.offsets[os.stat(self.journal_name).st_ino] = len(data)
+
+    # Function to wait for a compaction running in the background to finish.
+    def wait(self):
+        compaction = self.compaction
+        if compaction is not None:
+            compaction.join()
+
+
+# Function to apply the records in a journal file to the columns of Shoe objects.
+# This function takes in the name of the journal, a ShoeColumns object, a dictionary of the positions by code,
+# the version of the last record already applied, and the position in the file to start reading from.
+# Records with a version that has already been applied are skipped. Records only contain the new values, so replaying
+# a record that is already in the inventory file has no effect.
+# If 'strict' is True, the next record must have the next version (or be a 'base' record for a version already
+# applied). Otherwise there are missing records and this function returns None.
+# This function returns the version of the last record applied, the position after the last complete line read,
+# and the list of positions of the rows that have changed.
+def replay_journal(journal_name, shoes, index, version=0, start=0, strict=False):
+
+    offset = start
+    changed = []
+
+    with open(journal_name, "rb") as journal:
+        journal.seek(start)
+
+        for line in journal:
+            # The last line is only read once it is complete, as another program may still be writing it.
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            record = line.decode("utf-8", errors="replace").rstrip("\n").split(",")
+
+            # Records written before version numbers were added to the journal are given the next version.
+            if not record[0].isdigit():
+                record.insert(0, str(version + 1))
+
+            try:
+                record_version = int(record[0])
+                operation = record[1]
+
+                if operation == "base" and len(record) == 2:
+                    if strict and record_version > version:
+                        return None
+                    version = max(version, record_version)
+                    continue
+
+                if record_version <= version:
+                    continue
+                if strict and record_version != version + 1:
+                    return None
+
+                if operation == "add" and len(record) == 7:
+                    shoe = Shoe(*record[2:])
+                    if shoe.code in index:
+                        shoes.set_row(index[shoe.code], shoe)
+                    else:
+                        index[shoe.code] = len(shoes)
+                        shoes.append(shoe)
+                    changed.append(index[shoe.code])
+
+                elif operation == "restock" and len(record) == 4:
+                    shoes.quantities[index[record[2]]] = int(record[3])
+                    changed.append(index[record[2]])
+
+                elif operation == "reprice" and len(record) >= 5:
+                    shoes.costs[index[record[2]]] = to_number(record[3])
+                    shoes.set_product(index[record[2]], ",".join(record[4:]))
+                    changed.append(index[record[2]])
+
+                else:
+                    raise ValueError
+
+                version = record_version
+
+            # A record that cannot be applied (e.g. the end of a write that was interrupted) is skipped.
+            except (KeyError, ValueError, IndexError):
+                print(f"Skipping invalid record at byte {offset - len(line)} of '{journal_name}'.")
+
+    return version, offset, changed
+
+
+# Definition of class SQLiteInventory.
+# It keeps the inventory in an SQLite database, so the program doesn't have to read the whole inventory to start and
+# each change only writes the rows it changes:
+#   Products are found by code, and the products with the lowest and highest quantities are found, with indexes.
+#   A restock or a change of price is a single UPDATE of one row, so changes made at the same time by other programs
+#   are kept. The database uses write-ahead logging (WAL), so other programs can read while a change is written.
+#   Every row is only read for the views and reports of the whole inventory, and kept until the database changes.
+#   The SearchIndex, the ReorderEngine and the ItemValues are built from those rows, so they are built again after
+#   each change.
+# The database is created from an inventory file with the 'migrate' command.
+class SQLiteInventory(InventoryStore):
+
+    blocking_reads = True
+
+    # Initialize the name of the database. It is opened by refresh.
+    # Each thread using the store has its own connection to the database, kept in a threading.local object.
+    def __init__(self, file_name="inventory.db", interactive=True):
+        self.file_name = file_name
+        self.interactive = interactive
+        self.opened = False
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.cached_columns = None
+        self.cached_version = None
+        self.search_index = None
+        self.reorder = None
+        self.reorder_signature = None
+        self.values = None
+        self.views = ViewCache()
+        self.history = InventoryHistory(file_name)
+
+    # Function to get the connection to the database of the thread that is running, e.g. the writer thread of the
+    # server. A thread opens its own connection the first time it uses the database, once refresh has opened it.
+    @property
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None and self.opened:
+            connection = self.connect()
+        return connection
+
+    # Function to open a connection to the database for the thread that is running.
+    def connect(self):
+        connection = self.local.connection = open_database(self.file_name)
+        with self.lock:
+            self.connections.append(connection)
+        return connection
+
+    # Function to open the database, if it is not open yet.
+    # This function returns False if the database doesn't exist or doesn't have an inventory.
+    def refresh(self):
+        if self.opened:
+            return True
+
+        if not os.path.exists(self.file_name):
+            print(f"Database '{self.file_name}' was not found. "
+                  f"Create it from an inventory file with: python inventory.py migrate {self.file_name}")
+            return False
+
+        try:
+            self.connect().execute("SELECT 1 FROM shoes LIMIT 1")
+        except import_sqlite3().DatabaseError as error:
+            print(f"Database '{self.file_name}' can't be read: {error}.")
+            self.close()
+            return False
+        self.opened = True
+        return True
+
+    # Function to read every row of the database, ordered as in the inventory file.
+    # The rows are only read again if the database has been changed, by this or another program, since they were read.
+    def columns(self):
+        version = self.revision()
+        if version != self.cached_version:
+            self.cached_columns = ShoeColumns(self.query("ORDER BY position"))
+            self.cached_version = version
+        return self.cached_columns
+
+    # Function to get the revision of the database: the version of its data, which changes when another connection
+    # changes it, and the number of rows changed by this connection. Both are counted by each connection, so the
+    # connection of the thread is part of the revision too.
+    def revision(self):
+        connection = self.connection
+        return id(connection), connection.execute("PRAGMA data_version").fetchone()[0], connection.total_changes
+
+    # Function to get the rows selected by the end of a query, e.g. a WHERE clause, as Shoe objects.
+    def query(self, clause, parameters=()):
+        count("database queries")
+        rows = self.connection.execute(f"SELECT country, code, product, cost, quantity FROM shoes {clause}",
+                                       parameters)
+        return [Shoe(*row) for row in rows]
+
+    # Function to find a Shoe object by its code, using the index of codes.
+    def find(self, code):
+        shoes = self.query("WHERE code = ?", (code,))
+        return shoes[0] if shoes else None
+
+    # Functions to get the Shoe objects with the lowest and highest quantities, using the index of quantities.
+    def lowest(self, count=None):
+        if count is None:
+            return self.query("WHERE quantity = (SELECT MIN(quantity) FROM shoes) ORDER BY position")
+        return self.query("ORDER BY quantity, position LIMIT ?", (count,))
+
+    def highest(self, count=None):
+        if count is None:
+            return self.query("WHERE quantity = (SELECT MAX(quantity) FROM shoes) ORDER BY position")
+        return self.query("ORDER BY quantity DESC, position LIMIT ?", (count,))
+
+    # Function to find the Shoe objects matching a search, with a SearchIndex of every row.
+    # The index is built again when the rows are read again, after the database has changed.
+    def search(self, text, limit=None):
+        columns = self.columns()
+        if self.search_index is None or self.search_index.columns is not columns:
+            with timed("build search index"):
+                self.search_index = SearchIndex(columns)
+        return [columns[position] for position in self.search_index.search(text, limit)]
+
+    # Function to add a list of new Shoe objects to the inventory, in a single transaction.
+    # A ValueError is raised, and no shoes are added, if a code is already in the inventory or a shoe can't be saved
+    # (see shoe_error).
+    def add_many(self, shoes):
+        for shoe in shoes:
+            error = shoe_error(shoe)
+            if error is not None:
+                raise error
+
+        try:
+            with self.history.locked():
+                self.history.start(self.columns)
+                with self.connection:
+                    self.connection.executemany(
+                        "INSERT INTO shoes (country, code, product, cost, quantity) VALUES (?, ?, ?, ?, ?)",
+                        [(shoe.country, shoe.code, shoe.product, shoe.cost, shoe.quantity) for shoe in shoes])
+                self.history.record([(shoe.code, shoe.quantity, shoe.cost) for shoe in shoes])
+        except import_sqlite3().IntegrityError:
+            codes = {shoe.code for shoe in shoes}
+            existing = [row[0] for row in self.connection.execute(
+                f"SELECT code FROM shoes WHERE code IN ({','.join('?' * len(codes))})", tuple(codes))]
+            code = existing[0] if existing else "in the list"
+            raise ValueError(f"Product code {code} is already in the inventory.") from None
+
+    # Function to make a list of changes in a single transaction. Each change is an UPDATE of one row.
+    # The new quantity of a restock is read in the same transaction, so it includes the changes made by other programs.
+    # The lock of the history is held during the transaction, so the changes are added to it in the order they are made.
+    # If the history is new, its first snapshot is taken before the transaction.
+    # A restock only changes the row if the new quantity is from 0 to MAX_QUANTITY. A change that can't be made (see
+    # change_error and quantity_error) has a ValueError as its result, and the other changes are still made.
+    @timed("database write")
+    def apply_changes(self, changes):
+        results = []
+        history_changes = []
+        with self.history.locked():
+            self.history.start(self.columns)
+            with self.connection:
+                for operation, code, *values in changes:
+                    error = change_error(operation, code, values)
+                    if error is not None:
+                        row = self.connection.execute("SELECT 1 FROM shoes WHERE code = ?", (code,)).fetchone()
+                        results.append(KeyError(code) if row is None else error)
+
+                    elif operation == "restock":
+                        amount = values[0]
+                        cursor = self.connection.execute(
+                            "UPDATE shoes SET quantity = quantity + ? WHERE code = ? AND quantity BETWEEN ? AND ?",
+                            (amount, code, max(-amount, 0), min(MAX_QUANTITY - amount, MAX_QUANTITY)))
+                        row = self.connection.execute("SELECT quantity FROM shoes WHERE code = ?",
+                                                      (code,)).fetchone()
+                        if row is None:
+                            results.append(KeyError(code))
+                        elif cursor.rowcount == 0:
+                            results.append(quantity_error(code, row[0] + amount))
+                        else:
+                            results.append(row[0])
+                            history_changes.append((code, row[0], None))
+
+                    else:
+                        cursor = self.connection.execute("UPDATE shoes SET cost = ?, product = ? WHERE code = ?",
+                                                         (to_number(values[0]), values[1], code))
+                        results.append(KeyError(code) if cursor.rowcount == 0 else None)
+                        if cursor.rowcount:
+                            history_changes.append((code, None, to_number(values[0])))
+            self.history.record(history_changes)
+        return results
+
+    # Function to close the connections to the database of every thread.
+    def close(self):
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+        self.local = threading.local()
+        self.opened = False
+        self.cached_version = None
+
+
+# Function to open an SQLite database of the inventory, creating the table and its indexes if they don't exist.
+# The position of each row keeps the order of the inventory file. The cost is a NUMERIC column, so whole numbers are
+# kept as integers and costs with decimals as floats, as in the file.
+# This function returns the connection. Each change is committed when it is made.
+# The connection can be closed by another thread than the one that opened it (see SQLiteInventory.close).
+def open_database(file_name):
+
+    connection = import_sqlite3().connect(file_name, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS shoes (position INTEGER PRIMARY KEY, country TEXT NOT NULL, "
+                           "code TEXT NOT NULL UNIQUE, product TEXT NOT NULL, cost NUMERIC NOT NULL, "
+                           "quantity INTEGER NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS shoes_quantity ON shoes (quantity)")
+    return connection
+
+
+# Function to copy an inventory file, including the changes in its journal, into a new SQLite database.
+# This function takes in the name of the inventory file and the name of the database, and returns True if the
+# database has been created, or False if the file can't be read or the database already has an inventory.
+# If a code is repeated in the file, only the first product with it is copied, as it is the one the program uses.
+def migrate_to_sqlite(file_name="inventory.txt", database_name="inventory.db"):
+
+    inventory = TextFileInventory(file_name, interactive=False)
+    if not inventory.refresh():
+        return False
+
+    connection = open_database(database_name)
+    try:
+        if connection.execute("SELECT 1 FROM shoes LIMIT 1").fetchone() is not None:
+            print(f"Database '{database_name}' already has an inventory.")
+            return False
+
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO shoes (country, code, product, cost, quantity) VALUES (?, ?, ?, ?, ?)",
+                ((shoe.country, shoe.code, shoe.product, shoe.cost, shoe.quantity) for shoe in inventory.columns()))
+        rows = connection.execute("SELECT COUNT(*) FROM shoes").fetchone()[0]
+    finally:
+        connection.close()
+
+    print(f"{rows} inventory item(s) have been copied from '{file_name}' to '{database_name}'.")
+    return True
+
+
+# ======== The history of changes ==========
+# Definition of class InventoryHistory.
+# It keeps every change of quantity and cost made to an inventory, with the time it was made, in a folder next to the
+# inventory file ('inventory.txt.history'), so the stock of a product or the value of the inventory at an earlier time
+# can be found, e.g. with 'python inventory.py history SKU44386 --at 2026-01-31'. See source 21. The folder holds:
+#   'codes': the codes of the products in the history, one per line. Products are stored as their line number.
+#   The changes, stored as columns of numbers in separate files, e.g. 'events.0.time': the time of each change (in
+#   seconds since 1970), the product, and its new quantity and cost. The quantity of a change of cost is -1, and the
+#   cost of a restock is NaN (not a number).
+#   Snapshots of the quantity and cost of every product (e.g. 'snapshot.0.0.quantity'), taken every
+#   HISTORY_SNAPSHOT_EVENTS changes (or more, for large inventories). The first one holds the inventory before the
+#   first change in the history, at the time the inventory was last changed.
+#   'index': the generation number of the files of changes, and the time, number of changes before it and name of
+#   each snapshot. It is replaced in a single step with save_file, so it always describes a complete set of files.
+# Changes older than HISTORY_RETENTION_DAYS are dropped when a snapshot is taken, once they are a quarter of the
+# history: the changes from the last snapshot before that time are written to new files, with the next generation
+# number, and the older snapshots are removed.
+# The history is only changed while holding an exclusive lock on the file 'lock' in the folder.
+class InventoryHistory:
+
+    # Names and type codes (see the array module) of the columns of changes.
+    COLUMNS = (("time", "d"), ("code", "I"), ("quantity", "q"), ("cost", "d"))
+
+    # Initialize the name of the inventory file, the name of the folder and the empty tables read from it.
+    def __init__(self, file_name="inventory.txt"):
+        self.file_name = file_name
+        self.directory = file_name + ".history"
+        self.codes = []
+        self.code_ids = {}
+        self.codes_offset = 0
+        self.generation = 0
+        self.snapshots = []
+
+    # Function to get the name of a file in the folder.
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    # Function to check if the history has been started.
+    def exists(self):
+        return os.path.exists(self.path("index"))
+
+    # Function to hold the lock of the history in a 'with' statement, e.g. 'with history.locked():', and read its
+    # index and any new codes. The lock is exclusive to change the history and shared to read it.
+    @contextlib.contextmanager
+    def locked(self, exclusive=True):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path("lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self.read_index()
+            self.read_codes()
+            yield
+
+    # Function to read the generation number and the list of snapshots from the index.
+    def read_index(self):
+        self.generation = 0
+        self.snapshots = []
+        with contextlib.suppress(FileNotFoundError):
+            with open(self.path("index"), "r") as index_file:
+                for line in index_file:
+                    fields = line.rstrip("\n").split(",")
+                    if fields[0] == "generation":
+                        self.generation = int(fields[1])
+                    elif fields[0] == "snapshot":
+                        self.snapshots.append((float(fields[1]), int(fields[2]), fields[3]))
+
+    # Function to replace the index with the generation number and the list of snapshots.
+    def write_index(self):
+        lines = [f"generation,{self.generation}"]
+        lines += [f"snapshot,{when!r},{events},{name}" for when, events, name in self.snapshots]
+        save_file(self.path("index"), text_chunks(lines + [""]), backups=0)
+
+    # Function to read the codes added to the file of codes since it was last read.
+    # The last line is only read once it is complete.
+    def read_codes(self):
+        with contextlib.suppress(FileNotFoundError):
+            with open(self.path("codes"), "rb") as codes_file:
+                codes_file.seek(self.codes_offset)
+                for line in codes_file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self.codes_offset += len(line)
+                    self.code_ids[line.decode("utf-8").rstrip("\n")] = len(self.codes)
+                    self.codes.append(line.decode("utf-8").rstrip("\n"))
+
+    # Function to get the number of each code in the file of codes, adding the new codes to it. The lock must be held.
+    def number_codes(self, codes):
+        new_codes = [code for code in dict.fromkeys(codes) if code not in self.code_ids]
+        if new_codes:
+            truncate_file(self.path("codes"), self.codes_offset)
+            data = "".join(f"{code}\n" for code in new_codes).encode("utf-8")
+            with open(self.path("codes"), "ab") as codes_file:
+                codes_file.write(data)
+            self.codes_offset += len(data)
+            for code in new_codes:
+                self.code_ids[code] = len(self.codes)
+                self.codes.append(code)
+        return [self.code_ids[code] for code in codes]
+
+    # Function to get the name of the file of a column of changes.
+    def column_name(self, column, generation=None):
+        return self.path(f"events.{self.generation if generation is None else generation}.{column}")
+
+    # Function to get the number of changes in the history. If a write was interrupted, some columns can be longer than
+    # others, so the shortest one is used.
+    def event_count(self):
+        counts = []
+        for column, type_code in self.COLUMNS:
+            try:
+                counts.append(os.path.getsize(self.column_name(column)) // array(type_code).itemsize)
+            except FileNotFoundError:
+                counts.append(0)
+        return min(counts)
+
+    # Function to read the values of a column of changes, from the change number 'start' up to 'stop'.
+    def read_column(self, column, type_code, start, stop):
+        values = array(type_code)
+        if stop > start:
+            with open(self.column_name(column), "rb") as column_file:
+                column_file.seek(start * values.itemsize)
+                values.fromfile(column_file, stop - start)
+        return values
+
+    # Function to start the history, if it is new, with a snapshot of the inventory before it is changed. The lock must
+    # be held, and this function must be called before the changes are saved to the inventory.
+    # This function takes in a function that returns the ShoeColumns object of the inventory, which is only called if
+    # the history is new. The snapshot is given the time the inventory was last changed (the latest modification time
+    # of its files that are not empty, as SQLite creates an empty write-ahead log when the database is opened), so the
+    # inventory can be found as it was at any time from then until the first change.
+    # If the history can't be written a message is printed instead of raising an error, so the changes are still made.
+    def start(self, columns):
+        if self.snapshots:
+            return
+        try:
+            columns = columns()
+            code_ids = self.number_codes(columns.codes)
+            quantities = array("q", [-1]) * len(self.codes)
+            costs = array("d", [float("nan")]) * len(self.codes)
+            for code_id, cost, quantity in zip(code_ids, columns.costs, columns.quantities):
+                quantities[code_id] = quantity
+                costs[code_id] = cost
+
+            changed = [0.0]
+            for name in (self.file_name, self.file_name + ".journal", self.file_name + ".journal.compacting",
+                         self.file_name + "-wal"):
+                with contextlib.suppress(FileNotFoundError):
+                    file_stats = os.stat(name)
+                    if file_stats.st_size:
+                        changed.append(file_stats.st_mtime)
+            self.save_snapshot(min(max(changed), time.time()), 0, quantities, costs)
+
+        except OSError as error:
+            print(f"The history of the inventory could not be started: {error}")
+
+    # Function to add changes to the history. The lock must be held, and the history must have been started (see start).
+    # This function takes in a list of tuples with the code of a product and its new quantity and cost (None for the
+    # one that hasn't changed).
+    # The changes have already been saved to the inventory, so if the history can't be written a message is printed
+    # instead of raising an error.
+    def record(self, changes):
+        if not changes or not self.snapshots:
+            return
+        try:
+            # Remove the end of any write that was interrupted, so the columns have the same length.
+            events = self.event_count()
+            for column, type_code in self.COLUMNS:
+                truncate_file(self.column_name(column), events * array(type_code).itemsize)
+
+            # The times of the changes never go back, even if the clock of the computer does.
+            last_time = self.read_column("time", "d", events - 1, events) if events else [self.snapshots[-1][0]]
+            now = max(time.time(), last_time[0], self.snapshots[-1][0])
+            values = {"time": [now] * len(changes),
+                      "code": self.number_codes([code for code, _, _ in changes]),
+                      "quantity": [-1 if quantity is None else quantity for _, quantity, _ in changes],
+                      "cost": [float("nan") if cost is None else cost for _, _, cost in changes]}
+            for column, type_code in self.COLUMNS:
+                with open(self.column_name(column), "ab") as column_file:
+                    array(type_code, values[column]).tofile(column_file)
+            events += len(changes)
+            count("history changes recorded", len(changes))
+
+            # Take a snapshot if enough changes have been made since the last one.
+            if events - self.snapshots[-1][1] >= max(HISTORY_SNAPSHOT_EVENTS, len(self.codes)):
+                self.save_snapshot(now, events, *self.state(len(self.snapshots) - 1, events))
+                self.drop_old_changes(now, events)
+
+        except OSError as error:
+            print(f"The changes have been saved, but could not be added to the history: {error}")
+
+    # Function to save a snapshot of the quantity and cost of every product, taken at a time after a number of changes,
+    # and add it to the index. The lock must be held.
+    def save_snapshot(self, when, events, quantities, costs):
+        name = f"snapshot.{self.generation}.{events}"
+        save_file(self.path(name + ".quantity"), [quantities.tobytes()], backups=0)
+        save_file(self.path(name + ".cost"), [costs.tobytes()], backups=0)
+        self.snapshots.append((when, events, name))
+        self.write_index()
+
+    # Function to read a snapshot, given its number in the list of snapshots.
+    # This function returns an array of quantities and an array of costs, by product number, with -1 as the quantity
+    # and NaN as the cost of the products that were not in the inventory.
+    def load_snapshot(self, number):
+        quantities = array("q")
+        costs = array("d")
+        for values, extension in ((quantities, ".quantity"), (costs, ".cost")):
+            with open(self.path(self.snapshots[number][2] + extension), "rb") as snapshot_file:
+                values.frombytes(snapshot_file.read())
+        quantities.extend(array("q", [-1]) * (len(self.codes) - len(quantities)))
+        costs.extend(array("d", [float("nan")]) * (len(self.codes) - len(costs)))
+        return quantities, costs
+
+    # Function to read the quantity and cost of a product in a snapshot, given the number of the snapshot in the list of
+    # snapshots and the number of the product, without reading the rest of the snapshot.
+    def snapshot_values(self, number, code_id):
+        values = []
+        for extension, type_code, missing in ((".quantity", "q", -1), (".cost", "d", float("nan"))):
+            value = array(type_code)
+            with open(self.path(self.snapshots[number][2] + extension), "rb") as snapshot_file:
+                snapshot_file.seek(code_id * value.itemsize)
+                value.frombytes(snapshot_file.read(value.itemsize))
+            values.append(value[0] if value else missing)
+        return values
+
+    # Function to get the number of changes made up to a time, between the change numbers 'start' and 'stop', with a
+    # binary search that only reads the times it compares.
+    def changes_until(self, when, start, stop):
+        if stop > start:
+            with open(self.column_name("time"), "rb") as time_file:
+                while start < stop:
+                    middle = (start + stop) // 2
+                    time_file.seek(middle * 8)
+                    if array("d", time_file.read(8))[0] <= when:
+                        start = middle + 1
+                    else:
+                        stop = middle
+        return start
+
+    # Function to get the quantity and cost of every product after a number of changes, by going through the changes
+    # made since a snapshot, given its number in the list of snapshots.
+    def state(self, number, stop):
+        quantities, costs = self.load_snapshot(number)
+        start = self.snapshots[number][1]
+        for code_id, quantity, cost in zip(*(self.read_column(column, type_code, start, stop)
+                                             for column, type_code in self.COLUMNS[1:])):
+            if quantity >= 0:
+                quantities[code_id] = quantity
+            if cost == cost:
+                costs[code_id] = cost
+        return quantities, costs
+
+    # Function to get the number of the last snapshot taken at or before a time, or None if the history started after
+    # that time.
+    def snapshot_before(self, when):
+        number = bisect.bisect_right([snapshot_time for snapshot_time, _, _ in self.snapshots], when) - 1
+        return number if number >= 0 else None
+
+    # Function to drop the changes older than HISTORY_RETENTION_DAYS, keeping those since the last snapshot before that
+    # time, which becomes the first snapshot. The lock must be held.
+    # Nothing is done until the changes to drop are a quarter of the history, so each change is only written again a
+    # few times.
+    def drop_old_changes(self, now, events):
+        number = self.snapshot_before(now - HISTORY_RETENTION_DAYS * 24 * 60 * 60)
+        if not number or self.snapshots[number][1] * 4 < events:
+            return
+
+        # Write the changes that are kept to the files of the next generation, and then replace the index.
+        start = self.snapshots[number][1]
+        generation = self.generation + 1
+        for column, type_code in self.COLUMNS:
+            values = self.read_column(column, type_code, start, events)
+            save_file(self.path(f"events.{generation}.{column}"), [values.tobytes()], backups=0)
+
+        old_generation = self.generation
+        old_snapshots = self.snapshots[:number]
+        self.generation = generation
+        self.snapshots = [(when, snapshot_events - start, name)
+                          for when, snapshot_events, name in self.snapshots[number:]]
+        self.write_index()
+
+        # The old files are only removed once the new index has replaced the old one.
+        for column, _ in self.COLUMNS:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.column_name(column, old_generation))
+        for _, _, name in old_snapshots:
+            for extension in (".quantity", ".cost"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.path(name + extension))
+
+    # Function to find the last changes of a product made up to a number of changes, after a snapshot.
+    # This function returns the numbers of the last change of quantity and the last change of cost (or None if there
+    # aren't any), looking for the product's number in the bytes of the column of products, from the end.
+    def last_changes(self, code_id, start, stop):
+        pattern = array("I", [code_id]).tobytes()
+        data = b""
+        if stop > start:
+            with open(self.column_name("code"), "rb") as code_file:
+                code_file.seek(start * len(pattern))
+                data = code_file.read((stop - start) * len(pattern))
+        quantity_change = None
+        cost_change = None
+        end = len(data)
+        while quantity_change is None or cost_change is None:
+            at = data.rfind(pattern, 0, end)
+            if at == -1:
+                break
+            end = at + len(pattern) - 1
+            if at % len(pattern):
+                continue
+            change = start + at // len(pattern)
+            quantity = self.read_column("quantity", "q", change, change + 1)[0]
+            cost = self.read_column("cost", "d", change, change + 1)[0]
+            # A NaN cost is the only value not equal to itself.
+            if quantity_change is None and quantity >= 0:
+                quantity_change = change
+            if cost_change is None and cost == cost:
+                cost_change = change
+        return quantity_change, cost_change
+
+    # Function to get the quantity and cost of a product at a time.
+    # This function returns a tuple with the quantity and cost, or None if the history started after that time or the
+    # product was not in the inventory then.
+    def stock_at(self, code, when):
+        if not self.exists():
+            return None
+        with self.locked(exclusive=False):
+            number = self.snapshot_before(when)
+            if number is None or code not in self.code_ids:
+                return None
+            code_id = self.code_ids[code]
+
+            # Only the changes made after the snapshot, and up to the time, are looked at.
+            start = self.snapshots[number][1]
+            stop = self.changes_until(when, start, self.event_count())
+            quantity_change, cost_change = self.last_changes(code_id, start, stop)
+
+            quantity, cost = self.snapshot_values(number, code_id)
+            if quantity_change is not None:
+                quantity = self.read_column("quantity", "q", quantity_change, quantity_change + 1)[0]
+            if cost_change is not None:
+                cost = self.read_column("cost", "d", cost_change, cost_change + 1)[0]
+
+        if quantity < 0 or cost != cost:
+            return None
+        return quantity, to_number(cost)
+
+    # Function to get the changes of a product in the history.
+    # This function returns a list of tuples with the time of each change and the new quantity and cost (None for the
+    # one that didn't change), starting with the quantity and cost in the first snapshot, if the product was in it.
+    # Changes that don't change the quantity or the cost (e.g. the first change of a history started by an older version
+    # of the program, which took the first snapshot after it) are left out.
+    def product_changes(self, code):
+        if not self.exists():
+            return []
+        with self.locked(exclusive=False):
+            if code not in self.code_ids:
+                return []
+            code_id = self.code_ids[code]
+            quantities, costs = self.load_snapshot(0)
+            changes = []
+            last_quantity, last_cost = quantities[code_id], costs[code_id]
+            if last_quantity >= 0:
+                changes.append((self.snapshots[0][0], last_quantity, to_number(last_cost)))
+
+            columns = [self.read_column(column, type_code, 0, self.event_count()) for column, type_code in self.COLUMNS]
+            for when, change_code, quantity, cost in zip(*columns):
+                # A NaN cost is the only value not equal to itself.
+                if change_code != code_id or ((quantity < 0 or quantity == last_quantity) and
+                                              (cost != cost or cost == last_cost)):
+                    continue
+                changes.append((when, quantity if quantity >= 0 else None, to_number(cost) if cost == cost else None))
+                last_quantity = quantity if quantity >= 0 else last_quantity
+                last_cost = cost if cost == cost else last_cost
+        return changes
+
+    # Function to get the total value of the inventory at a list of times, in order.
+    # This function returns a list with the value at each time, or None for the times before the history started.
+    # For each time, the changes are gone through from the last snapshot before it, or from the previous time if it is
+    # after that snapshot.
+    def values_at(self, times):
+        if not self.exists():
+            return [None] * len(times)
+        values = []
+        with self.locked(exclusive=False):
+            number = None
+            for when in times:
+                snapshot_number = self.snapshot_before(when)
+                if snapshot_number is None:
+                    values.append(None)
+                    continue
+
+                # Start again from the snapshot if it is after the changes gone through so far.
+                if number is None or snapshot_number > number:
+                    number = snapshot_number
+                    quantities, costs = self.load_snapshot(number)
+                    total = sum(quantity * cost for quantity, cost in zip(quantities, costs) if quantity >= 0)
+                    position = self.snapshots[number][1]
+                    times_after = self.read_column("time", "d", position, self.event_count())
+
+                stop = self.snapshots[number][1] + bisect.bisect_right(times_after, when)
+                for code_id, quantity, cost in zip(*(self.read_column(column, type_code, position, stop)
+                                                     for column, type_code in self.COLUMNS[1:])):
+                    old_value = quantities[code_id] * costs[code_id] if quantities[code_id] >= 0 else 0
+                    if quantity >= 0:
+                        quantities[code_id] = quantity
+                    if cost == cost:
+                        costs[code_id] = cost
+                    total += (quantities[code_id] * costs[code_id] if quantities[code_id] >= 0 else 0) - old_value
+                position = max(position, stop)
+                values.append(to_number(total))
+        return values
+
+
+# Function to cut a file to a size, if it is longer. Nothing is done if the file doesn't exist.
+def truncate_file(file_name, size):
+
+    with contextlib.suppress(FileNotFoundError):
+        if os.path.getsize(file_name) > size:
+            os.truncate(file_name, size)
+
+
+# ==========Functions outside the class==============
+
+# Function to check the fields of a line of the inventory file.
+# This function takes in the line number (starting from 1) and the list of fields in the line.
+# It returns a dictionary with the line number and the lists of field numbers with errors, or None if there are none.
+def check_line(line_number, fields):
+
+    line_errors = False
+    line_description = {"line": str(line_number), "fields": len(fields), "empty fields": [], "not number": []}
+
+    # Check that the line has a field for each title.
+    if len(fields) != 5:
+        line_errors = True
+
+    # Check if there are empty fields and if fields cost and quantity are numbers.
+    # The cost can have decimals, as costs entered with decimals are saved that way.
+    for item_count, item in enumerate(fields):
+        if item == "":
+            line_errors = True
+            line_description["empty fields"].append(str(item_count + 1))
+
+        if (item_count == 3 and not item.replace(".", "", 1).isdigit()) or (item_count == 4 and not item.isdigit()):
+            line_errors = True
+            line_description["not number"].append(str(item_count + 1))
+
+    if line_errors:
+        return line_description
+    return None
+
+
+# Function to format the description of the errors in a line for printing.
+# This function takes in a dictionary returned by check_line.
+def describe_line(line_description):
+
+    description = [f"\n\nLine: {line_description['line']}"]
+    if line_description["fields"] != 5:
+        description.append(f"\n\tNumber of fields should be 5, found: {line_description['fields']}")
+    if line_description["empty fields"]:
+        description.append(f"\n\tEmpty fields: {', '.join(line_description['empty fields'])}")
+    if line_description["not number"]:
+        description.append(f"\n\tValue is not a number: {', '.join(line_description['not number'])}")
+    return "".join(description)
+
+
+# Function to check the format of the inventory file and create the Shoe objects in a single pass over its lines.
+# This function takes in any iterable of lines, such as an open file, so only one line is held in memory at a time.
+# Optionally, it takes in the maximum number of lines with errors to describe and the name of the file.
+def load_shoes(file_lines, max_errors=None, file_name="inventory.txt"):
+
+    # Line 1 contains the titles, and the product lines are checked from line 2.
+    file_lines = iter(file_lines)
+    titles = next(file_lines, None)
+    return describe_file(file_name, titles, [load_lines(file_lines, max_errors)], max_errors)
+
+
+# Function to check the fields of a sequence of product lines and create the Shoe objects.
+# This function takes in any iterable of lines and, optionally, the maximum number of lines with errors to describe.
+# The lines are numbered from 1, so when the lines are a part of the file the numbers are moved by describe_file.
+# It returns a tuple with the number of lines, the number of lines with errors, the descriptions made by check_line of
+# the first lines with errors (up to the maximum) and a ShoeColumns object, which is incomplete if there are errors.
+def load_lines(file_lines, max_errors=None):
+
+    error_lines = 0
+    line_errors = []
+    inventory_list = ShoeColumns()
+    line_count = 0
+
+    for line_count, line in enumerate(file_lines, 1):
+
+        # Check the fields of the line. If there are errors, keep their description until the maximum is reached.
+        # Once there is an error, the file can't be used, so Shoe objects are no longer created.
+        fields = line.rstrip("\n").split(",")
+        line_description = check_line(line_count, fields)
+
+        if line_description is not None:
+            error_lines += 1
+            if max_errors is None or error_lines <= max_errors:
+                line_errors.append(line_description)
+
+        elif not error_lines:
+            inventory_list.append(Shoe(fields[0], fields[1], fields[2], fields[3], fields[4]))
+
+    return line_count, error_lines, line_errors, inventory_list
+
+
+# Function to put together the results of checking the lines of the inventory file, in one or more parts.
+# This function takes in the name of the file, its first line (or None if the file is empty), the list of tuples
+# returned by load_lines for each part of the file in order, and the maximum number of lines with errors to describe.
+def describe_file(file_name, titles, parts, max_errors=None):
+
+    # Declare variables. The error description is collected in a list and joined once at the end.
+    description = [f"\nErrors in the file {file_name}:"]
+    error_lines = 0
+
+    # Check if the file is empty.
+    if titles is None:
+        error_lines += 1
+        description.append("\n\nThis file is empty.")
+
+    # Check that line 1 contains the titles. If not, tell the user to move any product data one line down.
+    elif titles.rstrip("\n") != "Country,Code,Product,Cost,Quantity":
+        error_lines += 1
+        description.append("\n\nLine 1 should be equal to: 'Country,Code,Product,Cost,Quantity'."
+                           "\nAny product information on line 1 will be ignored by the program.")
+
+    # Describe the lines with errors of each part, with their line number in the file, until the maximum is reached.
+    described_lines = error_lines
+    first_line = 2
+    for line_count, part_errors, line_errors, _ in parts:
+        for line_description in line_errors:
+            if max_errors is not None and described_lines >= max_errors:
+                break
+            described_lines += 1
+            line_description["line"] = str(int(line_description["line"]) + first_line - 1)
+            description.append(describe_line(line_description))
+        error_lines += part_errors
+        first_line += line_count
+
+    if max_errors is not None and error_lines > max_errors:
+        description.append(f"\n\n{error_lines - max_errors} more line(s) with errors not shown.")
+
+    # This function returns a list of three values:
+    # Position 0: a boolean value indicating if there are errors in the file format.
+    # Position 1: a string containing a detailed error message, formatted for print.
+    # Position 2: a ShoeColumns object with the products in the file, or None if there are errors.
+    if error_lines:
+        return [True, "".join(description), None]
+
+    inventory_list = parts[0][3] if parts else ShoeColumns()
+    for part in parts[1:]:
+        inventory_list.extend(part[3])
+    return [False, "".join(description), inventory_list]
+
+
+# Function to check the format of a large inventory file and create the Shoe objects using several processes, each
+# checking a part of the file at the same time. See source 20.
+# This function takes in the name of the file, the maximum number of lines with errors to describe and the number of
+# processes. It returns the same list as load_shoes, with the same products and errors as if it had read the file
+# itself.
+def load_shoes_parallel(file_name="inventory.txt", max_errors=None, workers=LOAD_WORKERS):
+
+    # The first line, with the titles, is read here, and the rest of the file is split into parts of about
+    # LOAD_CHUNK_SIZE bytes, which end at the end of a line.
+    with open(file_name, "rb") as inventory_file:
+        titles = next(decode_lines(inventory_file.readline()), None)
+        parts = file_parts(inventory_file, LOAD_CHUNK_SIZE)
+
+    # Each process reads its own part of the file, so only the results are sent back.
+    # The results come back in the order of the parts, so the products are in the same order as in the file.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(parts), 1))) as executor:
+        results = list(executor.map(load_part, itertools.repeat(file_name), parts, itertools.repeat(max_errors)))
+
+    count("lines read", sum(result[0] for result in results) + (titles is not None))
+    return describe_file(file_name, titles, results, max_errors)
+
+
+# Function to split the rest of an open binary file, from its current position, into parts of about a number of bytes.
+# Each part ends at the end of a line, so no line is split between two parts.
+# This function returns a list of (start, end) positions in the file.
+def file_parts(binary_file, part_size):
+
+    start = binary_file.tell()
+    file_size = os.fstat(binary_file.fileno()).st_size
+    parts = []
+    while start < file_size:
+        binary_file.seek(min(start + part_size, file_size))
+        binary_file.readline()
+        end = max(binary_file.tell(), start + 1)
+        parts.append((start, end))
+        start = end
+    return parts
+
+
+# Function to check the lines of a part of the inventory file, in a separate process.
+# This function takes in the name of the file, the (start, end) positions of the part and the maximum number of lines
+# with errors to describe, and returns the tuple returned by load_lines.
+def load_part(file_name, part, max_errors=None):
+
+    start, end = part
+    with open(file_name, "rb") as inventory_file:
+        inventory_file.seek(start)
+        data = inventory_file.read(end - start)
+    return load_lines(decode_lines(data), max_errors)
+
+
+# Function to read bytes from the inventory file as lines of text, in the same way as a file opened with 'open' in
+# text mode: with the default encoding and any line ending ('\r\n' or '\r') turned into '\n'.
+def decode_lines(data):
+
+    return io.TextIOWrapper(io.BytesIO(data))
+
+
+# Function to check the format of the inventory file and create the Shoe objects, reading the file line by line or,
+# if it is large enough, with load_shoes_parallel.
+# This function takes in the name of the file and the maximum number of lines with errors to describe.
+# A FileNotFoundError is raised if the file is missing.
+def load_file(file_name="inventory.txt", max_errors=None):
+
+    if LOAD_WORKERS > 1 and os.path.getsize(file_name) >= PARALLEL_LOAD_SIZE:
+        return load_shoes_parallel(file_name, max_errors)
+
+    with open(file_name, "r") as inventory_file:
+        return load_shoes(read_lines(inventory_file), max_errors, file_name)
+
+
+# Function to check the inventory file has the right format.
+# This function takes in a list (or any iterable) of lines and, optionally, the maximum number of lines with errors
+# to describe.
+def check_file(file_list, max_errors=None):
 
     # This function returns a list two values:
     # Position 0: a boolean value indicating if there are errors in the list format.
     # Position 1: a string containing a detailed error message, formatted for print.
-    return [errors, error_description]
+    return load_shoes(file_list, max_errors)[:2]
 
 
 # Function to read the inventory file.
-def read_shoes_data():
+# This function takes in the name of the file and the maximum number of lines with errors to describe.
+# If 'interactive' is False and the file is missing or has errors, the user is not asked to fix it and None is returned.
+def read_shoes_data(file_name="inventory.txt", max_errors=MAX_FILE_ERRORS, interactive=True):
+
+    while True:
+
+        # If there is a binary snapshot that is not older than the file, read the products from it instead.
+        shoes = read_binary_snapshot(file_name)
+        if shoes is not None:
+            return shoes
 
-    # Create inventory_list.
-    inventory_list = []
+        # Look for the file 'inventory.txt' in the program's directory.
+        try:
+            # If the file is found, check its format and create the Shoe objects while reading it line by line, or in
+            # parts with several processes if it is large.
+            with timed("check file"):
+                file_errors = load_file(file_name, max_errors)
+
+            # If errors have been found, print the error description for the user to fix them.
+            # If there is a backup of the file, let the user know, so they can restore it instead.
+            if file_errors[0]:
+                print(file_errors[1])
+                if os.path.exists(f"{file_name}.1"):
+                    print(f"The previous version of the file is saved as '{file_name}.1'.")
+
+            # If the file format is correct, this function returns a ShoeColumns object,
+            # which can be used like a list of Shoe objects.
+            else:
+                return file_errors[2]
 
-    # Declare variable to exit import function.
-    quit_import = False
+        # If the file is not found, print an error message.
+        except FileNotFoundError:
+            print(f"File '{file_name}' was not found.\n")
+
+        # Ask the user if they want to try to find the file again or exit the program.
+        if not interactive or not ask_to_fix_file(file_name):
+            return None
+
+
+# Function to ask the user to fix the inventory file, and try to find it again or exit the program.
+# This function takes in the name of the file and returns True if the user wants to try again, or False to exit.
+def ask_to_fix_file(file_name):
 
     while True:
+        selection = input(f"\nPlease save the file '{file_name}' in {os.getcwd()}, using the correct format. "
+                          f"\nWhen ready, enter 'done' to try again or 'quit' to exit the program: ").lower()
+
+        # If user types 'done' return True to search again for the file.
+        if selection == "done":
+            return True
+
+        # If the user enters 'quit' print a message and return False to exit the program.
+        elif selection == "quit":
+            print("Goodbye")
+            return False
+
+        # If the users enters anything else, print an error message and ask them to choose again.
+        else:
+            print("Invalid selection.")
+
+
+# Function to read the binary snapshot of an inventory file, if there is one that is not older than the file.
+# This function takes in the name of the inventory file.
+# It returns a ShoeColumns object, or None if there is no snapshot that can be used.
+def read_binary_snapshot(file_name):
+
+    binary_name = binary_file_name(file_name)
+    try:
+        if os.path.exists(file_name) and os.stat(binary_name).st_mtime_ns < os.stat(file_name).st_mtime_ns:
+            return None
+        with timed("read binary snapshot"), BinarySnapshot(binary_name) as snapshot:
+            return snapshot.to_columns()
+
+    except FileNotFoundError:
+        return None
+
+    # If the snapshot can't be read, print the reason and use the text file instead.
+    except ValueError as error:
+        print(f"{error} Reading '{file_name}' instead.")
+        return None
+
+
+# Function to get the name of the binary snapshot of an inventory file, e.g. 'inventory.bin' for 'inventory.txt'.
+def binary_file_name(file_name):
+
+    return os.path.splitext(file_name)[0] + ".bin"
+
+
+# Function to get the bytes of an array in little-endian byte order.
+def array_bytes(column):
+
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+# Function to get the bytes of a table of names: the number of names, where each one starts and ends, and the names.
+def names_bytes(names):
+
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = array("Q", [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    return struct.pack("<Q", len(names)) + array_bytes(offsets) + b"".join(encoded)
+
+
+# Function to save the rows of a ShoeColumns object in the binary format read by BinarySnapshot.
+# This function takes in the columns and the name of the binary file.
+# The file is written under a temporary name and then renamed, so a reader never sees half of it.
+def write_binary(columns, binary_name):
+
+    # Encode the codes with a fixed width. Codes that don't fit can't be saved in this format.
+    codes = []
+    for code in columns.codes:
+        encoded = code.encode("ascii")
+        if len(encoded) > BINARY_CODE_WIDTH:
+            raise ValueError(f"Product code {code} is longer than {BINARY_CODE_WIDTH} characters.")
+        codes.append(encoded.ljust(BINARY_CODE_WIDTH, b"\0"))
+
+    rows = len(codes)
+    sorted_rows = array("Q", sorted(range(rows), key=codes.__getitem__))
+    sections = [names_bytes(columns.countries), names_bytes(columns.products), b"".join(codes),
+                array_bytes(columns.country_ids), array_bytes(columns.product_ids), array_bytes(columns.costs),
+                array_bytes(columns.quantities), array_bytes(sorted_rows)]
+
+    # Calculate where each section starts, leaving each one at a position that is a multiple of 8.
+    positions = []
+    position = BINARY_HEADER.size
+    for section in sections:
+        position += -position % 8
+        positions.append(position)
+        position += len(section)
+
+    # The snapshot can be made again from the text file, so no backups of it are kept.
+    save_file(binary_name, binary_chunks(rows, positions, sections), backups=0)
+
 
-        # Check if the user has chosen to exit the program and, if so, break the loop.
-        if quit_import:
+# Function to get the parts of a binary snapshot in the order they are written: the header, and each section
+# after the padding that makes it start at its position.
+def binary_chunks(rows, positions, sections):
+
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BINARY_CODE_WIDTH, rows, *positions)
+    yield header
+    position = len(header)
+    for section_at, section in zip(positions, sections):
+        yield b"\0" * (section_at - position)
+        yield section
+        position = section_at + len(section)
+
+
+# Function to save an inventory as a binary snapshot, including the changes in its journal.
+# This function takes in the name of the text file and, optionally, the name of the binary file.
+# It returns True if the snapshot has been saved, or False if the text file is missing or has errors.
+def export_binary(file_name="inventory.txt", binary_name=None):
+
+    inventory = TextFileInventory(file_name, interactive=False)
+    if not inventory.refresh():
+        return False
+
+    # The changes written by other programs since the inventory was read are included too.
+    with inventory.locked():
+        inventory.catch_up()
+        write_binary(inventory.shoes, binary_name or binary_file_name(file_name))
+    return True
+
+
+# Function to save a binary snapshot as an inventory text file.
+# This function takes in the name of the binary file and the name of the text file, and returns False if the binary
+# file is missing or is not a binary snapshot.
+# The journal of the old inventory is replaced with a new one and any unfinished compaction is dropped, so their changes
+# are not replayed over the new inventory. The lock of compact is held too, so a compaction running in another program
+# doesn't save the old inventory over the new one.
+def import_binary(binary_name, file_name="inventory.txt"):
+
+    try:
+        with BinarySnapshot(binary_name) as snapshot:
+            columns = snapshot.to_columns()
+    except (FileNotFoundError, ValueError) as error:
+        print(f"The binary snapshot '{binary_name}' can't be read: {error}")
+        return False
+
+    inventory = TextFileInventory(file_name, interactive=False)
+    temp_name = write_temp_file(file_name, text_chunks(inventory_lines(columns)))
+    with open(file_name + ".compact.lock", "a") as compact_lock:
+        if fcntl is not None:
+            fcntl.flock(compact_lock.fileno(), fcntl.LOCK_EX)
+        with inventory.locked():
+            inventory.start_journal()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(inventory.compacting_name)
+            commit_file(temp_name, file_name)
+    return True
+
+
+# Function to get the lines of the inventory file for the rows of a ShoeColumns object, starting with the titles.
+def inventory_lines(columns):
+
+    yield "Country,Code,Product,Cost,Quantity"
+    for shoe in columns:
+        yield shoe.__str__().strip("\n").replace(", ", ",")
+
+
+# Function to encode lines of text, e.g. the lines from inventory_lines, to be written to a file with save_file.
+# The lines are separated by a new line, without one at the end, like the original inventory file.
+# The lines are joined in blocks, so a large file isn't written one line at a time.
+def text_chunks(lines, block_size=10000):
+
+    lines = iter(lines)
+    separator = ""
+    while True:
+        block = list(itertools.islice(lines, block_size))
+        if not block:
             break
+        yield (separator + "\n".join(block)).encode("utf-8")
+        separator = "\n"
 
-        # Look for the file 'inventory.txt' in the program's directory.
+
+# Function to write a file safely, so a crash or Ctrl-C while it is being written doesn't leave it incomplete.
+# The data is written to a temporary file, which is saved to disk and then renamed over the original file.
+# This function takes in the name of the file, an iterable of bytes to write and the number of backups to keep.
+def save_file(file_name, chunks, backups=BACKUP_COUNT):
+
+    count("files saved")
+    with timed("save file"):
+        commit_file(write_temp_file(file_name, chunks), file_name, backups)
+
+
+# Function to write the data for a file to a temporary file next to it and save it to disk.
+# This function takes in the name of the file and an iterable of bytes, and returns the name of the temporary file.
+# The temporary file is removed if the data can't be written.
+def write_temp_file(file_name, chunks):
+
+    # The name includes the process ID, so two programs writing the same file don't write the same temporary file.
+    temp_name = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        with open(temp_name, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+            count("bytes saved", file.tell())
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_name)
+        raise
+    return temp_name
+
+
+# Function to rename a temporary file written by write_temp_file over the original file.
+# Before that, the backups of the file are renamed ('inventory.txt.1' to 'inventory.txt.2' and so on), and the
+# current file becomes the most recent backup. The renames are saved to disk before the function returns.
+def commit_file(temp_name, file_name, backups=BACKUP_COUNT):
+
+    if backups > 0 and os.path.exists(file_name):
+        for number in range(backups - 1, 0, -1):
+            if os.path.exists(f"{file_name}.{number}"):
+                os.replace(f"{file_name}.{number}", f"{file_name}.{number + 1}")
+
+        # The backup is a hard link to the current file, so the file is never missing while it is replaced.
+        # If the file system doesn't support hard links, it is copied instead.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"{file_name}.1")
         try:
-            # If the file is found, store its content on a list of lines and call the function to check its format.
-            with open("inventory.txt", "r") as inventory_file:
-                temp_list = inventory_file.readlines()
-                file_errors = check_file(temp_list)
+            os.link(file_name, f"{file_name}.1")
+        except OSError:
+            shutil.copy2(file_name, f"{file_name}.1")
 
-                # If errors have been found, print the error description for the user to fix them.
-                if file_errors[0]:
-                    print(file_errors[1])
+    os.replace(temp_name, file_name)
+    sync_directory(file_name)
 
-                # If the file format is correct, create a Shoe object per each file line, skipping the first one.
-                # Append each object to a list.
-                else:
-                    for line in temp_list[1: len(temp_list)]:
-                        line = line.strip("\n").split(",")
-                        inventory_list.append(Shoe(line[0], line[1], line[2], line[3], line[4]))
 
-                    # This function returns a list of Shoe objects, if the file is found and in the right format.
-                    return inventory_list
+# Function to save the list of files in the directory of a file to disk, so a file that has been created or renamed
+# is still there after a crash. Directories can't be opened on Windows, so nothing is done there.
+def sync_directory(file_name):
 
-        # If the file is not found, print an error message.
-        except FileNotFoundError:
-            print(f"File 'inventory.txt' was not found.\n")
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    directory = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
 
-        # Ask the user if they want to try to find the file again or exit the program.
-        while True:
-            selection = input(f"\nPlease save the file 'inventory.txt' in {os.getcwd()}, using the correct format. "
-                              f"\nWhen ready, enter 'done' to try again or 'quit' to exit the program: ").lower()
 
-            # If user types 'done' break this loop to search again for the file.
-            if selection == "done":
-                break
+# Function to check if a journal has records that are not in the inventory file yet.
+# A journal that only has the 'base' record written by a compaction has no changes.
+def journal_has_changes(journal_name):
 
-            # If the user enters 'quit' print a message and exit the loop and the program.
-            elif selection == "quit":
-                quit_import = True
-                print("Goodbye")
-                break
+    try:
+        with open(journal_name, "rb") as journal:
+            data = journal.read(64)
+    except FileNotFoundError:
+        return False
 
-            # If the users enters anything else, print an error message and ask them to choose again.
-            else:
-                print("Invalid selection.")
+    version, _, record = data.partition(b",")
+    return not (version.isdigit() and record == b"base\n")
 
 
 # Function to check if a value can be cast as a float.
@@ -187,6 +3162,104 @@ def is_float(input_data):
         return False
 
 
+# Function to check if a cost can be saved in the inventory file: a positive number written with digits and at most
+# one decimal point, so check_line accepts it when the file is read again. Not a number (NaN), infinity and numbers
+# written in exponent notation (e.g. 1e-05) are not valid.
+# This function takes in a number and returns a boolean value.
+def is_valid_cost(cost):
+
+    if isinstance(cost, bool):
+        return False
+    try:
+        number = float(cost)
+    except (TypeError, ValueError, OverflowError):
+        return False
+    return 0 < number < float("inf") and str(to_number(cost)).replace(".", "", 1).isdigit()
+
+
+# Function to normalize a country name so names that only differ in case, accents or spaces are equal.
+def normalize_country(name):
+
+    name = unicodedata.normalize("NFKD", name.casefold())
+    name = "".join(character for character in name if not unicodedata.combining(character))
+    return " ".join(name.split())
+
+
+# Function to split a name into the words used by the search index: in lowercase, without accents, and separated by
+# any character that is not a letter or a digit, e.g. 'Air Max 90 (ON SALE)' gives 'air', 'max', '90', 'on', 'sale'.
+def name_words(name):
+
+    name = normalize_country(name)
+    return "".join(character if character.isalnum() else " " for character in name).split()
+
+
+# Function to get the name of a country as it is saved in the inventory file.
+# If the name contains a ',' it is replaced with '-'. This is to avoid issues when processing the file where ',' is
+# the separator.
+def file_country_name(country):
+
+    return country.name.replace(", ", " - ")
+
+
+# Function to build an index of countries, from every name and code of each country to the name saved in the file.
+# The index is built the first time it is needed and kept for the rest of the session.
+@functools.lru_cache(maxsize=None)
+def country_index():
+
+    count("country index builds")
+    index = {}
+    for country in import_pycountry().countries:
+        for attribute in ("alpha_2", "alpha_3", "name", "common_name", "official_name"):
+            value = getattr(country, attribute, None)
+            if value:
+                index[normalize_country(value)] = file_country_name(country)
+                index[normalize_country(value.replace(", ", " - "))] = file_country_name(country)
+    return index
+
+
+# Function to look for countries similar to a name with 'search_fuzzy', which checks all the countries, their
+# subdivisions and historic names. The results for the most recent names searched are kept in a cache.
+# This function takes in a normalized name and returns a tuple of country names as saved in the file.
+@functools.lru_cache(maxsize=COUNTRY_CACHE_SIZE)
+def fuzzy_countries(name):
+
+    count("fuzzy country searches")
+    try:
+        pycountry = import_pycountry()
+        return tuple(file_country_name(result) for result in pycountry.countries.search_fuzzy(name))
+
+    # 'search_fuzzy' raises a LookupError when nothing is found.
+    except LookupError:
+        return ()
+
+
+# Function to find the countries that match a name, without asking the user anything.
+# An exact name or alpha-2/alpha-3 code is found in the index of countries. Only other names are searched with
+# 'search_fuzzy'. This function returns a list of country names as saved in the file, the best match first.
+def country_matches(name):
+
+    name = normalize_country(name)
+    if not name:
+        return []
+
+    count("country lookups")
+    with timed("country lookup"):
+        if name in country_index():
+            return [country_index()[name]]
+
+        return list(fuzzy_countries(name))
+
+
+# Function to find the country that best matches a name, e.g. for a batch import.
+# This function returns the country name as saved in the file, or None if no country matches.
+def resolve_country(name):
+
+    matches = country_matches(name)
+    if matches:
+        return matches[0]
+    return None
+
+
 # Function to ask user to enter a country name and validate it exists.
 def validate_country():
 
@@ -211,13 +3284,13 @@ def validate_country():
             country_options_dict = {}
             country_options_table = []
 
-            # With 'search_fuzzy', look for countries similar to the user's entry and store objects in a list.
-            search_results = pycountry.countries.search_fuzzy(country)
+            # Look for the country in the index of countries or, if it is not there, for countries similar to the
+            # user's entry with 'search_fuzzy'.
+            search_results = country_matches(country)
 
-            # Search for the name variable for each result and save it with its position in a list and a dictionary.
-            for counter, result in enumerate(search_results):
+            # Save each result with its position in a list and a dictionary.
+            for counter, entry in enumerate(search_results):
                 position = str(counter + 1)
-                entry = result.name
                 country_options_dict[position] = entry
                 country_options_table.append([position, entry])
 
@@ -252,11 +3325,6 @@ def validate_country():
                     if number in country_options_dict.keys():
                         valid_country = True
                         country = country_options_dict[number]
-
-                        # If the country name contains a ',' replace it with '-'.
-                        # This is to avoid issues when processing the file where ',' is the separator.
-                        if ", " in country:
-                            country = country.replace(", ", " - ")
                         print(f"You have selected: {string.capwords(country)}.")
                         break
 
@@ -273,14 +3341,21 @@ def validate_country():
 
 
 # Function to create a new Shoe object from information entered by the user.
-# This function takes in a list of Shoe objects.
-def capture_shoes(inventory_list):
+# This function takes in an InventoryStore object.
+def capture_shoes(inventory):
 
     # Call the function to ask the user to enter a country and validate it exists.
     country = validate_country()
 
     # Call the function to ask the user to enter a code and validate it is entered in the right format.
-    product_code = validate_sku()
+    # Ask again if the code is already in the inventory, as each code identifies a single product.
+    while True:
+        product_code = validate_sku()
+
+        if inventory.find(product_code) is None:
+            break
+
+        print(f"Product code {product_code} is already in the inventory.")
 
     # Ask the user to enter the product name.
     # Validate that th input is not empty and that the name is between 1 and 140 characters long.
@@ -330,8 +3405,14 @@ def capture_shoes(inventory_list):
         else:
             print("Please enter a valid product quantity (Must be a positive number). ")
 
-    # Create a new Shoe object with the information collected and append it to the shoe list.
-    inventory_list.append(Shoe(country, product_code, string.capwords(product_name), product_cost, product_qty))
+    # Create a new Shoe object with the information collected and add it to the inventory.
+    # This appends an 'add' record to the journal of the 'inventory.txt' file.
+    # If another user has added the same code in the meantime, print an error message instead.
+    try:
+        inventory.add(Shoe(country, product_code, string.capwords(product_name), product_cost, product_qty))
+    except ValueError as error:
+        print(f"{error} The product has not been added.")
+        return
 
     # Print the new object's information.
     table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
@@ -339,19 +3420,11 @@ def capture_shoes(inventory_list):
 
     print(tabulate(table_content, headers=table_headers, tablefmt="pretty"))
 
-    # Construct a string with the new object information and overwrite the 'inventory.txt' file.
-    file_info = "Country,Code,Product,Cost,Quantity"
-    for shoe in inventory_list:
-        file_info += "\n" + shoe.__str__().strip("\n").replace(", ", ",")
-
-    with open("inventory.txt", "w") as file:
-        file.write(file_info)
-
     # Print a message announcing the task has been completed.
-    print("New inventory item has been added to 'inventory.txt'.")
+    print(f"New inventory item has been added to '{inventory.file_name}'.")
 
-    # This function returns a list of Shoe objects with the new object in index -1.
-    return inventory_list
+    # This function returns the new Shoe object.
+    return inventory.find(product_code)
 
 
 # Function to ask the user to enter a code and validate it is entered in the right format.
@@ -365,7 +3438,7 @@ def validate_sku():
         if product_code == "":
             print("Product code cannot be empty.")
 
-        elif product_code[0:3] == "SKU" and product_code[3:8].isdigit() and len(product_code) == 8:
+        elif is_valid_sku(product_code):
             break
 
         else:
@@ -373,71 +3446,290 @@ def validate_sku():
     return product_code
 
 
-# Function to see all the Shoes in the inventory.
-# This function takes in a list of Shoe objects.
-def view_all(inventory_list):
+# Function to check if a product code has the right format: 'SKU' followed by 5 numbers.
+def is_valid_sku(product_code):
+
+    return product_code[0:3] == "SKU" and product_code[3:8].isdigit() and len(product_code) == 8
+
+
+# Function to add all the shoes in a CSV file to the inventory, without asking the user anything.
+# The file has the same format as 'inventory.txt'. Countries are resolved to their names in the file and product
+# names are capitalized, as when capturing a shoe.
+# All the lines are checked first, and the shoes are only added if there are no errors, with a single write.
+# This function takes in an InventoryStore object and the name of the CSV file, and returns True if the shoes were
+# added.
+def import_shoes(inventory, csv_name):
+
+    try:
+        with open(csv_name, "r") as csv_file:
+            file_errors = load_shoes(csv_file, MAX_FILE_ERRORS, csv_name)
+    except FileNotFoundError:
+        print(f"File '{csv_name}' was not found.")
+        return False
+
+    if file_errors[0]:
+        print(file_errors[1])
+        return False
+
+    # Check each shoe. Line numbers start at 2, as line 1 contains the titles.
+    errors = []
+    new_shoes = []
+    new_codes = set()
+    for line_count, shoe in enumerate(file_errors[2]):
+        code = shoe.code.upper()
+        country = resolve_country(shoe.country)
+
+        if not is_valid_sku(code):
+            errors.append(f"Line {line_count + 2}: product code {shoe.code} is not in the format SKU#####.")
+        elif code in new_codes or inventory.find(code) is not None:
+            errors.append(f"Line {line_count + 2}: product code {code} is already in the inventory.")
+        if country is None:
+            errors.append(f"Line {line_count + 2}: no country found for '{shoe.country}'.")
+
+        new_codes.add(code)
+        new_shoes.append(Shoe(country, code, string.capwords(shoe.product), shoe.cost, shoe.quantity))
+
+    if errors:
+        print(f"\nErrors in the file {csv_name}:\n" + "\n".join(errors[:MAX_FILE_ERRORS]))
+        if len(errors) > MAX_FILE_ERRORS:
+            print(f"{len(errors) - MAX_FILE_ERRORS} more error(s) not shown.")
+        print("No shoes have been added.")
+        return False
+
+    try:
+        inventory.add_many(new_shoes)
+    except ValueError as error:
+        print(f"{error} No shoes have been added.")
+        return False
+    print(f"{len(new_shoes)} new inventory item(s) have been added to '{inventory.file_name}'.")
+    return True
+
+
+# Function to print the products with the given codes, without asking the user anything.
+# The table is formatted without tabulate, so a lookup from a script doesn't have to import it.
+# If the inventory is a text file with an up-to-date binary snapshot and no changes in the journal, the codes are
+# looked up in the snapshot without loading the inventory. This function takes in the name of the inventory file
+# (or database) and a list of codes, and returns True if all the codes were found.
+def lookup_shoes(file_name, codes):
 
-    # Create a list of headers and a list for the rows on the table.
-    # To fill the 'table_content' list loop through the object list exacting the information of each Shoe.
     table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
     table_content = []
+    missing = []
+
+    inventory = open_inventory(file_name, interactive=False)
+    use_snapshot = False
+    if isinstance(inventory, TextFileInventory):
+        binary_name = binary_file_name(file_name)
+        with inventory.locked(exclusive=False):
+            use_snapshot = (os.path.exists(binary_name) and not journal_has_changes(inventory.journal_name)
+                            and not os.path.exists(inventory.compacting_name)
+                            and (not os.path.exists(file_name)
+                                 or os.stat(binary_name).st_mtime_ns >= os.stat(file_name).st_mtime_ns))
+
+            if use_snapshot:
+                with BinarySnapshot(binary_name) as snapshot:
+                    shoes = [snapshot.find(code.upper()) for code in codes]
+
+    if not use_snapshot:
+        if not inventory.refresh():
+            return False
+        shoes = [inventory.find(code.upper()) for code in codes]
+
+    for code, shoe in zip(codes, shoes):
+        if shoe is None:
+            missing.append(code.upper())
+        else:
+            table_content.append(shoe.__str__().strip("\n").split(", "))
 
-    for product in inventory_list:
-        table_content.append(product.__str__().strip("\n").split(", "))
+    if table_content:
+        print(format_table(table_content, table_headers))
+    if missing:
+        print(f"Code(s) not in database: {', '.join(missing)}.")
+    return not missing
 
-    # Print the information in a table.
-    print(f"\n{tabulate(table_content, headers=table_headers, tablefmt='pretty')}")
 
+# Function to measure the width of each column of a table.
+# This function takes in a list of rows, the list of headers and, optionally, the widths measured before, e.g. for
+# the previous pages of a long table, so each column keeps the widest width seen.
+def column_widths(table_content, headers, widths=None):
 
-# Function to find the item(s) with the lowest quantity and add more stock.
-# This function takes in a list of Shoe objects.
-def re_stock(inventory_list):
-
-    lowest_qty = []
-
-    # For each object on the list find their position and quantity.
-    # Compare the quantity of each item with the quantity of the items in 'lowest_qty'.
-    # If equal, append position and quantity. If lower, replace values on the list with the new position and quantity.
-    for position, product in enumerate(inventory_list):
-        qty = int(product.get_quantity())
-        if position != 0:
-            if lowest_qty[0][1] == qty:
-                lowest_qty.append([position, qty])
-            elif lowest_qty[0][1] > qty:
-                lowest_qty = [[position, qty]]
-        else:
-            lowest_qty.append([position, qty])
+    widths = list(widths or [0] * len(headers))
+    for row in [headers] + list(table_content):
+        for column, item in enumerate(row):
+            widths[column] = max(widths[column], len(str(item)))
+    return widths
+
+
+# Function to format a table in the same style as tabulate's 'pretty' format, without importing tabulate.
+# This function takes in a list of rows, the list of headers and, optionally, the minimum width of each column.
+# Only the rows given are measured.
+def format_table(table_content, headers, widths=None):
+
+    count("tables rendered")
+    with timed("render table"):
+        table_content = [[str(item) for item in row] for row in table_content]
+        widths = column_widths(table_content, headers, widths)
+        return table_text([table_line(row, widths) for row in table_content], headers, widths)
+
+
+# Function to format a row of a table made by format_table, with the width of each column.
+# As in tabulate, an item that can't be centered exactly has one more space after it than before it.
+def table_line(row, widths):
+
+    cells = []
+    for item, width in zip(row, widths):
+        item = str(item)
+        space = width - len(item)
+        cells.append(" " * (space // 2) + item + " " * (space - space // 2))
+    return "| " + " | ".join(cells) + " |"
+
+
+# Function to put the formatted rows of a table (see table_line) between its headers and borders.
+def table_text(lines, headers, widths):
+
+    border = "+" + "+".join("-" * (width + 2) for width in widths) + "+"
+    return "\n".join(itertools.chain((border, table_line(headers, widths), border), lines, (border,)))
+
+
+# Function to go through the positions of the rows that match the filters, starting from a position.
+# This function takes in a ShoeColumns object, the position to start from, and parts of a country and product name to
+# look for (ignoring case), or None to show all. The names are checked once in the tables of names, not once per row.
+def matching_rows(columns, start=0, country=None, product=None):
+
+    country_ids = None
+    product_ids = None
+    if country:
+        country_ids = {position for position, name in enumerate(columns.countries)
+                       if country.casefold() in name.casefold()}
+    if product:
+        product_ids = {position for position, name in enumerate(columns.products)
+                       if product.casefold() in name.casefold()}
+
+    for position in range(start, len(columns)):
+        if country_ids is not None and columns.country_ids[position] not in country_ids:
+            continue
+        if product_ids is not None and columns.product_ids[position] not in product_ids:
+            continue
+        yield position
+
+
+# Function to see the Shoes in the inventory, a page at a time.
+# This function takes in an InventoryStore object and, optionally, the number of items per page, the number of matching
+# items to skip, and parts of a country and product name to filter the items by.
+# Only the items of a page are read and measured before it is printed, so the first page is shown straight away.
+# If 'interactive' is True the user can move to the next or previous page, otherwise only one page is printed.
+def view_all(inventory, page_size=VIEW_PAGE_SIZE, offset=0, country=None, product=None, interactive=True):
+
+    revision = inventory.revision()
+    columns = inventory.columns()
+    widths = None
+
+    # Find the position of the first item to show, skipping 'offset' matching items.
+    start = next(itertools.islice(matching_rows(columns, 0, country, product), offset, None), None)
+    if start is None:
+        print("\nNo items found.")
+        return
+
+    # Keep the position and number of the first item of each page shown, to go back to previous pages.
+    page_starts = [(start, offset)]
+
+    while True:
+        start, first_number = page_starts[-1]
+
+        # Make the page, or get it from the cache of views if it has been made since the inventory last changed.
+        key = ("page", start, page_size, country, product, widths and tuple(widths))
+        table, rows, next_start, widths = inventory.views.get(
+            key, revision, lambda state: (view_page(columns, start, page_size, country, product, widths), None))
+
+        # Print the information in a table.
+        total = "" if country or product else f" of {len(columns)}"
+        print(f"\nItems {first_number + 1} to {first_number + rows}{total}:\n{table}")
+
+        if not interactive or (next_start is None and len(page_starts) == 1):
+            return
+
+        # Ask the user to choose the next page, the previous page or to go back to the menu.
+        while True:
+            selection = input("\nEnter 'n' for the next page, 'p' for the previous page or 'q' to go back: ").lower()
+
+            if selection == "n" and next_start is not None:
+                page_starts.append((next_start, first_number + rows))
+                break
+            elif selection == "p" and len(page_starts) > 1:
+                page_starts.pop()
+                break
+            elif selection == "q":
+                return
+            else:
+                print("Invalid selection.")
+
+
+# Function to make a page of view_all, starting from the position of its first item.
+# This function takes in the columns, the position, the number of items per page, the filters and the widths of the
+# columns of the pages shown before (or None). Columns keep the widest width seen so far, so pages line up.
+# This function returns the table, the number of items on it, the position of the first item of the next page (or None
+# if this is the last page) and the widths of the columns.
+def view_page(columns, start, page_size, country=None, product=None, widths=None):
 
-    # Create a list with headers and an empty dictionary which will be used to create a table.
     table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
-    table_content = {}
 
-    # From the 'inventory_list', find the objects identified in the 'lowest_qty' list.
-    # To 'table_content' add the position as the key and the object's values as a list.
-    for counter, item in enumerate(lowest_qty):
-        table_content[item[0]] = inventory_list[item[0]].__str__().strip("\n").split(", ")
+    # Collect the rows of the page, and the position of the first item of the next page, if there is one.
+    table_content = []
+    next_start = None
+    for position in matching_rows(columns, start, country, product):
+        if len(table_content) == page_size:
+            next_start = position
+            break
+        table_content.append(columns[position].__str__().strip("\n").split(", "))
+
+    widths = column_widths(table_content, table_headers, widths)
+    return format_table(table_content, table_headers, widths), len(table_content), next_start, widths
+
+
+# Function to make the view of the items with the lowest or highest quantities, for the ViewCache of a store.
+# This function takes in the list of Shoe objects and the headers of the table, and returns the table and the list as
+# the output of the view, with no state.
+def quantity_view(shoes, table_headers):
+
+    table_content = [shoe.__str__().strip("\n").split(", ") for shoe in shoes]
+    return (tabulate(table_content, headers=table_headers, tablefmt="pretty"), shoes), None
+
+
+# Function to find the item(s) with the lowest quantity and add more stock.
+# This function takes in an InventoryStore object and, optionally, the number of items to show.
+# If no number is given, all the items tied for the lowest quantity are shown.
+def re_stock(inventory, count=None):
+
+    # Get the items with the lowest quantities from the store, which finds them with an index, and make their table.
+    # Both are only made again if the inventory has changed since they were last shown.
+    table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
+    table, lowest_qty = inventory.views.get(("lowest", count), inventory.revision(),
+                                            lambda state: quantity_view(inventory.lowest(count), table_headers))
+    print(f"\nItems with lowest quantities:\n{table}")
 
-    # Print information of products with the lowest quantities on a table.
-    print(f"\nItems with lowest quantities:"
-          f"\n{tabulate(table_content.values(), headers=table_headers, tablefmt='pretty')}")
+    # Create a dictionary with the code of each object in the 'lowest_qty' list as the key and its values as a list.
+    table_content = {shoe.code: shoe.__str__().strip("\n").split(", ") for shoe in lowest_qty}
 
     # For each item with low quantity ask the user if they want to add stock.
-    quantities_change = False
+    # The restocks are collected in a batch and saved with a single write once every item has been asked about.
+    changes = ChangeBatch(inventory)
     for item in table_content:
         while True:
             selection = input(f"\nProduct Code: {table_content[item][-4]}"
                               "\nWould you like to restock this item? (y/n): ").lower()
 
             # If the user selects 'y' ask for the quantity they'd like to add.
-            # If the user enters a number: change the quantity in the object list and the table content dictionary.
+            # If the user enters a number: change the quantity in the inventory and the table content dictionary.
             if selection == "y":
                 while True:
                     qty_increase = input("\nPlease enter the quantity you would like to add: ")
 
                     if qty_increase.isdigit():
-                        inventory_list[item].quantity = int(table_content[item][-1]) + int(qty_increase)
-                        table_content[item][-1] = int(table_content[item][-1]) + int(qty_increase)
-                        quantities_change = True
+                        try:
+                            table_content[item][-1] = changes.restock(item, int(qty_increase))
+                        except ValueError as error:
+                            print(f"Invalid entry. {error}")
+                            continue
                         break
 
                     # Print an error message if the user does not enter a number.
@@ -454,67 +3746,285 @@ def re_stock(inventory_list):
             else:
                 print("Invalid entry.")
 
-    if quantities_change:
+    if changes:
+        # Save the restocks. The amounts are added to the latest quantities, which may have been changed by another
+        # user, so the table is updated with the quantities saved.
+        # A restock that could not be saved is reported, and its row shows the quantity in the store again.
+        results = changes.commit()
+        for code, result in results.items():
+            if isinstance(result, KeyError):
+                print(f"The stock of product {code} could not be added: it is no longer in the inventory.")
+                table_content[code][-1] = "deleted"
+            elif isinstance(result, Exception):
+                print(f"The stock of product {code} could not be added: {result}")
+                table_content[code][-1] = inventory.find(code).quantity
+            else:
+                table_content[code][-1] = result
+
         # Show the user the quantities of the items after they have been changed.
         print(f"\nNew quantities:"
               f"\n{tabulate(table_content.values(), headers=table_headers, tablefmt='pretty')}")
 
-        # Construct a string with the new object information and overwrite the 'inventory.txt' file.
-        file_info = "Country,Code,Product,Cost,Quantity"
-        for shoe in inventory_list:
-            file_info += "\n" + shoe.__str__().strip("\n").replace(", ", ",")
+        # Print a message announcing the task has been completed, if any restock was saved.
+        if not all(isinstance(result, Exception) for result in results.values()):
+            print(f"Stock quantities have been updated in '{inventory.file_name}'.")
+
+
+# Function to find the items at or below their reorder point and restock them up to their target quantity, with a
+# single write. See class ReorderEngine.
+# This function takes in an InventoryStore object and, optionally, the number of items to reorder (all of them if no
+# number is given) and whether to order the suggested quantities (True), only show them (False) or ask the user (None).
+# The user can order every suggested quantity, choose the quantity of each item, or cancel. If no item needs to be
+# reordered, the user is offered the items with the lowest quantities instead (see re_stock).
+# This function returns the number of items restocked.
+def reorder_stock(inventory, count=None, apply=None):
+
+    # Get the restock plan from the store, which keeps the items to reorder up to date as quantities change.
+    plan = inventory.reorder_plan(count)
+    if not plan:
+        print("\nNo items are at or below their reorder point.")
+        if apply is None:
+            re_stock(inventory, count)
+        return 0
+
+    # Create a table with a row per item, ending with the quantity to order.
+    table_headers = ["Country", "Code", "Product", "Quantity", "Reorder point", "Target", "To order"]
+    table_content = [[shoe.country, shoe.code, shoe.product, shoe.quantity, point, target, amount]
+                     for shoe, point, target, amount in plan]
+
+    # Print the items furthest below their reorder point on a table, and the number of items not shown.
+    print(f"\nItems at or below their reorder point:"
+          f"\n{tabulate(table_content[:VIEW_PAGE_SIZE], headers=table_headers, tablefmt='pretty')}")
+    if len(table_content) > VIEW_PAGE_SIZE:
+        print(f"... and {len(table_content) - VIEW_PAGE_SIZE} more item(s).")
+    print(f"{sum(row[-1] for row in table_content)} unit(s) to order for {len(table_content)} item(s).")
+
+    # Ask the user if they want to order the suggested quantities, choose them, or cancel.
+    while apply is None:
+        selection = input("\nWould you like to order these quantities (y), choose the quantity of each item (c) "
+                          "or cancel (n)?: ").lower()
+
+        if selection == "y":
+            apply = True
+
+        # If the user selects 'c', ask for the quantity of each item. Enter keeps the suggested quantity.
+        elif selection == "c":
+            for row in table_content:
+                while True:
+                    amount = input(f"\nProduct Code: {row[1]}\t\tQuantity: {row[3]}\t\tSuggested order: {row[-1]}"
+                                   "\nPlease enter the quantity to order (Enter for the suggested quantity, "
+                                   "0 to skip): ")
+                    if amount.isdigit():
+                        row[-1] = int(amount)
+                        break
+                    elif amount == "":
+                        break
+                    else:
+                        print("Invalid entry. Please enter a number.")
+            apply = True
 
-        with open("inventory.txt", "w") as file:
-            file.write(file_info)
+        elif selection == "n":
+            apply = False
 
-        # Print a message announcing the task has been completed.
-        print("Stock quantities have been updated in 'inventory.txt'.")
+        else:
+            print("Invalid entry.")
+
+    if not apply:
+        print("No stock has been ordered.")
+        return 0
+
+    # Save every restock with a single write. The amounts are added to the latest quantities, which may have been
+    # changed by another user, so the table is updated with the quantities saved.
+    orders = [row for row in table_content if row[-1] > 0]
+    if not orders:
+        print("No stock has been ordered.")
+        return 0
+    results = inventory.apply_changes([("restock", row[1], row[-1]) for row in orders])
+    restocked = []
+    for row, result in zip(orders, results):
+        if isinstance(result, Exception):
+            print(f"Code {row[1]} is no longer in the inventory.")
+        else:
+            row[3] = result
+            restocked.append(row)
 
+    # Show the user the quantities of the items after they have been restocked.
+    table_headers[-1] = "Ordered"
+    print(f"\nNew quantities:"
+          f"\n{tabulate(restocked[:VIEW_PAGE_SIZE], headers=table_headers, tablefmt='pretty')}")
+    if len(restocked) > VIEW_PAGE_SIZE:
+        print(f"... and {len(restocked) - VIEW_PAGE_SIZE} more item(s).")
+    print(f"Stock quantities of {len(restocked)} item(s) have been updated in '{inventory.file_name}'.")
+    return len(restocked)
 
-# Function to search for a product's information by entering its sku code.
-# This function takes in a list of Shoe objects.
-def search_shoe(inventory_list):
 
-    # Create a list of shoes from 'inventory_list', where the info of each product is a list.
-    shoes = []
-    for item in inventory_list:
-        shoes.append(item.__str__().strip("\n").split(", "))
+# Function to ask the user for a product code and change its reorder point and target quantity.
+# This function takes in an InventoryStore object.
+def set_reorder_point(inventory):
+
+    product_code = validate_sku()
+    if inventory.find(product_code) is None:
+        print(f"Code {product_code} not in database.")
+        return
+
+    point, target = read_thresholds(inventory.file_name).get(product_code, (REORDER_POINT, REORDER_TARGET))
+    print(f"Product {product_code} is reordered when its quantity is {point} or less, up to {target}.")
+
+    # Ask for the new reorder point, and a target quantity higher than it.
+    while True:
+        point = input("\nPlease enter the new reorder point: ")
+        if point.isdigit():
+            point = int(point)
+            break
+        print("Invalid entry. Please enter a number.")
+
+    while True:
+        target = input("\nPlease enter the new target quantity: ")
+        if target.isdigit() and int(target) > point:
+            target = int(target)
+            break
+        print("Invalid entry. Please enter a number that is higher than the reorder point.")
+
+    inventory.set_thresholds({product_code: (point, target)})
+    print(f"The reorder point of product {product_code} has been saved in "
+          f"'{thresholds_file_name(inventory.file_name)}'.")
+
+
+# Function to find the products whose country and product names have some words, or whose codes match a prefix or range,
+# and print them on a table, e.g. 'air max', 'vietnam' or 'SKU44*'. See SearchIndex.search.
+# This function takes in an InventoryStore object and, optionally, the search (if it is not given, the user is asked to
+# enter it) and the maximum number of products to show. It returns True if any products were found.
+def find_shoes(inventory, text=None, limit=VIEW_PAGE_SIZE):
+
+    if text is None:
+        text = input("\nEnter words of the product or country names (e.g. 'air max vietnam'), "
+                     "or the start of a code followed by '*' (e.g. 'SKU44*'): ")
+
+    # Ask for one more product than can be shown, to know if there are more.
+    shoes = inventory.search(text, limit + 1)
+    if not shoes:
+        print(f"No products found for '{text}'.")
+        return False
+
+    table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
+    table_content = [shoe.__str__().strip("\n").split(", ") for shoe in shoes[:limit]]
+    print(f"\nProducts found for '{text}':\n{tabulate(table_content, headers=table_headers, tablefmt='pretty')}")
+    if len(shoes) > limit:
+        print(f"Only the first {limit} products are shown. Add more words to the search to find fewer products.")
+    return True
+
+
+# Function to print the history of the inventory (see class InventoryHistory), without asking the user anything:
+#   With a code, the changes of quantity and cost of the product or, with a time, its quantity and cost at that time.
+#   Without a code, the total value of the inventory at the end of each of the last days or, with a time, at that time.
+# This function takes in the name of the inventory file and, optionally, the code, the time as text (see parse_time)
+# and the number of days. It returns False if the history has nothing to show.
+def show_history(file_name, code=None, at=None, days=7):
+
+    history = InventoryHistory(file_name)
+    if not history.exists():
+        print(f"There is no history of changes for '{file_name}' yet. It is started by the next change.")
+        return False
+
+    when = None
+    if at is not None:
+        when = parse_time(at)
+        if when is None:
+            print(f"'{at}' is not a valid date. Please use the format 2026-01-31 or '2026-01-31 18:00'.")
+            return False
+
+    # Print the quantity and cost of the product at the time.
+    if code is not None and when is not None:
+        stock = history.stock_at(code, when)
+        if stock is None:
+            print(f"Product {code} is not in the history on {format_time(when)}.")
+            return False
+        print(f"On {format_time(when)}, product {code} had a quantity of {stock[0]} and a cost of {stock[1]}.")
+        return True
+
+    # Print every change of the product. A blank quantity or cost is one that didn't change.
+    if code is not None:
+        changes = history.product_changes(code)
+        if not changes:
+            print(f"Product {code} is not in the history.")
+            return False
+        table_content = [[format_time(change_time), "" if quantity is None else quantity, "" if cost is None else cost]
+                         for change_time, quantity, cost in changes]
+        print(f"\nHistory of product {code}:"
+              f"\n{tabulate(table_content, headers=['Time', 'Quantity', 'Cost'], tablefmt='pretty')}")
+        return True
+
+    # Print the total value of the inventory at the time or, if no time is given, at the end of each of the last days
+    # and now.
+    if when is not None:
+        times = [when]
+    else:
+        now = time.time()
+        today = time.localtime(now)
+        times = [time.mktime((today.tm_year, today.tm_mon, today.tm_mday - day, 23, 59, 59, 0, 0, -1))
+                 for day in range(days - 1, 0, -1)] + [now]
+
+    table_content = [[format_time(value_time), value]
+                     for value_time, value in zip(times, history.values_at(times)) if value is not None]
+    if not table_content:
+        print(f"The history of '{file_name}' starts after {format_time(times[-1])}.")
+        return False
+    print(f"\nTotal value of the inventory:"
+          f"\n{tabulate(table_content, headers=['Time', 'Total Value'], tablefmt='pretty')}")
+    return True
+
+
+# Function to convert a date, or a date and time, such as '2026-01-31' or '2026-01-31 18:00', to seconds since 1970.
+# A date without a time is the end of that day. This function returns None if the text is not a valid date.
+def parse_time(text):
+
+    for time_format in ("%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S"):
+        try:
+            moment = time.strptime(text.strip(), time_format)
+        except ValueError:
+            continue
+        if time_format == "%Y-%m-%d":
+            # The end of the day is just before the start of the next one.
+            return time.mktime((moment.tm_year, moment.tm_mon, moment.tm_mday + 1, 0, 0, 0, 0, 0, -1)) - 0.001
+        return time.mktime(moment)
+    return None
+
+
+# Function to format a time, in seconds since 1970, as a date and time in the computer's time zone.
+def format_time(seconds):
+
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds))
+
+
+# Function to search for a product's information by entering its sku code.
+# This function takes in an InventoryStore object.
+def search_shoe(inventory):
 
     # Call function to ask the user to enter a code and validate it is entered in the right format.
     shoe_search = validate_sku()
 
     table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
-    table_content = []
-    shoe_codes = []
 
     while True:
 
-        # Create a list of the sku codes in the shoes list.
-        for shoe in shoes:
-            shoe_codes.append(shoe[1])
+        # Look for the code entered by the user in the index of codes in stock.
+        # If it is there, return the product's info to be printed.
+        shoe = inventory.find(shoe_search)
+        if shoe is not None:
+            return tabulate([shoe.__str__().strip("\n").split(", ")], headers=table_headers, tablefmt="pretty")
 
-        # Check for the code entered by the user in the list of codes in stock.
-        # If it is on the list, look for all the entries for that code and return their info to be printed.
-        if shoe_search in shoe_codes:
-            for shoe in shoes:
-                if shoe_search == shoe[1]:
-                    table_content.append(shoe)
-            return tabulate(table_content, headers=table_headers, tablefmt="pretty")
-
-        # If the code is not on the list, ask the user if they want to add this shoe to the inventory.
+        # If the code is not in the index, ask the user if they want to add this shoe to the inventory.
         else:
             while True:
                 selection = input("The code entered is not in stock. "
                                   "Would you like to add this item to the inventory (y/n)?: ").lower()
 
-                # If the user selects 'y', call the function to add the shoe to inventory and update the 'shoes' list.
+                # If the user selects 'y', call the function to add the shoe to inventory and return its info.
                 if selection == "y":
-                    inventory_list = capture_shoes(inventory_list)
-                    shoes = []
-                    for item in inventory_list:
-                        shoes.append(item.__str__().strip("\n").split(", "))
-
-                    table_content.append(inventory_list[-1].__str__().strip("\n").split(", "))
+                    shoe = capture_shoes(inventory)
+                    if shoe is None:
+                        return f"None. Code {shoe_search} not added."
+                    table_content = [shoe.__str__().strip("\n").split(", ")]
                     return tabulate(table_content, headers=table_headers, tablefmt="pretty")
 
                 # If the user enters 'n', ask them to if they want to search for a different code.
@@ -541,54 +4051,189 @@ def search_shoe(inventory_list):
 
 
 # Function to calculate and display the total value of each item in stock.
-# This function takes in a list of Shoe objects.
-def value_per_item(inventory_list):
+# This function takes in an InventoryStore object.
+def value_per_item(inventory):
+
+    # The table is only made again if the inventory has changed since it was last shown, and then only the rows
+    # whose value has changed are formatted again. See value_table.
+    table = inventory.views.get("value per item", inventory.revision(),
+                                lambda state: value_table(inventory.item_values(), state))
+
+    # Print the table.
+    print(f"\nTotal value of items in stock:\n{table}")
+
+
+# Function to make the table of the total value of each item, from the ItemValues of an inventory.
+# This function takes in the ItemValues and the state kept by the ViewCache the last time the table was made (or None),
+# and returns the table and the state to keep: the columns, the version of the values and the widths and formatted
+# rows of the table.
+# If the table was made from the same columns and the log of the values goes back to its version, only the rows updated
+# since are formatted again. Columns keep the widest width seen so far, and all the rows are formatted again if a
+# column has to be wider.
+def value_table(item_values, state):
 
     table_headers = ["Code", "Product", "Total Value"]
-    table_content = []
+    columns = item_values.columns
 
-    # For each shoe object on the list add their code, name and total value to the 'table_content' list.
-    for shoe in inventory_list:
-        table_content.append([shoe.code, shoe.product, shoe.get_total_value()])
+    # Function to get the cells of the row of a position.
+    def row_cells(position):
+        return [columns.codes[position], columns.products[columns.product_ids[position]],
+                str(to_number(item_values.values[position]))]
 
-    # Print a table with the information collected above.
-    print(f"\nTotal value of items in stock:\n{tabulate(table_content, headers=table_headers, tablefmt='pretty')}")
+    changes = None
+    if state is not None and state[0] is columns:
+        changes = item_values.changes_since(state[1])
+
+    if changes is None:
+        rows = [row_cells(position) for position in range(len(columns))]
+        widths = column_widths(rows, table_headers)
+        lines = [table_line(row, widths) for row in rows]
+    else:
+        _, _, widths, lines = state
+        rows = {position: row_cells(position) for position in sorted(set(changes))}
+        new_widths = column_widths(rows.values(), table_headers, widths)
+        if new_widths != widths:
+            widths = new_widths
+            lines = [table_line(row_cells(position), widths) for position in range(len(columns))]
+        else:
+            for position, row in rows.items():
+                if position < len(lines):
+                    lines[position] = table_line(row, widths)
+                else:
+                    lines.append(table_line(row, widths))
+
+    count("tables rendered")
+    with timed("render table"):
+        table = table_text(lines, table_headers, widths)
+    return table, (columns, item_values.version, widths, lines)
+
+
+# Function to get the names of the price bands in the PRICE_BANDS setting.
+def price_band_names():
+
+    names = [f"Under {PRICE_BANDS[0]}"]
+    for lower, upper in zip(PRICE_BANDS, PRICE_BANDS[1:]):
+        names.append(f"{lower} to {upper}")
+    names.append(f"{PRICE_BANDS[-1]} or more")
+    return names
+
+
+# Function to calculate the value of the stock and group it by country, product and price band.
+# This function takes in a ShoeColumns object. The calculations are done over whole columns at once with NumPy if it
+# is installed, otherwise with a loop per column.
+# This function returns a dictionary with:
+#   "values": the total value of each item, in the same order as the rows.
+#   "total": the total value of all the items in stock.
+#   "country", "product" and "price band": a dictionary with the lists "names", "items", "quantities" and "values",
+#   with one entry per group that has items, sorted from the highest to the lowest total value.
+@timed("calculate report")
+def inventory_report(columns):
+
+    band_names = price_band_names()
+    numpy = import_numpy()
+
+    if numpy is not None:
+        # Read the arrays of the columns without copying them.
+        costs = numpy.frombuffer(columns.costs, dtype=numpy.float64)
+        quantities = numpy.frombuffer(columns.quantities, dtype=numpy.int64)
+        values = costs * quantities
+        group_ids = {
+            "country": (columns.countries, numpy.frombuffer(columns.country_ids, dtype=numpy.uint32)),
+            "product": (columns.products, numpy.frombuffer(columns.product_ids, dtype=numpy.uint32)),
+            "price band": (band_names, numpy.searchsorted(numpy.array(PRICE_BANDS), costs, side="right")),
+        }
+
+        report = {"values": values, "total": to_number(float(values.sum()))}
+        for group, (names, ids) in group_ids.items():
+            items = numpy.bincount(ids, minlength=len(names))
+            group_quantities = numpy.bincount(ids, weights=quantities, minlength=len(names))
+            group_values = numpy.bincount(ids, weights=values, minlength=len(names))
+
+            # Keep the groups that have items, from the highest to the lowest total value.
+            order = numpy.flatnonzero(items)
+            order = order[numpy.argsort(-group_values[order], kind="stable")]
+            report[group] = {"names": [names[position] for position in order],
+                             "items": items[order].tolist(),
+                             "quantities": group_quantities[order].astype(numpy.int64).tolist(),
+                             "values": [to_number(value) for value in group_values[order].tolist()]}
+        return report
+
+    values = [cost * quantity for cost, quantity in zip(columns.costs, columns.quantities)]
+    group_ids = {
+        "country": (columns.countries, columns.country_ids),
+        "product": (columns.products, columns.product_ids),
+        "price band": (band_names, [bisect.bisect_right(PRICE_BANDS, cost) for cost in columns.costs]),
+    }
+
+    report = {"values": values, "total": to_number(sum(values))}
+    for group, (names, ids) in group_ids.items():
+        items = [0] * len(names)
+        group_quantities = [0] * len(names)
+        group_values = [0] * len(names)
+        for position, group_id in enumerate(ids):
+            items[group_id] += 1
+            group_quantities[group_id] += columns.quantities[position]
+            group_values[group_id] += values[position]
+
+        order = sorted((position for position in range(len(names)) if items[position]),
+                       key=lambda position: -group_values[position])
+        report[group] = {"names": [names[position] for position in order],
+                         "items": [items[position] for position in order],
+                         "quantities": [group_quantities[position] for position in order],
+                         "values": [to_number(group_values[position]) for position in order]}
+    return report
+
+
+# Function to display the total value of the stock and its value per country, product and price band.
+# This function takes in an InventoryStore object and the maximum number of groups to show on each table.
+def value_report(inventory, limit=10):
+
+    # The report is only made again if the inventory has changed since it was last shown.
+    print(inventory.views.get(("value report", limit), inventory.revision(),
+                              lambda state: (value_report_text(inventory.columns(), limit), None)))
+
+
+# Function to make the text of the value report of value_report, from the columns of the inventory.
+def value_report_text(columns, limit=10):
+
+    report = inventory_report(columns)
+
+    lines = [f"\nTotal value of items in stock: {report['total']}"]
+
+    for group in ("country", "product", "price band"):
+        table_headers = [group.capitalize(), "Items", "Quantity", "Total Value"]
+        table_content = list(zip(report[group]["names"], report[group]["items"], report[group]["quantities"],
+                                 report[group]["values"]))[:limit]
+
+        # Add a table with the groups with the highest total value.
+        lines.append(f"\nValue per {group} (top {len(table_content)} of {len(report[group]['names'])}):"
+                     f"\n{tabulate(table_content, headers=table_headers, tablefmt='pretty')}")
+    return "\n".join(lines)
 
 
 # Function to find the item(s) with the highest quantity and put them on sale.
-# This function takes in a list of Shoe objects.
-def highest_qty(inventory_list):
-
-    highest_quantity = []
-
-    # For each object on the list find their position and quantity.
-    # Compare the quantity of each item with the quantity of the items in 'highest_quantity'.
-    # If equal, append position and quantity. If higher, replace values on the list with the new position and quantity.
-    for position, product in enumerate(inventory_list):
-        qty = int(product.get_quantity())
-        if position != 0:
-            if highest_quantity[0][1] == qty:
-                highest_quantity.append([position, qty])
-            elif highest_quantity[0][1] < qty:
-                highest_quantity = [[position, qty]]
-        else:
-            highest_quantity.append([position, qty])
+# This function takes in an InventoryStore object and, optionally, the number of items to show.
+# If no number is given, all the items tied for the highest quantity are shown.
+def highest_qty(inventory, count=None):
 
-    # Create a list with headers and an empty dictionary which will be used to create a table.
+    # Get the items with the highest quantities from the store, which finds them with an index, and make their table.
+    # Both are only made again if the inventory has changed since they were last shown.
     table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
-    table_content = {}
+    table, highest = inventory.views.get(("highest", count), inventory.revision(),
+                                         lambda state: quantity_view(inventory.highest(count), table_headers))
+    print(f"\nItems with highest quantities:\n{table}")
 
-    # From the 'inventory_list', find the objects identified in the 'highest_quantity' list.
-    # To 'table_content' add the position as the key and the object's values as a list.
-    for counter, item in enumerate(highest_quantity):
-        table_content[item[0]] = inventory_list[item[0]].__str__().strip("\n").split(", ")
+    # Keep the items by code, to compare the new price with their cost.
+    inventory_list = {shoe.code: shoe for shoe in highest}
 
-    # Print information of products with the highest quantities on a table.
-    print(f"\nItems with highest quantities:"
-          f"\n{tabulate(table_content.values(), headers=table_headers, tablefmt='pretty')}")
+    # Create a dictionary with the code of each object in 'inventory_list' as the key and its values as a list.
+    table_content = {code: shoe.__str__().strip("\n").split(", ") for code, shoe in inventory_list.items()}
 
     # For each item with high quantity ask the user if they want to put on sale (reduce price).
-    price_change = False
+    # The new prices are collected in a sale plan and saved with a single write once every item has been asked about.
+    # The original cost of an item already on sale is kept.
+    sales = read_sales(inventory.file_name)
+    plan = []
 
     for item in table_content:
         while True:
@@ -596,25 +4241,24 @@ def highest_qty(inventory_list):
                               "\nWould you like to put this item on sale? (y/n): ").lower()
 
             # If the user selects 'y' ask for the new price.
-            # If the user enters a lower number: change the price in the object list and the table content dictionary.
+            # If the user enters a lower number: change the price in the inventory and the table content dictionary.
             if selection == "y":
                 while True:
                     sale_price = input("\nPlease enter the new price: ")
 
-                    if sale_price.isdigit() and int(sale_price) < int(table_content[item][-2]):
-                        inventory_list[item].cost = int(sale_price)
+                    if sale_price.isdigit() and 0 < int(sale_price) < inventory_list[item].cost:
                         table_content[item][-2] = int(sale_price)
-                        price_change = True
 
-                        # Add (ON SALE) to the product's name.
-                        if " (ON SALE)" not in inventory_list[item].product:
-                            inventory_list[item].product += " (ON SALE)"
-                            table_content[item][-3] += " (ON SALE)"
+                        # Add the new price to the sale plan. The product's name is not changed.
+                        original, cost = sales.get(item, (None, None))
+                        if cost != inventory_list[item].cost:
+                            original = inventory_list[item].cost
+                        plan.append((inventory_list[item], int(sale_price), original))
                         break
 
                     # Print an error message if the user does not enter a lower number.
                     else:
-                        print("Invalid entry. Please enter a number that is lower than the current price.")
+                        print("Invalid entry. Please enter a number above 0 that is lower than the current price.")
                 break
 
             # If the user selects 'n' let them know the price will remain the same.
@@ -626,75 +4270,350 @@ def highest_qty(inventory_list):
             else:
                 print("Invalid entry.")
 
-    if price_change:
+    if plan:
+        inventory.apply_sale(plan)
+
         # Show the user the prices of the items after they have been changed.
         print(f"\nNew prices:"
               f"\n{tabulate(table_content.values(), headers=table_headers, tablefmt='pretty')}")
 
-        # Construct a string with the new object information and overwrite the 'inventory.txt' file.
-        file_info = "Country,Code,Product,Cost,Quantity"
-        for shoe in inventory_list:
-            file_info += "\n" + shoe.__str__().strip("\n").replace(", ", ",")
+        # Print a message announcing the task has been completed.
+        print(f"Sale prices have been updated in '{inventory.file_name}'.")
 
-        with open("inventory.txt", "w") as file:
-            file.write(file_info)
 
-        # Print a message announcing the task has been completed.
-        print("Sale prices have been updated in 'inventory.txt'.")
+# Function to put on sale, or take off sale, every item that matches a rule, e.g. '20% off where quantity > 50 and
+# country = Vietnam' or 'end where country = Vietnam'. See class SaleRule.
+# This function takes in an InventoryStore object and, optionally, the rule (if it is not given, the user is asked to
+# enter it) and whether to save the new prices (True), only show them as a dry run (False) or ask the user (None).
+# All the new prices are saved with a single write. This function returns True if the rule is valid.
+def sale_rules(inventory, text=None, apply=None):
+
+    if text is None:
+        text = input("\nEnter a sale rule, e.g. '20% off where quantity > 50 and country = Vietnam', "
+                     "or 'end where country = Vietnam' to end a sale: ")
+    try:
+        rule = SaleRule.parse(text)
+    except ValueError as error:
+        print(error)
+        return False
+
+    # Get the new prices of every item that matches the rule, without saving them yet.
+    plan = inventory.sale_plan(rule)
+    if not plan:
+        print("\nNo prices would be changed by this rule.")
+        return True
+
+    table_headers = ["Country", "Code", "Product", "Quantity", "Cost", "New cost", "On sale"]
+    table_content = [[shoe.country, shoe.code, shoe.product, shoe.quantity, to_number(shoe.cost), cost,
+                      "no" if original is None else f"yes (from {original})"] for shoe, cost, original in plan]
+    value_change = sum((cost - shoe.cost) * shoe.quantity for shoe, cost, _ in plan)
+
+    # Print the first items on a table, the number of items not shown and the change in the value of the stock.
+    print(f"\nNew prices:\n{tabulate(table_content[:VIEW_PAGE_SIZE], headers=table_headers, tablefmt='pretty')}")
+    if len(table_content) > VIEW_PAGE_SIZE:
+        print(f"... and {len(table_content) - VIEW_PAGE_SIZE} more item(s).")
+    print(f"{len(plan)} price(s) would change, and the value of the stock by {to_number(round(value_change, 2))}.")
+
+    while apply is None:
+        selection = input("\nWould you like to save these prices? (y/n): ").lower()
+        if selection in ("y", "n"):
+            apply = selection == "y"
+        else:
+            print("Invalid entry.")
+
+    if not apply:
+        print("No prices have been changed.")
+        return True
+
+    results = inventory.apply_sale(plan)
+    changed = sum(1 for result in results if not isinstance(result, Exception))
+    print(f"{changed} price(s) have been updated in '{inventory.file_name}'.")
+    return True
 
 
 # ==========Main Menu=============
 
-# Print welcome message.
-print("\nWelcome to our Stock Management System!")
+# Function to run the menu, where the user selects what to do until they choose to quit.
+# This function takes in an InventoryStore object.
+def main_menu(inventory):
 
-while True:
+    # Print welcome message.
+    print("\nWelcome to our Stock Management System!")
 
-    # Call function to create a list of Shoe objects from the 'inventory.txt' file.
-    shoe_list = read_shoes_data()
+    while True:
 
-    # Display menu options and ask the user to select one.
-    menu_option = input("\nPlease select one of the following options:\n"
-                        "\n\tC\t-\tCapture new shoe"
-                        "\n\tVA\t-\tView all shoes"
-                        "\n\tR\t-\tRe-Stock (Increase qty)"
-                        "\n\tS\t-\tSearch shoe"
-                        "\n\tVI\t-\tValue per item"
-                        "\n\tH\t-\tHighest stock (Put ON SALE)"
-                        "\n\tQ\t-\tQuit\n").upper()
+        # Make sure the store has the latest changes. The 'inventory.txt' file is only read again if it has changed.
+        # If the user has chosen to exit the program while the file was being fixed, break the loop.
+        with timed("refresh inventory"):
+            if not inventory.refresh():
+                break
+
+        # Display menu options and ask the user to select one.
+        menu_option = input("\nPlease select one of the following options:\n"
+                            "\n\tC\t-\tCapture new shoe"
+                            "\n\tVA\t-\tView all shoes (a page at a time)"
+                            "\n\tR\t-\tRe-Stock the items at or below their reorder point. Add a number to "
+                            "reorder that many items, e.g. 'R 5'"
+                            "\n\tRP\t-\tSet the reorder point and target quantity of a product"
+                            "\n\tS\t-\tSearch shoe"
+                            "\n\tF\t-\tFind shoes by product or country name, or code prefix, e.g. 'air max', 'SKU44*'"
+                            "\n\tVI\t-\tValue per item"
+                            "\n\tVR\t-\tValue report (Total value per country, product and price band)"
+                            "\n\tH\t-\tHighest stock (Put ON SALE). Add a number to see that many items, e.g. 'H 5'"
+                            "\n\tSR\t-\tSale rule (Change the prices of every matching item), e.g. "
+                            "'20% off where quantity > 50'"
+                            "\n\tHI\t-\tHistory of the quantity and cost of a product"
+                            "\n\tSTATS\t-\tShow the time taken by each phase of the program in this session"
+                            "\n\tQ\t-\tQuit\n").upper().split()
+
+        # Separate the option from the number of items entered after it, if any.
+        menu_count = None
+        if len(menu_option) == 2 and menu_option[1].isdigit() and int(menu_option[1]) > 0:
+            menu_count = int(menu_option[1])
+            menu_option = menu_option[0]
+        elif len(menu_option) == 1:
+            menu_option = menu_option[0]
+        else:
+            menu_option = " ".join(menu_option)
+
+        # If user selects 'C', call the function to add a new shoe to stock.
+        if menu_option == "C":
+            capture_shoes(inventory)
+
+        # If user selects 'VA', call the function to print the whole inventory on a table.
+        elif menu_option == "VA":
+            view_all(inventory)
+
+        # If the user selects 'R', call the function to find the items at or below their reorder point and restock
+        # them up to their target quantity.
+        elif menu_option == "R":
+            reorder_stock(inventory, menu_count)
+
+        # If the user selects 'RP', ask for a product code and its new reorder point and target quantity.
+        elif menu_option == "RP":
+            set_reorder_point(inventory)
+
+        # If the user selects 'S', call the function to search for a product code and print the corresponding
+        # information.
+        elif menu_option == "S":
+            print(f"\nSearch results:\n{search_shoe(inventory)}")
+
+        # If the user selects 'F', ask for words of the product or country names, or a code prefix, and print the
+        # products found.
+        elif menu_option == "F":
+            find_shoes(inventory)
+
+        # If the user selects 'VI', find the total value of each item in stock and display it on a table.
+        elif menu_option == "VI":
+            value_per_item(inventory)
+
+        # If the user selects 'VR', display the total value of the stock per country, product and price band.
+        elif menu_option == "VR":
+            value_report(inventory)
+
+        # If the user selects 'H', call the function to find the item(s) with highest qty and decrease the cost.
+        elif menu_option == "H":
+            highest_qty(inventory, menu_count)
+
+        # If the user selects 'SR', ask for a sale rule, show the new prices of the items that match it and save them.
+        elif menu_option == "SR":
+            sale_rules(inventory)
+
+        # If the user selects 'HI', ask for a product code and print the changes of its quantity and cost.
+        elif menu_option == "HI":
+            show_history(inventory.file_name, validate_sku())
+
+        # If the user selects 'STATS', print the time taken by each phase and the counters since the program started.
+        elif menu_option == "STATS":
+            print_stats()
+
+        # If the user selects 'Q', wait for any changes still being compacted into the file and exit the program.
+        elif menu_option == "Q":
+            inventory.wait()
+            print("Goodbye!")
+            break
 
-    # If user selects 'C', call the function to add a new shoe to stock.
-    if menu_option == "C":
-        capture_shoes(shoe_list)
+        # If the user enters anything else, print an error message.
+        else:
+            print("Invalid selection.")
+
+
+# Function to run the program from the command line.
+# With no command, the menu is shown. With a command, it is run without asking the user anything, e.g.:
+#   python inventory.py import new_shoes.csv
+#   python inventory.py restock SKU44386 10
+#   python inventory.py reorder --set SKU44386 20 100 --apply
+#   python inventory.py lookup SKU44386 SKU90000
+#   python inventory.py search air max vietnam --limit 50
+#   python inventory.py view --page-size 50 --offset 100 --country vietnam
+#   python inventory.py report
+#   python inventory.py sale "20% off where quantity > 50 and country = Vietnam" --dry-run
+#   python inventory.py history SKU44386 --at 2026-01-31
+#   python inventory.py migrate inventory.db
+#   python inventory.py --file inventory.db restock SKU44386 10
+# A file ending in '.db', '.sqlite' or '.sqlite3' is used as an SQLite database instead of a text file.
+# With '--stats', the time taken by each phase of the program is printed when it finishes. Profiling is turned on with
+# the INVENTORY_PROFILE environment variable (see the settings).
+# This function takes in the list of command line arguments (by default, those given to the program) and returns
+# the exit status: 0 if the command succeeded, 1 if not.
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description="Stock management system for an inventory of shoes.")
+    parser.add_argument("--file", default="inventory.txt",
+                        help="inventory file, or SQLite database (default: inventory.txt)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the time taken by each phase of the program when it finishes")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    import_parser = commands.add_parser("import", help="add all the shoes in a CSV file in the inventory format")
+    import_parser.add_argument("csv_file")
+
+    restock_parser = commands.add_parser("restock", help="add a quantity to the stock of a product")
+    restock_parser.add_argument("code")
+    restock_parser.add_argument("quantity", type=int)
+
+    reorder_parser = commands.add_parser("reorder", help="show the products at or below their reorder point and the "
+                                                         "quantities to order")
+    reorder_parser.add_argument("--apply", action="store_true", help="order the quantities shown, with a single write")
+    reorder_parser.add_argument("--count", type=int, help="maximum number of products to reorder")
+    reorder_parser.add_argument("--set", nargs=3, action="append", default=[], metavar=("CODE", "POINT", "TARGET"),
+                                help="set the reorder point and target quantity of a product (can be repeated)")
+
+    lookup_parser = commands.add_parser("lookup", help="show the products with the given codes")
+    lookup_parser.add_argument("codes", nargs="+")
+
+    search_parser = commands.add_parser("search", help="show the products with words in their names, or codes "
+                                                       "starting with a prefix (e.g. 'SKU44*')")
+    search_parser.add_argument("words", nargs="+")
+    search_parser.add_argument("--limit", type=int, default=VIEW_PAGE_SIZE, help="maximum number of products to show")
+
+    history_parser = commands.add_parser("history", help="show the changes of quantity and cost of a product, or the "
+                                                         "value of the inventory over the last days")
+    history_parser.add_argument("code", nargs="?")
+    history_parser.add_argument("--at", help="show the stock of the product, or the value of the inventory, at a date "
+                                             "(e.g. 2026-01-31) or a date and time (e.g. '2026-01-31 18:00')")
+    history_parser.add_argument("--days", type=int, default=7, help="number of days of values to show (default: 7)")
+
+    sale_parser = commands.add_parser("sale", help="change the prices of every product matching a rule, e.g. "
+                                                   "'20%% off where quantity > 50 and country = Vietnam', or end "
+                                                   "their sale, e.g. 'end where country = Vietnam'")
+    sale_parser.add_argument("rule", nargs="+")
+    sale_parser.add_argument("--dry-run", action="store_true", help="only show the new prices, without saving them")
+
+    commands.add_parser("report", help="show the value of the stock per country, product and price band")
+
+    view_parser = commands.add_parser("view", help="show a page of the inventory")
+    view_parser.add_argument("--page-size", type=int, default=VIEW_PAGE_SIZE, help="number of items on the page")
+    view_parser.add_argument("--offset", type=int, default=0, help="number of matching items to skip")
+    view_parser.add_argument("--country", help="only show countries whose name contains this text")
+    view_parser.add_argument("--product", help="only show products whose name contains this text")
+
+    export_parser = commands.add_parser("export-binary", help="save the inventory as a binary snapshot")
+    export_parser.add_argument("binary_file", nargs="?")
+
+    import_binary_parser = commands.add_parser("import-binary", help="save a binary snapshot as the inventory file")
+    import_binary_parser.add_argument("binary_file")
+
+    migrate_parser = commands.add_parser("migrate", help="copy the inventory file into a new SQLite database")
+    migrate_parser.add_argument("database_file", nargs="?", default="inventory.db")
+
+    options = parser.parse_args(arguments)
+
+    # Start the profilers chosen with INVENTORY_PROFILE, and print their reports when the program finishes.
+    profiler = start_profiling()
+    try:
+        return run_command(options)
+    finally:
+        if options.stats:
+            print_stats()
+        stop_profiling(profiler)
+
+
+# Function to run the menu, or the command chosen on the command line.
+# This function takes in the options parsed by main and returns the exit status.
+def run_command(options):
+
+    # Record the time taken to load the program, and print it if SHOW_TIMING is True.
+    print_timing("load program", START_TIME)
+
+    if options.command is None:
+        main_menu(open_inventory(options.file))
+        return 0
+
+    if options.command == "lookup":
+        return 0 if lookup_shoes(options.file, options.codes) else 1
+
+    if options.command == "export-binary":
+        return 0 if export_binary(options.file, options.binary_file) else 1
+
+    if options.command == "import-binary":
+        return 0 if import_binary(options.binary_file, options.file) else 1
+
+    if options.command == "migrate":
+        return 0 if migrate_to_sqlite(options.file, options.database_file) else 1
+
+    if options.command == "history":
+        code = options.code.upper() if options.code else None
+        return 0 if show_history(options.file, code, options.at, max(options.days, 1)) else 1
+
+    # The other commands work on the whole inventory.
+    inventory = open_inventory(options.file, interactive=False)
+    with timed("refresh inventory"):
+        if not inventory.refresh():
+            return 1
+
+    succeeded = True
+    if options.command == "import":
+        succeeded = import_shoes(inventory, options.csv_file)
+
+    elif options.command == "restock":
+        shoe = inventory.find(options.code.upper())
+        if shoe is None:
+            print(f"Code {options.code.upper()} not in database.")
+            succeeded = False
+        elif options.quantity < 0:
+            print("Please enter a positive quantity.")
+            succeeded = False
+        else:
+            quantity = inventory.restock(shoe.code, options.quantity)
+            print(f"Quantity for product {shoe.code} is now {quantity}.")
+
+    elif options.command == "reorder":
+        thresholds = {}
+        for code, point, target in options.set:
+            if inventory.find(code.upper()) is None:
+                print(f"Code {code.upper()} not in database.")
+            elif not point.isdigit() or not target.isdigit() or int(target) <= int(point):
+                print(f"The target quantity of {code.upper()} must be a number higher than its reorder point.")
+            else:
+                thresholds[code.upper()] = (int(point), int(target))
+                continue
+            succeeded = False
+        if thresholds:
+            inventory.set_thresholds(thresholds)
+        if succeeded:
+            reorder_stock(inventory, max(options.count, 1) if options.count is not None else None, options.apply)
 
-    # If user selects 'VA', call the function to print the whole inventory on a table.
-    elif menu_option == "VA":
-        view_all(shoe_list)
+    elif options.command == "search":
+        succeeded = find_shoes(inventory, " ".join(options.words), max(options.limit, 1))
 
-    # If the user selects 'R', call the function to find the item(s) with lowest qty and increase the qty.
-    elif menu_option == "R":
-        re_stock(shoe_list)
+    elif options.command == "sale":
+        succeeded = sale_rules(inventory, " ".join(options.rule), not options.dry_run)
 
-    # If the user selects 'S', call the function to search for a product code and print the corresponding information.
-    elif menu_option == "S":
-        print(f"\nSearch results:\n{search_shoe(shoe_list)}")
+    elif options.command == "report":
+        value_report(inventory)
 
-    # If the user selects 'VI', find the total value of each item in stock and display it on a table.
-    elif menu_option == "VI":
-        value_per_item(shoe_list)
+    elif options.command == "view":
+        view_all(inventory, max(options.page_size, 1), max(options.offset, 0), options.country, options.product,
+                 interactive=False)
 
-    # If the user selects 'H', call the function to find the item(s) with highest qty and decrease the cost.
-    elif menu_option == "H":
-        highest_qty(shoe_list)
+    # Wait for any changes still being compacted into the file.
+    inventory.wait()
+    return 0 if succeeded else 1
 
-    # If the user selects 'Q', exit the program.
-    elif menu_option == "Q":
-        print("Goodbye!")
-        break
 
-    # If the user enters anything else, print an error message.
-    else:
-        print("Invalid selection.")
+if __name__ == "__main__":
+    sys.exit(main())
 
 
 """ ========== Sources ============
@@ -720,4 +4639,81 @@ Source 5: https://www.geeksforgeeks.org/python-string-capwords-method/
 I used the string module to access the capwords method.
 This to format a sentence entered by the user with a capital letter at the beginning of every word.
 
+Source 6: https://docs.python.org/3/library/threading.html
+Changes are written to a journal instead of rewriting the whole inventory file every time.
+I used a thread to compact the journal into the inventory file without making the user wait,
+and a lock so the journal is not renamed while a change is being appended to it.
+
+Source 7: https://docs.python.org/3/library/heapq.html
+I used heaps to find the items with the lowest and highest quantities without checking every item each time.
+Entries for old quantities are left in the heaps and discarded when they reach the top.
+
+Source 8: https://docs.python.org/3/library/array.html
+I used arrays to store the costs and quantities of all the items as columns of numbers,
+which uses much less memory than a Python object per item and means numbers are only converted from text once.
+
+Source 9: https://docs.python.org/3/library/bisect.html
+I used bisect to find the price band of a cost in the list of costs at which each band starts.
+
+Source 10: https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+When NumPy is installed, the value report reads the columns of costs and quantities without copying them
+and uses bincount to add up the value of the items in each country, product and price band in one pass.
+
+Source 11: https://docs.python.org/3/library/mmap.html and https://docs.python.org/3/library/struct.html
+For large inventories I added a binary snapshot with fixed-width columns. I used mmap to read it without loading
+the whole file, struct to read single values from it, and sys.byteorder to always store numbers as little-endian.
+
+Source 12: https://docs.python.org/3/library/functools.html#functools.lru_cache
+The fuzzy search of pycountry is slow, so I built an index of the names and codes of every country to find exact
+matches straight away, and used lru_cache to remember the results of the fuzzy searches already done.
+I used unicodedata to ignore accents when comparing country names.
+
+Source 13: https://docs.python.org/3/library/time.html#time.perf_counter
+and https://docs.python.org/3/library/contextlib.html#contextlib.contextmanager
+To make the program start faster, pycountry, tabulate and NumPy are imported inside functions, only when needed.
+I used perf_counter and a context manager to measure how long each phase of the start of the program takes.
+
+Source 14: https://docs.python.org/3/library/argparse.html
+I used argparse to run commands such as importing a file of new shoes or restocking a product from the command line,
+without going through the menu, so many changes can be made at once by a script.
+
+Source 15: https://docs.python.org/3/library/itertools.html#itertools.islice
+To show the first page of a large inventory straight away, I go through the items that match the filters with a
+generator and used islice to skip to the first item to show, instead of building a table with every item.
+
+Source 16: https://docs.python.org/3/library/fcntl.html#fcntl.flock
+So that several people can use the same inventory at the same time, the files are only changed while holding an
+exclusive lock on a lock file, and each record in the journal has a version number, so the records written by another
+copy of the program are replayed before a change is made. Restocks add an amount to the latest quantity.
+
+Source 17: https://docs.python.org/3/library/os.html#os.replace and https://docs.python.org/3/library/os.html#os.fsync
+To make sure the inventory file is never left half-written after a crash, new files are written to a temporary file,
+saved to disk with fsync and then renamed over the old file, which is kept as a backup ('inventory.txt.1').
+
+Source 18: https://docs.python.org/3/library/sqlite3.html and https://www.sqlite.org/wal.html
+For large inventories, the inventory can be kept in an SQLite database, with indexes on the product code and quantity,
+so products are found without reading the whole inventory and each change only updates the row it changes.
+
+Source 19: https://docs.python.org/3/library/profile.html and https://docs.python.org/3/library/tracemalloc.html
+To find out where the time goes when the program is slow, the time of each phase (reading and checking the file,
+looking up countries, formatting tables, saving files) is added up for the session and shown with the 'STATS' option.
+cProfile and tracemalloc can be turned on with the INVENTORY_PROFILE environment variable for more detail.
+
+Source 20: https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+Checking a very large inventory file line by line only uses one CPU, so large files are split into parts that end at
+the end of a line, and each part is checked by a separate process. The results are put together in the order of the
+parts, with the line numbers of the whole file, so they are the same as when the file is read line by line.
+
+Source 21: https://docs.python.org/3/library/array.html#array.array.tofile and
+https://docs.python.org/3/library/time.html#time.strptime
+To keep a history of the stock, each change of quantity or cost is appended with its time to files holding one column
+of numbers each, written and read with array.tofile and array.fromfile. Snapshots of every quantity and cost are saved
+every so often, so the stock at a date is found from the snapshot before it and the few changes made after it.
+
+Source 22: https://numpy.org/doc/stable/user/basics.indexing.html#boolean-array-indexing and
+https://docs.python.org/3/library/operator.html
+To put many items on sale at once, a sale rule such as '20% off where quantity > 50' is read with regular expressions,
+and each condition is checked on a whole column with the functions of the operator module, which give an array of
+True or False when used on NumPy arrays. The sale status and original price are kept apart from the product name.
+
 """
@@ -0,0 +1,111 @@
+# This program measures how many requests per second the inventory server (server.py) answers, and how long the
+# requests take, with many clients sending requests at the same time.
+# Each client keeps its connection open and sends its requests one after another: mostly lookups by code, and a share
+# of restocks (which change the inventory, by 1 each).
+# Usage: python load_test.py [--host 127.0.0.1] [--port 8080] [--clients 50] [--requests 10000] [--writes 0.1]
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+
+
+# Function to send a request and read the response.
+# This function returns the status code and the decoded JSON body.
+async def request(reader, writer, method, path, payload=None):
+
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+# Function to run one client, which sends its share of the requests and saves how long each one took.
+async def client(host, port, codes, requests, writes, latencies, errors):
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            code = random.choice(codes)
+            start = time.perf_counter()
+            if random.random() < writes:
+                status, _ = await request(reader, writer, "POST", "/restock", {"code": code, "amount": 1})
+            else:
+                status, _ = await request(reader, writer, "GET", f"/shoes/{code}")
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+# Function to get a percentile of a list of sorted values, e.g. percentile(latencies, 99).
+def percentile(values, percent):
+
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+# Function to run the clients at the same time, with a share of the requests each, and print the throughput and
+# latencies measured. This function returns the exit status: 1 if any request failed or the inventory is empty.
+async def run(host, port, clients, requests, writes):
+
+    # Get codes to look up from the server: the products with the highest quantities.
+    reader, writer = await asyncio.open_connection(host, port)
+    _, shoes = await request(reader, writer, "GET", "/highest?count=1000")
+    writer.close()
+    codes = [shoe["code"] for shoe in shoes]
+    if not codes:
+        print("The inventory is empty.")
+        return 1
+
+    latencies = []
+    errors = []
+    shares = [requests // clients + (1 if number < requests % clients else 0) for number in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, codes, share, writes, latencies, errors) for share in shares))
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {clients} clients in {duration:.2f} s ({writes:.0%} restocks)")
+    print(f"  requests/second: {len(latencies) / duration:10.1f}")
+    print(f"  p50 latency:     {percentile(latencies, 50) * 1000:10.2f} ms")
+    print(f"  p99 latency:     {percentile(latencies, 99) * 1000:10.2f} ms")
+    print(f"  max latency:     {latencies[-1] * 1000:10.2f} ms")
+    print(f"  errors:          {len(errors):10}")
+    return 1 if errors else 0
+
+
+# Function to read the options from the command line and run the load test.
+# This function returns the exit status.
+def main():
+
+    parser = argparse.ArgumentParser(description="Load test the inventory server.")
+    parser.add_argument("--host", default="127.0.0.1", help="address of the server (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port of the server (default: 8080)")
+    parser.add_argument("--clients", type=int, default=50, help="number of concurrent clients (default: 50)")
+    parser.add_argument("--requests", type=int, default=10000, help="total number of requests (default: 10000)")
+    parser.add_argument("--writes", type=float, default=0.1,
+                        help="share of the requests that are restocks, from 0 to 1 (default: 0.1)")
+    options = parser.parse_args()
+
+    return asyncio.run(run(options.host, options.port, max(options.clients, 1), max(options.requests, 1),
+                           min(max(options.writes, 0.0), 1.0)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# This program serves the inventory over HTTP on this computer, so many clients can look up and change the stock
+# at the same time. Requests and responses are JSON.
+# Usage: python server.py [--file inventory.txt] [--host 127.0.0.1] [--port 8080]
+#
+# Endpoints:
+#   GET  /shoes/SKU44386              the product with a code
+#   GET  /lowest?count=5              the products with the lowest quantities (all those tied, without 'count')
+#   GET  /highest?count=5             the products with the highest quantities (all those tied, without 'count')
+#   GET  /valuation                   the total value of the stock, per country, product and price band
+#   POST /restock {"code": "SKU44386", "amount": 10}
+#                                     add stock to a product, returns its new quantity
+#   POST /reprice {"code": "SKU44386", "cost": 2000, "product": "Air Max 90"}
+#                                     change the cost (and optionally the name) of a product
+#
+# The inventory is kept in memory by the store (see InventoryStore in inventory.py) and read requests are answered
+# from it straight away, or by a reader thread for an SQLite database, whose queries would hold up the other requests.
+# Changes are queued and made by a single writer task, which makes all the changes waiting in
+# the queue with one call to apply_changes, so they are saved with a single write to the journal (or a single
+# transaction, for an SQLite database) however many clients send them at the same time.
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import inventory
+
+
+# Maximum number of changes made with a single write.
+MAX_BATCH = 1000
+
+# Seconds between checks for changes made to the inventory by other programs.
+REFRESH_INTERVAL = 1.0
+
+# Maximum size in bytes of the body of a request.
+MAX_BODY_SIZE = 64 * 1024
+
+# Largest amount of stock that can be added by a single restock.
+MAX_AMOUNT = 1000000000
+
+
+# Exception raised to answer a request with an error, e.g. 'raise RequestError(HTTPStatus.NOT_FOUND, "...")'.
+class RequestError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Definition of class InventoryServer.
+# It answers the requests of each client on its own connection, which is kept open for the next request.
+class InventoryServer:
+
+    # Initialize the store, the queue of changes waiting for the writer task and the running tasks.
+    # The changes are saved, and the changes of other programs read, by a single thread, so the event loop can answer
+    # other requests while the inventory file or database is written.
+    def __init__(self, store, batch_size=MAX_BATCH, refresh_interval=REFRESH_INTERVAL):
+        self.store = store
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self.changes = asyncio.Queue()
+        self.tasks = []
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    # Function to start the writer and refresh tasks, and listen for clients on a host and port.
+    # This function returns the asyncio server.
+    async def start(self, host, port):
+        self.tasks = [asyncio.create_task(self.write_changes()), asyncio.create_task(self.refresh())]
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    # Function to stop the writer and refresh tasks, and wait for any changes still being saved.
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self.executor.shutdown()
+        self.reader.shutdown()
+        self.store.wait()
+
+    # Function to read the changes made to the inventory by other programs every few seconds.
+    async def refresh(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.store.refresh)
+
+    # Function to make the changes in the queue, as they arrive.
+    # All the changes waiting in the queue (up to batch_size) are made with a single call to apply_changes, and the
+    # result of each change is sent to the request that is waiting for it.
+    async def write_changes(self):
+        while True:
+            batch = [await self.changes.get()]
+            while len(batch) < self.batch_size and not self.changes.empty():
+                batch.append(self.changes.get_nowait())
+
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.store.apply_changes, [change for change, _ in batch])
+            except Exception as error:
+                results = [error] * len(batch)
+
+            for (_, result_future), result in zip(batch, results):
+                if not result_future.done():
+                    result_future.set_result(result)
+
+    # Function to read the store with a function, e.g. 'await self.read(self.store.find, code)', while holding its lock
+    # for reading (see InventoryStore.reading), so the writer thread doesn't change it in the meantime.
+    # A store whose reads are blocking (e.g. an SQLite database) is read by the reader thread instead of the event loop.
+    # This function returns the result of the function.
+    async def read(self, function, *arguments):
+        if self.store.blocking_reads:
+            return await asyncio.get_running_loop().run_in_executor(self.reader, self.read_now, function, arguments)
+        return self.read_now(function, arguments)
+
+    # Function to read the store with a function in the thread that is running, while holding its lock for reading.
+    def read_now(self, function, arguments):
+        with self.store.reading():
+            return function(*arguments)
+
+    # Function to queue a change for the writer task and wait for its result.
+    # A RequestError is raised if the code is not in the inventory, the change is not valid (e.g. the quantity would be
+    # too large) or the change can't be saved.
+    async def change(self, change):
+        result_future = asyncio.get_running_loop().create_future()
+        await self.changes.put((change, result_future))
+        result = await result_future
+
+        if isinstance(result, KeyError):
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Code {change[1]} not in database.")
+        if isinstance(result, ValueError):
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(result))
+        if isinstance(result, Exception):
+            raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, f"The change could not be saved: {result}")
+        return result
+
+    # Function to answer the requests of a client until it closes the connection.
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+
+                try:
+                    status, payload = HTTPStatus.OK, await self.route(method, target, body)
+                except RequestError as error:
+                    status, payload = error.status, {"error": error.message}
+                except Exception as error:
+                    status, payload = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       {"error": f"The request could not be answered: {error}"})
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(response_bytes(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+
+        except RequestError as error:
+            writer.write(response_bytes(error.status, {"error": error.message}, keep_alive=False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    # Function to answer a request.
+    # This function takes in the method, the target (path and query) and the body of the request, and returns the
+    # object to send back as JSON. A RequestError is raised if the request can't be answered.
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip("/").split("/")[1:]
+        query = parse_qs(url.query)
+
+        if path[:1] == ["shoes"] and len(path) == 2:
+            expect_method(method, "GET")
+            shoe = await self.read(self.store.find, path[1].upper())
+            if shoe is None:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"Code {path[1].upper()} not in database.")
+            return shoe_json(shoe)
+
+        if path in (["lowest"], ["highest"]):
+            expect_method(method, "GET")
+            count = query_count(query)
+            shoes = await self.read(self.store.lowest if path == ["lowest"] else self.store.highest, count)
+            return [shoe_json(shoe) for shoe in shoes]
+
+        if path == ["valuation"]:
+            expect_method(method, "GET")
+            return valuation_json(await self.read(lambda: inventory.inventory_report(self.store.columns())))
+
+        if path == ["restock"]:
+            expect_method(method, "POST")
+            fields = json_body(body)
+            code = str(fields.get("code", "")).upper()
+            amount = fields.get("amount")
+            if not isinstance(amount, int) or isinstance(amount, bool) or not 0 < amount <= MAX_AMOUNT:
+                raise RequestError(HTTPStatus.BAD_REQUEST,
+                                   f"'amount' must be a whole number from 1 to {MAX_AMOUNT}.")
+            return {"code": code, "quantity": await self.change(("restock", code, amount))}
+
+        if path == ["reprice"]:
+            expect_method(method, "POST")
+            fields = json_body(body)
+            code = str(fields.get("code", "")).upper()
+            cost = fields.get("cost")
+            # The cost must be a number that can be written in the inventory file, so NaN, infinity and numbers that
+            # would be written in exponent notation (e.g. 1e-05) are rejected.
+            if not isinstance(cost, (int, float)) or not inventory.is_valid_cost(cost):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "'cost' must be a positive number without an exponent.")
+
+            # If no product name is given, the name is not changed.
+            product = fields.get("product")
+            if product is None:
+                shoe = await self.read(self.store.find, code)
+                if shoe is None:
+                    raise RequestError(HTTPStatus.NOT_FOUND, f"Code {code} not in database.")
+                product = shoe.product
+            elif not isinstance(product, str) or not product or "," in product:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "'product' must be a name without commas.")
+
+            await self.change(("reprice", code, inventory.to_number(cost), product))
+            return {"code": code, "cost": inventory.to_number(cost), "product": product}
+
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No endpoint {url.path}.")
+
+
+# Function to read a request from a client.
+# This function returns the method, the target, a dictionary of headers (with lowercase names) and the body, or None
+# if the client has closed the connection. A RequestError is raised if the request is not valid HTTP.
+async def read_request(reader):
+
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid request line.") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.") from None
+    if length > MAX_BODY_SIZE:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "The request body is too large.")
+
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, headers, body
+
+
+# Function to encode a response with a JSON body.
+def response_bytes(status, payload, keep_alive=True):
+
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+# Function to check the method of a request, raising a RequestError if it is not the one expected.
+def expect_method(method, expected):
+
+    if method != expected:
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {expected} for this endpoint.")
+
+
+# Function to get the 'count' parameter of a query, or None if there isn't one.
+def query_count(query):
+
+    if "count" not in query:
+        return None
+    count = query["count"][0]
+    if not count.isdigit() or int(count) == 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "'count' must be a positive whole number.")
+    return int(count)
+
+
+# Function to decode the JSON object in the body of a request.
+def json_body(body):
+
+    try:
+        fields = json.loads(body)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "The request body must be JSON.") from None
+    if not isinstance(fields, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "The request body must be a JSON object.")
+    return fields
+
+
+# Function to get the fields of a Shoe object as a dictionary, to send as JSON.
+def shoe_json(shoe):
+
+    return {"country": shoe.country, "code": shoe.code, "product": shoe.product, "cost": shoe.cost,
+            "quantity": shoe.quantity}
+
+
+# Function to get the total value of the stock, and its value per country, product and price band, from a report
+# made by inventory_report, to send as JSON.
+def valuation_json(report):
+
+    valuation = {"total": report["total"]}
+    for group in ("country", "product", "price band"):
+        valuation[group] = [{"name": name, "items": items, "quantity": quantity, "value": value}
+                            for name, items, quantity, value in zip(report[group]["names"], report[group]["items"],
+                                                                    report[group]["quantities"],
+                                                                    report[group]["values"])]
+    return valuation
+
+
+# Function to open the inventory and serve it until the program is stopped.
+# This function returns the exit status: 1 if the inventory can't be read.
+async def serve(file_name, host, port):
+
+    store = inventory.open_inventory(file_name, interactive=False)
+    if not store.refresh():
+        return 1
+
+    server = InventoryServer(store)
+    listener = await server.start(host, port)
+    print(f"Serving '{file_name}' on http://{host}:{port}/ (press Ctrl-C to stop).")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+    return 0
+
+
+# Function to read the options from the command line and run the server.
+# This function returns the exit status.
+def main():
+
+    parser = argparse.ArgumentParser(description="Serve the inventory over HTTP with a JSON API.")
+    parser.add_argument("--file", default="inventory.txt",
+                        help="inventory file, or SQLite database (default: inventory.txt)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    options = parser.parse_args()
+
+    try:
+        return asyncio.run(serve(options.file, options.host, options.port))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# Functions shared by the tests: a temporary directory for the files of each test, and an inventory file to load.
+
+import contextlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import inventory
+
+
+# The inventory used by the tests.
+INVENTORY_LINES = ["Country,Code,Product,Cost,Quantity",
+                   "South Africa,SKU44386,Air Max 90,2300,20",
+                   "China,SKU90000,Jordan 1,3200,50",
+                   "Vietnam,SKU63221,Blazer,1700,19",
+                   "United States,SKU29077,Cortez,970,60"]
+
+
+# Function to write an inventory file from a list of lines, as the program saves it.
+def write_inventory(file_name, lines=INVENTORY_LINES):
+
+    inventory.save_file(file_name, inventory.text_chunks(lines), backups=0)
+
+
+# Function to load a store for an inventory file, as a new program would.
+def open_store(file_name, journal_limit=inventory.JOURNAL_COMPACT_SIZE):
+
+    store = inventory.TextFileInventory(file_name, journal_limit=journal_limit, interactive=False)
+    with contextlib.redirect_stdout(None):
+        assert store.refresh()
+    return store
+
+
+# Function to get the rows of a ShoeColumns object as strings, to compare them.
+def rows(columns):
+
+    return [str(shoe) for shoe in columns]
+
+
+class TemporaryDirectoryTest(unittest.TestCase):
+
+    # Create a temporary directory for the files of each test, with the name of an inventory file in it.
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, "inventory.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
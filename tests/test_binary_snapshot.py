@@ -0,0 +1,68 @@
+# Tests of the binary snapshot of the inventory and of its export and import.
+
+import contextlib
+import io
+import os
+import unittest
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, rows, write_inventory
+
+
+class BinarySnapshotTest(TemporaryDirectoryTest):
+
+    # Write the inventory, with a change in its journal and a name that isn't ASCII, and the name of its snapshot.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["Côte d'Ivoire,SKU10001,Air Força,1250.75,4"])
+        open_store(self.file_name).restock("SKU44386", 5)
+        self.binary_name = os.path.join(self.directory, "inventory.bin")
+
+    # The export includes the changes in the journal, and the snapshot finds every code with a binary search.
+    def test_export_and_find(self):
+        self.assertTrue(inventory.export_binary(self.file_name))
+        store = open_store(self.file_name)
+
+        with inventory.BinarySnapshot(self.binary_name) as snapshot:
+            self.assertEqual(len(snapshot), 5)
+            self.assertEqual(rows(snapshot.to_columns()), rows(store.columns()))
+            for shoe in store.columns():
+                self.assertEqual(str(snapshot.find(shoe.code)), str(shoe))
+            self.assertEqual(snapshot.find("SKU44386").quantity, 25)
+            self.assertIsNone(snapshot.find("SKU00000"))
+            self.assertIsNone(snapshot.find("SKU99999"))
+            with self.assertRaises(IndexError):
+                snapshot[5]
+
+    # An import replaces the inventory file with the snapshot, and the changes of the old journal are not replayed.
+    def test_import_replaces_inventory(self):
+        self.assertTrue(inventory.export_binary(self.file_name, self.binary_name))
+        other_name = os.path.join(self.directory, "other.txt")
+        write_inventory(other_name)
+        open_store(other_name).restock("SKU90000", 7)
+
+        self.assertTrue(inventory.import_binary(self.binary_name, other_name))
+        self.assertEqual(rows(open_store(other_name).columns()), rows(open_store(self.file_name).columns()))
+
+    # A file that isn't a snapshot is rejected.
+    def test_invalid_snapshot(self):
+        with open(self.binary_name, "wb") as binary_file:
+            binary_file.write(b"Country,Code,Product,Cost,Quantity\n" * 10)
+
+        with self.assertRaises(ValueError):
+            inventory.BinarySnapshot(self.binary_name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(inventory.import_binary(self.binary_name, self.file_name))
+            self.assertIsNone(inventory.read_binary_snapshot(self.file_name))
+
+    # A snapshot older than the inventory file is not used to load it.
+    def test_old_snapshot_is_not_read(self):
+        inventory.export_binary(self.file_name)
+        self.assertIsNotNone(inventory.read_binary_snapshot(self.file_name))
+        os.utime(self.binary_name, ns=(0, 0))
+
+        self.assertIsNone(inventory.read_binary_snapshot(self.file_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# Tests of the batch of restocks entered in the menu and saved with a single write.
+
+import unittest
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, write_inventory
+
+
+class ChangeBatchTest(TemporaryDirectoryTest):
+
+    # Restocks of the same product are added up and saved together, with the stock added by other programs.
+    def test_restocks_are_saved_together(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        batch = inventory.ChangeBatch(store)
+
+        self.assertEqual(batch.restock("SKU44386", 5), 25)
+        self.assertEqual(batch.restock("SKU44386", 3), 28)
+        self.assertEqual(batch.restock("SKU63221", 1), 20)
+        self.assertEqual(len(batch), 2)
+        open_store(self.file_name).restock("SKU44386", 10)
+
+        self.assertEqual(batch.commit(), {"SKU44386": 38, "SKU63221": 20})
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(open_store(self.file_name).find("SKU44386").quantity, 38)
+
+    # A restock that would make the quantity too large is rejected without changing the batch.
+    def test_invalid_restock_is_rejected(self):
+        write_inventory(self.file_name)
+        batch = inventory.ChangeBatch(open_store(self.file_name))
+
+        batch.restock("SKU44386", 5)
+        with self.assertRaises(ValueError):
+            batch.restock("SKU44386", inventory.MAX_QUANTITY)
+        with self.assertRaises(KeyError):
+            batch.restock("SKU00000", 1)
+        self.assertEqual(batch.amounts, {"SKU44386": 5})
+
+    # A restock that can't be saved because of another program's changes is returned as an error by commit.
+    def test_failed_restock_is_returned(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        batch = inventory.ChangeBatch(store)
+
+        batch.restock("SKU44386", 5)
+        batch.restock("SKU90000", 100)
+        open_store(self.file_name).restock("SKU90000", inventory.MAX_QUANTITY - 60)
+        results = batch.commit()
+
+        self.assertEqual(results["SKU44386"], 25)
+        self.assertIsInstance(results["SKU90000"], ValueError)
+        self.assertEqual(store.find("SKU90000").quantity, inventory.MAX_QUANTITY - 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# Tests of the commands run from the command line, without asking the user anything.
+
+import contextlib
+import io
+import os
+import unittest
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, write_inventory
+
+
+class CommandLineTest(TemporaryDirectoryTest):
+
+    # Function to run a command on the inventory file.
+    # This function returns the exit status and the printed output.
+    def run_command(self, *arguments):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            status = inventory.main(["--file", self.file_name, *arguments])
+        return status, output.getvalue()
+
+    # Function to write a CSV file of new shoes, in the format of the inventory file.
+    def write_csv(self, *lines):
+        csv_name = os.path.join(self.directory, "new.csv")
+        with open(csv_name, "w") as csv_file:
+            csv_file.write("\n".join(("Country,Code,Product,Cost,Quantity",) + lines) + "\n")
+        return csv_name
+
+    # A restock adds to the quantity of the product, whatever the case of its code.
+    def test_restock(self):
+        write_inventory(self.file_name)
+
+        self.assertEqual(self.run_command("restock", "sku44386", "5"),
+                         (0, "Quantity for product SKU44386 is now 25.\n"))
+        self.assertEqual(self.run_command("restock", "SKU00000", "5")[0], 1)
+        self.assertEqual(self.run_command("restock", "SKU44386", "-5")[0], 1)
+        self.assertEqual(open_store(self.file_name).find("SKU44386").quantity, 25)
+
+    # A lookup prints the products found, and fails if any code is not in the inventory.
+    def test_lookup(self):
+        write_inventory(self.file_name)
+
+        status, output = self.run_command("lookup", "SKU90000", "sku29077")
+        self.assertEqual(status, 0)
+        self.assertIn("Jordan 1", output)
+        self.assertIn("Cortez", output)
+        status, output = self.run_command("lookup", "SKU90000", "SKU00000")
+        self.assertEqual(status, 1)
+        self.assertIn("Code(s) not in database: SKU00000.", output)
+
+    # All the shoes of a CSV file are added, with their names formatted, or none of them if a line has an error.
+    def test_import(self):
+        write_inventory(self.file_name)
+        status, output = self.run_command("import", self.write_csv("Japan,sku10001,kobe 4,4200,3",
+                                                                   "France,SKU10002,Stan Smith,1999.5,8"))
+        self.assertEqual(status, 0)
+        self.assertEqual(str(open_store(self.file_name).find("SKU10001")), "Japan, SKU10001, Kobe 4, 4200, 3")
+
+        status, output = self.run_command("import", self.write_csv("Japan,SKU10003,Kobe 5,4300,1",
+                                                                   "Japan,SKU44386,Kobe 6,4400,1",
+                                                                   "Atlantis,SKU10004,Kobe 7,4500,1"))
+        self.assertEqual(status, 1)
+        self.assertIn("Line 3: product code SKU44386 is already in the inventory.", output)
+        self.assertIn("Line 4: no country found for 'Atlantis'.", output)
+        self.assertIsNone(open_store(self.file_name).find("SKU10003"))
+
+    # A command on a missing inventory file fails without asking the user to fix it.
+    def test_missing_file(self):
+        self.assertEqual(self.run_command("report")[0], 1)
+        self.assertEqual(self.run_command("lookup", "SKU44386")[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
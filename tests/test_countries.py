@@ -0,0 +1,46 @@
+# Tests of the lookup of countries through the index of names and codes and the cache of fuzzy searches.
+
+import unittest
+from unittest import mock
+
+import inventory
+
+
+class CountryLookupTest(unittest.TestCase):
+
+    # Start each test with an empty cache of fuzzy searches.
+    def setUp(self):
+        inventory.fuzzy_countries.cache_clear()
+        self.addCleanup(inventory.fuzzy_countries.cache_clear)
+
+    # Names and codes are found in the index, whatever their case, accents and spacing, without a fuzzy search, and
+    # are returned as they are saved in the file.
+    def test_exact_names_are_indexed(self):
+        with mock.patch.object(inventory, "fuzzy_countries") as fuzzy_countries:
+            self.assertEqual(inventory.country_matches("jp"), ["Japan"])
+            self.assertEqual(inventory.country_matches("JPN"), ["Japan"])
+            self.assertEqual(inventory.country_matches("cote d'ivoire"), ["Côte d'Ivoire"])
+            self.assertEqual(inventory.country_matches("  united   STATES "), ["United States"])
+            self.assertEqual(inventory.country_matches("Korea, Republic of"), ["Korea - Republic of"])
+            self.assertEqual(inventory.country_matches("Korea - Republic of"), ["Korea - Republic of"])
+        fuzzy_countries.assert_not_called()
+
+    # Other names are searched with search_fuzzy once, and the results are kept in the cache.
+    def test_fuzzy_searches_are_cached(self):
+        countries = inventory.import_pycountry().countries
+        with mock.patch.object(countries, "search_fuzzy", wraps=countries.search_fuzzy) as search_fuzzy:
+            self.assertEqual(inventory.country_matches("Tokyo"), ["Japan"])
+            self.assertEqual(inventory.country_matches("tokyo "), ["Japan"])
+            self.assertEqual(inventory.country_matches("Atlantis"), [])
+            self.assertEqual(inventory.country_matches("Atlantis"), [])
+        self.assertEqual(search_fuzzy.call_count, 2)
+
+    # The best match is used when there are several, and None is returned when there are none.
+    def test_resolve_country(self):
+        self.assertEqual(inventory.resolve_country("Britain"), "United Kingdom")
+        self.assertIsNone(inventory.resolve_country("Atlantis"))
+        self.assertIsNone(inventory.resolve_country("  "))
+
+
+if __name__ == "__main__":
+    unittest.main()
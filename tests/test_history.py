@@ -0,0 +1,86 @@
+# Tests of the history of the changes made to an inventory, and of the stock and value found from it.
+
+import os
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, write_inventory
+
+
+class InventoryHistoryTest(TemporaryDirectoryTest):
+
+    # Write the inventory with an old modification time, and make the clock of the program return the times given to
+    # it by 'self.now'.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name)
+        os.utime(self.file_name, (1000, 1000))
+        self.now = 2000.0
+        clock = mock.patch.object(inventory.time, "time", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    # The first snapshot holds the inventory before the first change, at the time the inventory was last changed.
+    def test_stock_at_a_time(self):
+        store = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        self.now = 3000.0
+        store.reprice("SKU44386", 2500, "Air Max 90")
+        history = inventory.InventoryHistory(self.file_name)
+
+        self.assertIsNone(history.stock_at("SKU44386", 999))
+        self.assertEqual(history.stock_at("SKU44386", 1500), (20, 2300))
+        self.assertEqual(history.stock_at("SKU44386", 2500), (25, 2300))
+        self.assertEqual(history.stock_at("SKU44386", 3000), (25, 2500))
+        self.assertEqual(history.stock_at("SKU90000", 3000), (50, 3200))
+        self.assertIsNone(history.stock_at("SKU00000", 3000))
+
+    # The changes of a product start with its stock in the first snapshot, and products added later are found too.
+    def test_product_changes(self):
+        store = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        store.add(inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3))
+        self.now = 3000.0
+        store.reprice("SKU44386", 2500, "Air Max 90")
+        history = inventory.InventoryHistory(self.file_name)
+
+        self.assertEqual(history.product_changes("SKU44386"), [(1000, 20, 2300), (2000, 25, None), (3000, None, 2500)])
+        self.assertEqual(history.product_changes("SKU10001"), [(2000, 3, 4200)])
+        self.assertEqual(history.product_changes("SKU00000"), [])
+
+    # The value of the inventory is found at each time asked for.
+    def test_values_at_times(self):
+        store = open_store(self.file_name)
+        store.restock("SKU63221", 1)
+        self.now = 3000.0
+        store.restock("SKU63221", 10)
+        first_value = 20 * 2300 + 50 * 3200 + 19 * 1700 + 60 * 970
+
+        self.assertEqual(inventory.InventoryHistory(self.file_name).values_at([500, 1500, 2500, 3500]),
+                         [None, first_value, first_value + 1700, first_value + 11 * 1700])
+
+    # Snapshots are taken as changes are added, and the changes older than the retention time are dropped, without
+    # changing the stock found at the times that are kept.
+    def test_old_changes_are_dropped(self):
+        store = open_store(self.file_name)
+        with mock.patch.object(inventory, "HISTORY_SNAPSHOT_EVENTS", 2), \
+                mock.patch.object(inventory, "HISTORY_RETENTION_DAYS", 1):
+            for day in range(6):
+                self.now = 2000.0 + day * 24 * 60 * 60
+                store.restock("SKU44386", 1)
+                store.restock("SKU90000", 1)
+                store.restock("SKU63221", 1)
+                store.restock("SKU29077", 1)
+        history = inventory.InventoryHistory(self.file_name)
+
+        self.assertEqual(history.stock_at("SKU44386", self.now), (26, 2300))
+        self.assertEqual(history.stock_at("SKU44386", self.now - 24 * 60 * 60), (25, 2300))
+        self.assertIsNone(history.stock_at("SKU44386", 1500))
+        with history.locked(exclusive=False):
+            self.assertGreater(history.generation, 0)
+            self.assertLess(history.event_count(), 6 * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# Tests of the journal of the text file store: the changes appended to it, replayed when the inventory is read and
+# written to the inventory file by a compaction.
+
+import contextlib
+import os
+import unittest
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, rows, write_inventory
+
+
+class JournalTest(TemporaryDirectoryTest):
+
+    # The changes are appended to the journal and replayed by a store that reads the inventory again, and the file
+    # itself isn't changed until the journal is compacted.
+    def test_changes_are_replayed_from_journal(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        store.reprice("SKU90000", 2999.5, "Jordan 1 Retro")
+        store.add(inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3))
+
+        with open(self.file_name) as inventory_file:
+            self.assertEqual(inventory_file.read(), "\n".join(INVENTORY_LINES))
+        self.assertTrue(os.path.exists(store.journal_name))
+
+        loaded = open_store(self.file_name)
+        self.assertEqual(rows(loaded.columns()), rows(store.columns()))
+        self.assertEqual(str(loaded.find("SKU90000")), "China, SKU90000, Jordan 1 Retro, 2999.5, 50")
+
+    # A compaction writes the changes to the inventory file and starts a new journal, and another store still has every
+    # change after reading them.
+    def test_compaction_writes_journal_to_file(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        other = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        store.restock("SKU63221", -4)
+
+        store.compact()
+        with open(store.journal_name) as journal:
+            self.assertEqual(journal.read().split(",")[1], "base\n")
+        self.assertFalse(os.path.exists(store.compacting_name))
+        with contextlib.redirect_stdout(None):
+            loaded = inventory.read_shoes_data(self.file_name, interactive=False)
+        self.assertEqual(rows(loaded), rows(store.columns()))
+
+        self.assertEqual(other.restock("SKU44386", 1), 26)
+        self.assertEqual(other.find("SKU63221").quantity, 15)
+
+    # A compaction interrupted after the journal has been renamed is replayed, and finished by the next compaction.
+    def test_interrupted_compaction_is_replayed(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        os.replace(store.journal_name, store.compacting_name)
+        store.restock("SKU90000", 10)
+
+        loaded = open_store(self.file_name)
+        self.assertEqual(loaded.find("SKU44386").quantity, 25)
+        self.assertEqual(loaded.find("SKU90000").quantity, 60)
+
+        loaded.compact()
+        self.assertFalse(os.path.exists(loaded.compacting_name))
+        self.assertEqual(rows(open_store(self.file_name).columns()), rows(loaded.columns()))
+
+    # The end of a record whose write was interrupted is skipped, and the next record is still replayed.
+    def test_incomplete_record_is_skipped(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        store.restock("SKU44386", 5)
+        with open(store.journal_name, "a") as journal:
+            journal.write("2,restock,SKU9")
+        store.restock("SKU90000", 10)
+
+        with contextlib.redirect_stdout(None):
+            loaded = open_store(self.file_name)
+        self.assertEqual(loaded.find("SKU44386").quantity, 25)
+        self.assertEqual(loaded.find("SKU90000").quantity, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# Tests of the locking of the inventory file: restocks and additions made at the same time by several programs.
+#
+# Usage: python -m unittest discover tests   (or: python -m pytest tests)
+
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, write_inventory
+
+
+# Function to restock a product a number of times from a separate process, with its own store.
+# The journal limit is small, so compactions run while the other processes are writing.
+def restock_many(file_name, code, times):
+
+    store = open_store(file_name, journal_limit=200)
+    for _ in range(times):
+        store.restock(code, 1)
+    store.wait()
+    return times
+
+
+class ConcurrentRestockTest(TemporaryDirectoryTest):
+
+    # Two stores loaded before either restocks: the second restock is added to the first one instead of replacing it.
+    def test_restocks_of_two_stores_are_merged(self):
+        write_inventory(self.file_name)
+        first = open_store(self.file_name)
+        second = open_store(self.file_name)
+
+        self.assertEqual(first.restock("SKU44386", 5), 25)
+        self.assertEqual(second.restock("SKU44386", 7), 32)
+        self.assertEqual(first.restock("SKU44386", 1), 33)
+        self.assertEqual(open_store(self.file_name).find("SKU44386").quantity, 33)
+
+    # Several processes restocking the same product at the same time, while the journal is compacted: no restock is
+    # lost.
+    def test_restocks_of_several_processes_are_merged(self):
+        write_inventory(self.file_name)
+        processes = 4
+        times = 25
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            done = list(executor.map(restock_many, [self.file_name] * processes, ["SKU90000"] * processes,
+                                     [times] * processes))
+
+        self.assertEqual(sum(done), processes * times)
+        store = open_store(self.file_name)
+        self.assertEqual(store.find("SKU90000").quantity, 50 + processes * times)
+        self.assertEqual(store.find("SKU44386").quantity, 20)
+
+    # A code added by another program can't be added again.
+    def test_code_added_by_another_store_is_rejected(self):
+        write_inventory(self.file_name)
+        first = open_store(self.file_name)
+        second = open_store(self.file_name)
+
+        first.add(inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3))
+        with self.assertRaises(ValueError):
+            second.add(inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3))
+        self.assertEqual(second.find("SKU10001").quantity, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# Tests of the pages of the inventory and of the tables they are printed on.
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, write_inventory
+
+
+class PageTest(TemporaryDirectoryTest):
+
+    # Write an inventory with two more products from China, and load it.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["China,SKU90001,Jordan 4,4100,12",
+                                                           "China,SKU90002,Dunk Low,999,0"])
+        self.store = open_store(self.file_name)
+        self.columns = self.store.columns()
+
+    # Function to get the codes on the lines of an output.
+    def codes(self, output):
+        return [word for word in output.split() if word.startswith("SKU")]
+
+    # Tables are formatted like the 'pretty' format of tabulate.
+    def test_format_table_matches_tabulate(self):
+        table_headers = ["Country", "Code", "Product", "Cost", "Quantity"]
+        table_content = [shoe.__str__().strip("\n").split(", ") for shoe in self.columns]
+
+        self.assertEqual(inventory.format_table(table_content, table_headers),
+                         inventory.tabulate(table_content, headers=table_headers, tablefmt="pretty"))
+
+    # The rows are filtered by parts of the country and product names, ignoring case.
+    def test_matching_rows(self):
+        self.assertEqual(list(inventory.matching_rows(self.columns, 0, country="chin")), [1, 4, 5])
+        self.assertEqual(list(inventory.matching_rows(self.columns, 2, country="CHINA", product="jordan")), [4])
+        self.assertEqual(list(inventory.matching_rows(self.columns, 0, product="nothing")), [])
+
+    # A page ends before the first row of the next page, and its columns are never narrower than on earlier pages.
+    def test_view_page(self):
+        table, rows, next_start, widths = inventory.view_page(self.columns, 0, 2, country="china")
+        self.assertEqual((self.codes(table), rows, next_start), (["SKU90000", "SKU90001"], 2, 5))
+
+        table, rows, next_start, last_widths = inventory.view_page(self.columns, 5, 2, country="china", widths=widths)
+        self.assertEqual((self.codes(table), rows, next_start), (["SKU90002"], 1, None))
+        self.assertTrue(all(last >= first for first, last in zip(widths, last_widths)))
+
+    # Without asking the user, a single page is printed after skipping a number of items.
+    def test_view_all_without_asking(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            inventory.view_all(self.store, page_size=2, offset=3, interactive=False)
+            inventory.view_all(self.store, country="Atlantis", interactive=False)
+
+        self.assertIn("Items 4 to 5 of 6:", output.getvalue())
+        self.assertEqual(self.codes(output.getvalue()), ["SKU29077", "SKU90001"])
+        self.assertIn("No items found.", output.getvalue())
+
+    # The user moves to the next and previous pages, and can't move past the first or the last page.
+    def test_view_all_pages(self):
+        with mock.patch("builtins.input", side_effect=["p", "n", "n", "p", "q"]), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            inventory.view_all(self.store, page_size=4)
+
+        first_page = ["SKU44386", "SKU90000", "SKU63221", "SKU29077"]
+        self.assertEqual(self.codes(output.getvalue()), first_page + ["SKU90001", "SKU90002"] + first_page)
+        self.assertEqual(output.getvalue().count("Invalid selection."), 2)
+        self.assertIn("Items 5 to 6 of 6:", output.getvalue())
+
+    # A page is taken from the cache of views until the inventory changes.
+    def test_page_is_cached(self):
+        with mock.patch.object(inventory, "view_page", wraps=inventory.view_page) as view_page, \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            inventory.view_all(self.store, interactive=False)
+            inventory.view_all(self.store, interactive=False)
+            self.store.restock("SKU44386", 1)
+            inventory.view_all(self.store, interactive=False)
+
+        self.assertEqual(view_page.call_count, 2)
+        self.assertEqual(output.getvalue().count("SKU44386"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# Tests of the parallel loader, which checks a large inventory file in parts with several processes.
+
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, rows, write_inventory
+
+
+class ParallelLoaderTest(TemporaryDirectoryTest):
+
+    # Function to load a file line by line and with several processes, in small parts so each process has some.
+    def load_both(self, lines, max_errors=None):
+        write_inventory(self.file_name, lines)
+        with open(self.file_name) as inventory_file:
+            serial = inventory.load_shoes(inventory.read_lines(inventory_file), max_errors, self.file_name)
+        with mock.patch.object(inventory, "LOAD_CHUNK_SIZE", 100):
+            parallel = inventory.load_shoes_parallel(self.file_name, max_errors, workers=3)
+        return serial, parallel
+
+    # The parallel loader reads the same products, in the same order, as reading the file line by line.
+    def test_same_products_as_serial_loader(self):
+        lines = INVENTORY_LINES[:1] + [f"China,SKU{number:05d},Jordan 1,{1000 + number},{number % 40}"
+                                       for number in range(300)]
+        serial, parallel = self.load_both(lines)
+
+        self.assertFalse(serial[0])
+        self.assertEqual(serial[:2], parallel[:2])
+        self.assertEqual(rows(serial[2]), rows(parallel[2]))
+        self.assertEqual(len(parallel[2]), 300)
+
+    # The parallel loader finds the same errors, with the same line numbers, as reading the file line by line.
+    def test_same_errors_as_serial_loader(self):
+        lines = INVENTORY_LINES[:1] + [f"China,SKU{number:05d},Jordan 1,{1000 + number},{number % 40}"
+                                       for number in range(200)]
+        lines[57] = "China,SKU00056,Jordan 1,not a cost,3"
+        lines[150] = "China,SKU00149,Jordan 1"
+        serial, parallel = self.load_both(lines, max_errors=5)
+
+        self.assertTrue(serial[0])
+        self.assertEqual(serial[:2], parallel[:2])
+        self.assertIsNone(parallel[2])
+        self.assertIn("Line: 58\n", parallel[1])
+        self.assertIn("Line: 151\n", parallel[1])
+
+    # A file at least PARALLEL_LOAD_SIZE bytes long is read with the parallel loader.
+    def test_large_file_is_read_in_parallel(self):
+        lines = INVENTORY_LINES[:1] + [f"China,SKU{number:05d},Jordan 1,{1000 + number},{number % 40}"
+                                       for number in range(100)]
+        write_inventory(self.file_name, lines)
+        with mock.patch.multiple(inventory, PARALLEL_LOAD_SIZE=0, LOAD_WORKERS=2, LOAD_CHUNK_SIZE=500), \
+                mock.patch.object(inventory, "load_shoes_parallel", wraps=inventory.load_shoes_parallel) as parallel:
+            shoes = inventory.read_shoes_data(self.file_name, interactive=False)
+        parallel.assert_called_once()
+        self.assertEqual(rows(shoes)[:2], ["China, SKU00000, Jordan 1, 1000, 0", "China, SKU00001, Jordan 1, 1001, 1"])
+        self.assertEqual(len(shoes), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
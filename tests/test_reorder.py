@@ -0,0 +1,70 @@
+# Tests of the reorder engine, which finds the products at or below their reorder point and the quantities to order.
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, write_inventory
+
+
+class ReorderEngineTest(TemporaryDirectoryTest):
+
+    # Write an inventory with two products at or below the default reorder point, and load it.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["China,SKU90001,Jordan 4,4100,3",
+                                                           "Japan,SKU10001,Kobe 4,4200,10"])
+        self.store = open_store(self.file_name)
+
+    # Function to get the code, reorder point, target and amount to order of each product of the plan of the store.
+    def plan(self, count=None):
+        return [(shoe.code, point, target, amount) for shoe, point, target, amount in self.store.reorder_plan(count)]
+
+    # The products furthest below their reorder point are first, and are ordered up to their target quantity.
+    def test_default_thresholds(self):
+        self.assertEqual(self.plan(), [("SKU90001", 10, 50, 47), ("SKU10001", 10, 50, 40)])
+        self.assertEqual(self.plan(1), [("SKU90001", 10, 50, 47)])
+
+    # The products with their own thresholds use them, and the set of products to reorder follows the quantities.
+    def test_own_thresholds(self):
+        self.store.set_thresholds({"SKU44386": (25, 40), "SKU10001": (5, 20)})
+        self.assertEqual(self.plan(), [("SKU90001", 10, 50, 47), ("SKU44386", 25, 40, 20)])
+
+        self.store.restock("SKU90001", 10)
+        self.store.restock("SKU10001", -6)
+        self.assertEqual(self.plan(), [("SKU44386", 25, 40, 20), ("SKU10001", 5, 20, 16)])
+
+        self.store.set_thresholds({"SKU44386": None})
+        self.assertEqual(self.plan(), [("SKU10001", 5, 20, 16)])
+
+    # A product added to the inventory is checked too.
+    def test_added_product(self):
+        self.plan()
+        self.store.add(inventory.Shoe("Japan", "SKU10002", "Kobe 5", 4300, 0))
+        self.assertEqual(self.plan()[0], ("SKU10002", 10, 50, 50))
+
+    # The lines of the file of thresholds that aren't valid are skipped.
+    def test_invalid_thresholds_are_skipped(self):
+        with open(inventory.thresholds_file_name(self.file_name), "w") as thresholds_file:
+            thresholds_file.write("Code,Reorder point,Target quantity\nSKU44386,25,40\nSKU90000,40,30\nnothing\n")
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(inventory.read_thresholds(self.file_name), {"SKU44386": (25, 40)})
+        self.assertIn("Line 3 of", output.getvalue())
+        self.assertIn("Line 4 of", output.getvalue())
+
+    # The plan is ordered with a single write.
+    def test_reorder_stock(self):
+        with mock.patch.object(self.store, "apply_changes", wraps=self.store.apply_changes) as apply_changes, \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(inventory.reorder_stock(self.store, apply=True), 2)
+
+        apply_changes.assert_called_once_with([("restock", "SKU90001", 47), ("restock", "SKU10001", 40)])
+        self.assertEqual(open_store(self.file_name).find("SKU90001").quantity, 50)
+        self.assertEqual(self.plan(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
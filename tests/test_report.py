@@ -0,0 +1,55 @@
+# Tests of the value report of the stock per country, product and price band, with and without NumPy.
+
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, write_inventory
+
+
+class InventoryReportTest(TemporaryDirectoryTest):
+
+    # Write an inventory with two products from China, one of them on two lines, and load its columns.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["China,SKU90001,Jordan 1,5500.5,2",
+                                                           "China,SKU90002,Dunk Low,999,0"])
+        self.columns = open_store(self.file_name).columns()
+
+    # Function to check the report made by inventory_report.
+    def check_report(self, report):
+        self.assertEqual(list(report["values"]), [46000, 160000, 32300, 58200, 11001, 0])
+        self.assertEqual(report["total"], 46000 + 160000 + 32300 + 58200 + 11001)
+        self.assertEqual(report["country"], {"names": ["China", "United States", "South Africa", "Vietnam"],
+                                             "items": [3, 1, 1, 1], "quantities": [52, 60, 20, 19],
+                                             "values": [171001, 58200, 46000, 32300]})
+        self.assertEqual(report["product"]["names"], ["Jordan 1", "Cortez", "Air Max 90", "Blazer", "Dunk Low"])
+        self.assertEqual(report["product"]["items"], [2, 1, 1, 1, 1])
+        self.assertEqual(report["price band"], {"names": ["3000 to 4000", "Under 1000", "2000 to 3000",
+                                                          "1000 to 2000", "5000 or more"],
+                                                "items": [1, 2, 1, 1, 1], "quantities": [50, 60, 20, 19, 2],
+                                                "values": [160000, 58200, 46000, 32300, 11001]})
+
+    # The report calculated over whole columns with NumPy.
+    def test_report_with_numpy(self):
+        if inventory.import_numpy() is None:
+            self.skipTest("NumPy is not installed.")
+        self.check_report(inventory.inventory_report(self.columns))
+
+    # The report calculated with a loop per column, when NumPy is not installed.
+    def test_report_without_numpy(self):
+        with mock.patch.object(inventory, "import_numpy", return_value=None):
+            self.check_report(inventory.inventory_report(self.columns))
+
+    # The text of the report only shows the groups with the highest values.
+    def test_report_text(self):
+        text = inventory.value_report_text(self.columns, limit=2)
+
+        self.assertIn("Total value of items in stock: 307501", text)
+        self.assertIn("Value per country (top 2 of 4):", text)
+        self.assertIn("Value per price band (top 2 of 5):", text)
+        self.assertNotIn("Vietnam", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# Tests of the sale rules, which reprice every product matching their conditions with a single write.
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, write_inventory
+
+
+class SaleRuleTest(TemporaryDirectoryTest):
+
+    # Write an inventory with another product from Vietnam, and load it.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["Vietnam,SKU63222,Blazer Mid,1999,55"])
+        self.store = open_store(self.file_name)
+
+    # Function to get the codes of the rows matched by a rule.
+    def matches(self, text):
+        columns = self.store.columns()
+        return [columns.codes[position] for position in inventory.SaleRule.parse(text).matches(columns)]
+
+    # Function to get the code, new cost and original cost of each product of the plan of a rule.
+    def plan(self, text):
+        return [(shoe.code, cost, original)
+                for shoe, cost, original in self.store.sale_plan(inventory.SaleRule.parse(text))]
+
+    # Function to put the products of a rule on sale, or take them off sale.
+    def apply(self, text):
+        return self.store.apply_sale(self.store.sale_plan(inventory.SaleRule.parse(text)))
+
+    # Rules that can't be read are rejected with a message.
+    def test_invalid_rules(self):
+        for text in ("20% off where", "half price", "0% off", "100% off", "20% off where colour = red",
+                     "20% off where quantity > many", "20% off where country > Vietnam"):
+            with self.assertRaises(ValueError, msg=text):
+                inventory.SaleRule.parse(text)
+
+    # The conditions are combined, and names are compared ignoring case and accents, with and without NumPy.
+    def test_matches(self):
+        for numpy in (inventory.import_numpy(), None):
+            with mock.patch.object(inventory, "import_numpy", return_value=numpy):
+                self.assertEqual(self.matches("20% off where country = vietnam"), ["SKU63221", "SKU63222"])
+                self.assertEqual(self.matches("20% OFF WHERE quantity > 50 AND country = Vietnam"), ["SKU63222"])
+                self.assertEqual(self.matches("end where code != sku90000 and cost <= 1999"),
+                                 ["SKU63221", "SKU29077", "SKU63222"])
+                self.assertEqual(self.matches("10% off where product = air max 90"), ["SKU44386"])
+                self.assertEqual(len(self.matches("10% off")), 5)
+
+    # Discounts are taken from the original cost, so two rules don't add up, and ending the sale restores it.
+    def test_sale_and_end(self):
+        self.assertEqual(self.plan("20% off where country = Vietnam"), [("SKU63221", 1360, 1700),
+                                                                        ("SKU63222", 1599.2, 1999)])
+        self.apply("20% off where country = Vietnam")
+        self.assertEqual(self.plan("10% off where country = Vietnam"), [("SKU63221", 1530, 1700),
+                                                                        ("SKU63222", 1799.1, 1999)])
+        self.assertEqual(self.plan("20% off where country = Vietnam"), [])
+
+        self.apply("end where code = SKU63221")
+        store = open_store(self.file_name)
+        self.assertEqual(str(store.find("SKU63221")), "Vietnam, SKU63221, Blazer, 1700, 19")
+        self.assertEqual(str(store.find("SKU63222")), "Vietnam, SKU63222, Blazer Mid, 1599.2, 55")
+        self.assertEqual(inventory.read_sales(self.file_name), {"SKU63222": (1999, 1599.2)})
+
+    # A product repriced since it was put on sale is no longer on sale, and its new cost is the original one.
+    def test_repriced_product_is_not_on_sale(self):
+        self.apply("50% off where code = SKU44386")
+        self.store.reprice("SKU44386", 2000, "Air Max 90")
+
+        self.assertEqual(self.plan("end where code = SKU44386"), [])
+        self.assertEqual(self.plan("10% off where code = SKU44386"), [("SKU44386", 1800, 2000)])
+
+    # Without saving, the new prices are only shown.
+    def test_dry_run(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertTrue(inventory.sale_rules(self.store, "20% off where quantity > 50", apply=False))
+            self.assertFalse(inventory.sale_rules(self.store, "20% off where size > 50", apply=False))
+
+        self.assertIn("2 price(s) would change", output.getvalue())
+        self.assertEqual(open_store(self.file_name).find("SKU29077").cost, 970)
+
+
+if __name__ == "__main__":
+    unittest.main()
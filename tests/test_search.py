@@ -0,0 +1,67 @@
+# Tests of the search index over the names and codes of the products.
+
+import unittest
+
+import inventory
+from tests.support import INVENTORY_LINES, TemporaryDirectoryTest, open_store, write_inventory
+
+
+class SearchIndexTest(TemporaryDirectoryTest):
+
+    # Write an inventory with more products from China and Vietnam, and load it.
+    def setUp(self):
+        super().setUp()
+        write_inventory(self.file_name, INVENTORY_LINES + ["China,SKU90001,Jordan 4 Retro,4100,12",
+                                                           "Vietnam,SKU44390,Air Jordan 1 Low,2100,7",
+                                                           "Côte d'Ivoire,SKU10001,Air Force 1,1250,4"])
+        self.store = open_store(self.file_name)
+
+    # Function to get the codes of the products found by a search of the store.
+    def search(self, text, limit=None):
+        return [shoe.code for shoe in self.store.search(text, limit)]
+
+    # Every word has to be in the country or product name, ignoring case and accents, and the products are found in
+    # the order of the inventory.
+    def test_words(self):
+        self.assertEqual(self.search("jordan"), ["SKU90000", "SKU90001", "SKU44390"])
+        self.assertEqual(self.search("JORDAN vietnam"), ["SKU44390"])
+        self.assertEqual(self.search("air cote"), ["SKU10001"])
+        self.assertEqual(self.search("jordan 1"), ["SKU90000", "SKU44390"])
+        self.assertEqual(self.search("jordan atlantis"), [])
+        self.assertEqual(self.search(""), [])
+
+    # A word ending in '*' matches the words starting with it.
+    def test_word_prefix(self):
+        self.assertEqual(self.search("jor*"), ["SKU90000", "SKU90001", "SKU44390"])
+        self.assertEqual(self.search("ret* chi*"), ["SKU90001"])
+        self.assertEqual(self.search("xyz*"), [])
+
+    # Codes are found exactly, by prefix or by range, in order of code, and can be combined with words.
+    def test_codes(self):
+        self.assertEqual(self.search("sku44386"), ["SKU44386"])
+        self.assertEqual(self.search("SKU44*"), ["SKU44386", "SKU44390"])
+        self.assertEqual(self.search("SKU44000-SKU90000"), ["SKU44386", "SKU44390", "SKU63221", "SKU90000"])
+        self.assertEqual(self.search("SKU4* air"), ["SKU44386", "SKU44390"])
+        self.assertEqual(self.search("SKU00000"), [])
+
+    # The number of products found can be limited.
+    def test_limit(self):
+        self.assertEqual(self.search("air", limit=2), ["SKU44386", "SKU44390"])
+
+    # The index is updated when a product is added or renamed, and the old name no longer matches.
+    def test_index_is_updated(self):
+        self.assertEqual(self.search("cortez"), ["SKU29077"])
+        self.store.reprice("SKU29077", 970, "Cortez Nylon")
+        self.store.reprice("SKU63221", 1700, "Blazer Mid 77")
+        self.store.add(inventory.Shoe("Japan", "SKU10002", "Blazer Low", 1500, 3))
+
+        self.assertEqual(self.search("nylon"), ["SKU29077"])
+        self.assertEqual(self.search("blazer"), ["SKU63221", "SKU10002"])
+        self.assertEqual(self.search("blazer mid"), ["SKU63221"])
+        self.assertEqual(self.search("SKU1*"), ["SKU10001", "SKU10002"])
+        self.store.reprice("SKU29077", 970, "Cortez")
+        self.assertEqual(self.search("nylon"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
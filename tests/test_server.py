@@ -0,0 +1,143 @@
+# Tests of the inventory server: its endpoints, for an inventory file and an SQLite database, and the changes that
+# can't be saved.
+
+import asyncio
+import contextlib
+import os
+import threading
+import unittest
+from unittest import mock
+
+import inventory
+import server
+from load_test import request
+from tests.support import TemporaryDirectoryTest, open_store, rows, write_inventory
+
+
+class ServerTest(TemporaryDirectoryTest):
+
+    # Function to run a server for a store and send it requests, each a tuple of the method, path and payload.
+    # This function returns the list of (status, JSON body) of the responses.
+    def requests(self, store, *requests):
+
+        async def run():
+            inventory_server = server.InventoryServer(store, refresh_interval=0.05)
+            listener = await inventory_server.start("127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                responses = [await request(reader, writer, *arguments) for arguments in requests]
+                writer.close()
+                await writer.wait_closed()
+                return responses
+            finally:
+                listener.close()
+                await listener.wait_closed()
+                await inventory_server.stop()
+
+        return asyncio.run(run())
+
+    # Function to get a store for the inventory: the text file, or an SQLite database copied from it.
+    def store(self, database=False):
+        write_inventory(self.file_name)
+        if not database:
+            return open_store(self.file_name)
+        database_name = os.path.join(self.directory, "inventory.db")
+        with contextlib.redirect_stdout(None):
+            inventory.migrate_to_sqlite(self.file_name, database_name)
+        store = inventory.SQLiteInventory(database_name, interactive=False)
+        store.refresh()
+        self.addCleanup(store.close)
+        return store
+
+    # Function to check the endpoints with a store.
+    def check_endpoints(self, store):
+        responses = self.requests(store,
+                                  ("GET", "/shoes/sku44386"),
+                                  ("GET", "/shoes/SKU00000"),
+                                  ("GET", "/lowest?count=2"),
+                                  ("GET", "/highest"),
+                                  ("POST", "/restock", {"code": "SKU44386", "amount": 5}),
+                                  ("POST", "/reprice", {"code": "SKU90000", "cost": 2999.5}),
+                                  ("GET", "/valuation"),
+                                  ("GET", "/nothing"))
+
+        self.assertEqual(responses[0], (200, {"country": "South Africa", "code": "SKU44386", "product": "Air Max 90",
+                                              "cost": 2300, "quantity": 20}))
+        self.assertEqual(responses[1][0], 404)
+        self.assertEqual([shoe["code"] for shoe in responses[2][1]], ["SKU63221", "SKU44386"])
+        self.assertEqual([shoe["code"] for shoe in responses[3][1]], ["SKU29077"])
+        self.assertEqual(responses[4], (200, {"code": "SKU44386", "quantity": 25}))
+        self.assertEqual(responses[5], (200, {"code": "SKU90000", "cost": 2999.5, "product": "Jordan 1"}))
+        self.assertEqual(responses[6][1]["total"], 25 * 2300 + 50 * 2999.5 + 19 * 1700 + 60 * 970)
+        self.assertEqual(responses[7][0], 404)
+        self.assertEqual(store.find("SKU44386").quantity, 25)
+
+    def test_endpoints_of_text_file(self):
+        self.check_endpoints(self.store())
+
+    def test_endpoints_of_database(self):
+        self.check_endpoints(self.store(database=True))
+
+    # Requests with values that can't be saved are rejected with the status 400, including a restock that would make
+    # the quantity too large.
+    def test_invalid_changes_are_rejected(self):
+        store = self.store()
+        store.restock("SKU44386", inventory.MAX_QUANTITY - 20)
+        responses = self.requests(store,
+                                  ("POST", "/restock", {"code": "SKU44386", "amount": 1}),
+                                  ("POST", "/restock", {"code": "SKU90000", "amount": 0}),
+                                  ("POST", "/restock", {"code": "SKU90000", "amount": 1.5}),
+                                  ("POST", "/reprice", {"code": "SKU90000", "cost": 1e-05}),
+                                  ("POST", "/reprice", {"code": "SKU90000", "cost": 100, "product": "A, B"}))
+
+        self.assertEqual([status for status, _ in responses], [400] * 5)
+        self.assertEqual(store.find("SKU44386").quantity, inventory.MAX_QUANTITY)
+        self.assertEqual(str(store.find("SKU90000")), "China, SKU90000, Jordan 1, 3200, 50")
+
+    # An unexpected error while answering a request is sent back with the status 500, and the connection can still
+    # be used.
+    def test_unexpected_error_is_answered(self):
+        store = self.store()
+        with mock.patch.object(store, "lowest", side_effect=RuntimeError("broken index")):
+            responses = self.requests(store, ("GET", "/lowest"), ("GET", "/shoes/SKU44386"))
+
+        self.assertEqual(responses[0], (500, {"error": "The request could not be answered: broken index"}))
+        self.assertEqual(responses[1][0], 200)
+
+    # The reads of a database are made by the reader thread, not by the event loop.
+    def test_database_is_read_by_reader_thread(self):
+        store = self.store(database=True)
+        threads = []
+        find = store.find
+
+        def find_in_thread(code):
+            threads.append(threading.current_thread())
+            return find(code)
+
+        with mock.patch.object(store, "find", side_effect=find_in_thread):
+            self.assertEqual(self.requests(store, ("GET", "/shoes/SKU44386"))[0][0], 200)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+class StoreChangeTest(TemporaryDirectoryTest):
+
+    # A change that can't be saved is rejected without changing the inventory in memory or the other changes.
+    def test_invalid_change_leaves_inventory_unchanged(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        results = store.apply_changes([("restock", "SKU44386", 5), ("restock", "SKU90000", 10 ** 30),
+                                       ("restock", "SKU63221", -20), ("restock", "SKU00000", 1)])
+
+        self.assertEqual(results[0], 25)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[2], ValueError)
+        self.assertIsInstance(results[3], KeyError)
+        self.assertEqual(store.find("SKU90000").quantity, 50)
+        self.assertEqual(store.find("SKU63221").quantity, 19)
+        self.assertEqual(rows(open_store(self.file_name).columns()), rows(store.columns()))
+
+
+if __name__ == "__main__":
+    unittest.main()
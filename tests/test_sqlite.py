@@ -0,0 +1,97 @@
+# Tests of the SQLite store of the inventory and of the copy of an inventory file into it.
+
+import contextlib
+import io
+import os
+import unittest
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, rows, write_inventory
+
+
+class SQLiteInventoryTest(TemporaryDirectoryTest):
+
+    # Copy the inventory file, with a change in its journal, into a database.
+    def setUp(self):
+        super().setUp()
+        self.database_name = os.path.join(self.directory, "inventory.db")
+        write_inventory(self.file_name)
+        open_store(self.file_name).restock("SKU44386", 5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(inventory.migrate_to_sqlite(self.file_name, self.database_name))
+
+    # Function to open a store for the database, closed at the end of the test.
+    def open_database(self):
+        store = inventory.open_inventory(self.database_name, interactive=False)
+        self.assertIsInstance(store, inventory.SQLiteInventory)
+        self.assertTrue(store.refresh())
+        self.addCleanup(store.close)
+        return store
+
+    # The database has the rows of the file, in the same order, with the changes of the journal.
+    def test_migrated_rows(self):
+        store = self.open_database()
+
+        self.assertEqual(rows(store.columns()), rows(open_store(self.file_name).columns()))
+        self.assertEqual(store.find("SKU44386").quantity, 25)
+        self.assertIsNone(store.find("SKU00000"))
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertFalse(inventory.migrate_to_sqlite(self.file_name, self.database_name))
+        self.assertIn("already has an inventory", output.getvalue())
+
+    # The lowest and highest quantities are found in the order of the inventory.
+    def test_lowest_and_highest(self):
+        store = self.open_database()
+
+        self.assertEqual([shoe.code for shoe in store.lowest()], ["SKU63221"])
+        self.assertEqual([shoe.code for shoe in store.lowest(2)], ["SKU63221", "SKU44386"])
+        self.assertEqual([shoe.code for shoe in store.highest(3)], ["SKU29077", "SKU90000", "SKU44386"])
+
+    # Restocks made by two stores are both kept, and the rows read by each store are read again after the change.
+    def test_changes_of_two_stores(self):
+        first = self.open_database()
+        second = self.open_database()
+        columns = second.columns()
+
+        self.assertEqual(first.restock("SKU90000", 5), 55)
+        self.assertEqual(second.restock("SKU90000", 7), 62)
+        first.reprice("SKU63221", 1650.5, "Blazer Mid")
+        self.assertIsNot(second.columns(), columns)
+        self.assertIs(second.columns(), second.columns())
+        self.assertEqual(str(second.find("SKU63221")), "Vietnam, SKU63221, Blazer Mid, 1650.5, 19")
+        self.assertEqual(first.find("SKU90000").quantity, 62)
+
+    # Changes that can't be made have an error as their result, and the other changes are still made.
+    def test_invalid_changes(self):
+        store = self.open_database()
+        results = store.apply_changes([("restock", "SKU44386", -30), ("restock", "SKU00000", 1),
+                                       ("reprice", "SKU90000", 0, "Jordan 1"), ("restock", "SKU63221", 1)])
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIsInstance(results[1], KeyError)
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(results[3], 20)
+        self.assertEqual(store.find("SKU44386").quantity, 25)
+
+    # Shoes are only added if none of their codes is already in the inventory.
+    def test_add_many(self):
+        store = self.open_database()
+        store.add_many([inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3)])
+        with self.assertRaises(ValueError):
+            store.add_many([inventory.Shoe("Japan", "SKU10002", "Kobe 5", 4300, 1),
+                            inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3)])
+
+        self.assertEqual(store.find("SKU10001").quantity, 3)
+        self.assertIsNone(store.find("SKU10002"))
+        self.assertEqual(len(store.columns()), 5)
+
+    # A database that doesn't exist is not created by refresh.
+    def test_missing_database(self):
+        store = inventory.SQLiteInventory(os.path.join(self.directory, "missing.db"), interactive=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(store.refresh())
+        self.assertFalse(os.path.exists(store.file_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
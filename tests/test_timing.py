@@ -0,0 +1,58 @@
+# Tests of the timers of the phases of the program and their measure of memory.
+
+import tracemalloc
+import unittest
+from unittest import mock
+
+import inventory
+
+
+class TimedTest(unittest.TestCase):
+
+    # Forget the phases timed by other tests.
+    def setUp(self):
+        self.stats = mock.patch.dict(inventory.PHASE_STATS, clear=True)
+        self.stats.start()
+        self.addCleanup(self.stats.stop)
+
+    # The time of each call of a phase is added up.
+    def test_phase_is_recorded(self):
+        with inventory.timed("test phase"):
+            pass
+        with inventory.timed("test phase"):
+            pass
+        self.assertEqual(inventory.PHASE_STATS["test phase"]["calls"], 2)
+        self.assertIsNone(inventory.PHASE_STATS["test phase"]["peak memory"])
+
+    # The peak memory measured by a program that started tracemalloc itself is not reset by the phases.
+    def test_peak_of_other_tracer_is_kept(self):
+        tracemalloc.start()
+        try:
+            with inventory.timed("allocate"):
+                data = bytearray(10 * 1024 * 1024)
+                del data
+            with inventory.timed("nothing"):
+                pass
+            self.assertGreaterEqual(tracemalloc.get_traced_memory()[1], 10 * 1024 * 1024)
+        finally:
+            tracemalloc.stop()
+
+    # The peak memory of each phase is recorded when start_profiling is tracing memory, including the memory of the
+    # phases nested in it.
+    def test_peak_of_each_phase_when_profiling(self):
+        with mock.patch.object(inventory, "PROFILE_MODES", {"tracemalloc"}):
+            inventory.start_profiling()
+        try:
+            with inventory.timed("outer"):
+                with inventory.timed("inner"):
+                    data = bytearray(1024 * 1024)
+                    del data
+        finally:
+            tracemalloc.stop()
+            inventory.TRACERS.clear()
+        self.assertGreaterEqual(inventory.PHASE_STATS["inner"]["peak memory"], 1024 * 1024)
+        self.assertGreaterEqual(inventory.PHASE_STATS["outer"]["peak memory"], 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Tests of the cache of views of an inventory and of the values of its items, which only change what has changed.
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import inventory
+from tests.support import TemporaryDirectoryTest, open_store, write_inventory
+
+
+class ViewCacheTest(unittest.TestCase):
+
+    # A view is only made again when the revision changes, and is given back the state kept the last time.
+    def test_view_is_made_once_per_revision(self):
+        views = inventory.ViewCache()
+        states = []
+
+        def render(state):
+            states.append(state)
+            return f"view {len(states)}", len(states)
+
+        self.assertEqual(views.get("view", 1, render), "view 1")
+        self.assertEqual(views.get("view", 1, render), "view 1")
+        self.assertEqual(views.get("view", 2, render), "view 2")
+        self.assertEqual(states, [None, 1])
+
+    # The views used the longest time ago are dropped once there are too many.
+    def test_oldest_views_are_dropped(self):
+        views = inventory.ViewCache(size=2)
+        views.get("first", 1, lambda state: ("first", None))
+        views.get("second", 1, lambda state: ("second", None))
+        views.get("first", 1, lambda state: ("made again", None))
+        views.get("third", 1, lambda state: ("third", None))
+
+        self.assertEqual(list(views.views), ["first", "third"])
+
+
+class ItemValuesTest(TemporaryDirectoryTest):
+
+    # The value of a changed row is calculated again and logged, and rows appended to the columns are added.
+    def test_updated_rows_are_logged(self):
+        write_inventory(self.file_name)
+        columns = open_store(self.file_name).columns()
+        values = inventory.ItemValues(columns)
+
+        self.assertEqual(list(values.values), [46000, 160000, 32300, 58200])
+        columns.quantities[2] = 20
+        values.update(2)
+        columns.append(inventory.Shoe("Japan", "SKU10001", "Kobe 4", 4200, 3))
+        values.update(2)
+
+        self.assertEqual(list(values.values), [46000, 160000, 34000, 58200, 12600])
+        self.assertEqual(values.changes_since(0), [2, 4, 2])
+        self.assertEqual(values.changes_since(1), [4, 2])
+
+    # The log is emptied once it is longer than the rows, and can then no longer give the changes of old versions.
+    def test_log_is_emptied(self):
+        write_inventory(self.file_name)
+        values = inventory.ItemValues(open_store(self.file_name).columns())
+        for _ in range(6):
+            values.update(0)
+
+        self.assertIsNone(values.changes_since(0))
+        self.assertEqual(values.changes_since(values.version), [])
+
+    # The table of values only formats again the rows that have changed, and shows the same as a new table.
+    def test_value_table_is_updated(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        table, state = inventory.value_table(store.item_values(), None)
+        store.restock("SKU63221", 1)
+
+        with mock.patch.object(inventory, "table_line", wraps=inventory.table_line) as table_line:
+            updated, _ = inventory.value_table(store.item_values(), state)
+        # One line for the changed row, and one for the headers.
+        self.assertEqual(table_line.call_count, 2)
+        self.assertEqual(updated, inventory.value_table(store.item_values(), None)[0])
+        self.assertNotEqual(updated, table)
+
+
+class QuantityViewTest(TemporaryDirectoryTest):
+
+    # The lowest quantities are only found again once the inventory has changed.
+    def test_lowest_is_found_once_per_revision(self):
+        write_inventory(self.file_name)
+        store = open_store(self.file_name)
+        with mock.patch.object(store, "lowest", wraps=store.lowest) as lowest, \
+                mock.patch("builtins.input", return_value="n"), contextlib.redirect_stdout(io.StringIO()) as output:
+            inventory.re_stock(store)
+            inventory.re_stock(store)
+            store.restock("SKU44386", 1)
+            inventory.re_stock(store)
+
+        self.assertEqual(lowest.call_count, 2)
+        self.assertEqual(output.getvalue().count("SKU63221 | Blazer  | 1700 |    19"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()